@@ -22,9 +22,15 @@ from .lookups_manager import (
     read_workplan_details,
     write_workplan_details,
     read_workplan_constants,
-    write_workplan_constants
+    write_workplan_constants,
+    lookups_store
 )
 from .data_manager     import DataManager
+from .workbook_writer  import workbook_writer
+from .schema_migration import schema_migrator
+from .lookups_store    import station_color
+from .columnar         import to_columnar
+from .transport        import compressible, transport_stats
 from .data_nuke import data_nuke
 from .bulk_importer import get_sheet_names, import_sheet_data
 from .repairs_manager import save_repair
@@ -44,6 +50,8 @@ dm = DataManager()
 # Register excel import endpoints now that dm exists, and inject dm safely
 from . import excel_import
 excel_import.set_dm(dm)
+from . import geographical_algorithm
+geographical_algorithm.set_dm(dm)
 
 # ─── Exposed Lookup APIs ───────────────────────────────────────────────────
 @eel.expose
@@ -76,32 +84,26 @@ def save_algorithm_parameters(params):
 
 
 # ─── Station data APIs ──────────────────────────────────────────────────────
-@eel.expose
-def get_infrastructure_data():
-    stations = dm.list_stations()
-    # inject the saved color per province→asset_type
+def _decorate_stations(
+    stations:      list[dict],
+    schema_source: list[dict] | None = None,
+    schema_map:    dict[str, dict[str, set[str]]] | None = None
+) -> list[dict]:
+    """
+    Attach each station's colour and back-fill every `Section – Field` of its
+    asset type's schema: `schema_map` if given, else the union over
+    `schema_source` (default `stations`).
+    """
+    # inject the saved color per province→asset_type from one cached colour table
+    # (location-specific row first, then the asset type's generic row)
+    colors = lookups_store.color_table()
     for stn in stations:
-        # 1) try the specific (asset_type + province) match
-        # (our Eel‑exposed wrapper now takes exactly two args)
-        col = get_asset_type_color_for_location(
-                 stn['asset_type'],
-                 stn['province']
-              )
-        # 2) fallback to the generic first‑row lookup
-        if not col:
-            col = get_asset_type_color('AssetTypes', stn['asset_type'])
-        stn['color'] = col or '#000000'
+        stn['color'] = station_color(colors, stn['asset_type'], stn['province'])
 
     # 1) Build the union of all extra‑sections per asset_type
     #    schema_map = { asset_type: { section_name: set(fields) } }
-    schema_map: dict[str, dict[str,set[str]]] = {}
-    for stn in stations:
-        at = stn.get('asset_type')
-        for key in stn:
-            if ' – ' not in key:
-                continue
-            section, field = key.split(' – ', 1)
-            schema_map.setdefault(at, {}).setdefault(section, set()).add(field)
+    if schema_map is None:
+        schema_map = _schema_map(stations if schema_source is None else schema_source)
 
     # 2) Back‑fill each station so it has every section/field in its asset_type’s schema
     for stn in stations:
@@ -115,6 +117,217 @@ def get_infrastructure_data():
 
     return stations
 
+def _schema_map(stations: list[dict]) -> dict[str, dict[str, set[str]]]:
+    schema_map: dict[str, dict[str,set[str]]] = {}
+    for stn in stations:
+        at = stn.get('asset_type')
+        for key in stn:
+            if ' – ' not in key:
+                continue
+            section, field = key.split(' – ', 1)
+            schema_map.setdefault(at, {}).setdefault(section, set()).add(field)
+    return schema_map
+
+def _decorate_full_schema(stations: list[dict]) -> list[dict]:
+    """_decorate_stations() for a subset, back-filled against every station's schema."""
+    schema = dm.station_schema()
+    return _decorate_stations(
+        stations,
+        schema_source=None if schema is not None else dm.list_stations(),
+        schema_map=schema
+    )
+
+@eel.expose
+@compressible
+def get_infrastructure_data(columnar: bool = False):
+    """
+    Every station, colour-decorated. With columnar=True the list comes packed
+    by backend.columnar (expand with data_api.js expandColumnar); the schema
+    back-fill is skipped there since each column already spans its asset type.
+    """
+    if columnar:
+        return to_columnar(_decorate_stations(dm.list_stations(), schema_map={}))
+    # the schema registry already holds every asset type's fields; no need to re-derive them
+    return _decorate_stations(dm.list_stations(), schema_map=dm.station_schema())
+
+@eel.expose
+@compressible
+def get_station_summaries(columnar: bool = False):
+    """
+    Every station's core columns (id, name, province, lat, lon, status,
+    asset type) plus its colour: all the map, list and dashboard need.
+    Full records come one at a time from get_station_detail().
+    """
+    stations = _decorate_stations(dm.list_station_summaries(), schema_map={})
+    return to_columnar(stations) if columnar else stations
+
+@eel.expose
+def get_station_detail(station_id):
+    """
+    One station's full record, resolved through the station index and
+    decorated like get_infrastructure_data(): {success, station} or {success, message}.
+    """
+    stn = dm.get_station(station_id)
+    if not stn:
+        return {'success': False, 'message': f"Station '{station_id}' not found."}
+    return {'success': True, 'station': _decorate_full_schema([stn])[0]}
+
+@eel.expose
+def sync_stations_to_db():
+    """
+    Re-run the Excel → SQL station sync (normally once at start-up in SQL mode):
+      {success, inserted, updated, unchanged, db_only, seconds}
+    """
+    return dm.sync_stations_to_db()
+
+@eel.expose
+def get_transport_stats(reset: bool = False):
+    """Raw vs sent bytes per @compressible endpoint since start-up (or the last reset)."""
+    return transport_stats(reset)
+
+@eel.expose
+def get_asset_type_schema(asset_type, location=None):
+    """
+    Ordered field layout of one asset type, without any station data:
+      {asset_type, location, core: [core columns], sections: {section: [fields]}, version}
+    With a location, the layout of that workbook's sheet; otherwise the union over all of them.
+    """
+    return dm.asset_type_schema(asset_type, location)
+
+@eel.expose
+def get_stations_in_bbox(south, west, north, east, limit=None):
+    """
+    Only the stations inside a map viewport (degrees; west > east wraps the
+    antimeridian), decorated like get_infrastructure_data():
+      {stations: [...], total: stations in the box, truncated: bool}
+    `limit` caps how many come back.
+    """
+    res = dm.stations_in_bbox(south, west, north, east, limit)
+    _decorate_full_schema(res['stations'])
+    res['truncated'] = res['total'] > len(res['stations'])
+    return res
+
+@eel.expose
+def get_nearest_stations(lat, lon, k=10, max_km=None):
+    """
+    The k stations nearest to a point, nearest first, decorated like
+    get_infrastructure_data() plus 'distance_km'. max_km caps the distance.
+    """
+    stations = dm.nearest_stations(lat, lon, k, max_km)
+    _decorate_full_schema(stations)
+    return {'stations': stations}
+
+@eel.expose
+def get_stations_within(lat, lon, radius_km, limit=None):
+    """
+    Stations within radius_km of a point, nearest first, with 'distance_km':
+      {stations: [...], total: stations in range, truncated: bool}
+    """
+    res = dm.stations_within(lat, lon, radius_km, limit)
+    _decorate_full_schema(res['stations'])
+    res['truncated'] = res['total'] > len(res['stations'])
+    return res
+
+@eel.expose
+def get_stations_near_station(station_id, k=10, radius_km=None):
+    """
+    Neighbours of one station (itself left out): the k nearest, or every
+    station within radius_km (at most k if k is given too).
+      {success, station, stations: [... with distance_km], total}
+    """
+    res = dm.stations_near_station(station_id, k, radius_km)
+    if res.get('success'):
+        _decorate_full_schema(res['stations'])
+    return res
+
+@eel.expose
+def filter_stations(criteria=None, ids_only: bool = False, limit=None):
+    """
+    Server-side filter over the station indexes.
+      criteria: {field: [values]}, e.g. {"province": [...], "asset_type": [...], "status": ["Active"]}
+    Returns {count, ids} with ids_only, else {count, stations: [decorated records]}.
+    """
+    if ids_only:
+        ids = dm.filter_station_ids(criteria)
+        return {'count': len(ids), 'ids': ids}
+    res = dm.filter_stations(criteria, limit)
+    _decorate_full_schema(res['stations'])
+    return res
+
+@eel.expose
+def search_stations(query: str, limit=50, criteria=None):
+    """
+    Ranked full-text matches for a search box, among the stations matching the
+    filter_stations `criteria` when given:
+      {total, results: [{station_id, name, asset_type, province, score,
+                         highlights: [{field, value, spans: [[start, end], ...]}]}]}
+    """
+    return dm.search_stations(query, limit, criteria)
+
+@eel.expose
+def get_station_clusters(south, west, north, east, zoom, criteria=None):
+    """
+    Marker clusters for a viewport at a Leaflet zoom level:
+      {clusters: [{lat, lon, count, asset_type, province, color}], stations: [decorated lone stations]}
+    `color` is the dominant asset type's colour; criteria as in filter_stations
+    (province / asset_type only).
+    """
+    res = dm.station_clusters(south, west, north, east, zoom, criteria)
+    colors = lookups_store.color_table()
+    for c in res['clusters']:
+        c['color'] = station_color(colors, c['asset_type'], c['province'])
+    _decorate_full_schema(res['stations'])
+    return res
+
+@eel.expose
+def get_filter_hierarchy():
+    """{company: {location: {asset_type: station count}}}"""
+    return dm.filter_hierarchy()
+
+@eel.expose
+def query_station_fields(section, field, op='=', value=None, limit=None):
+    """
+    Stations by one extra field, e.g. ("Site Information", "Year Built", ">=", 1990).
+    op: = != < <= > >= contains. Returns {success, count, stations: [decorated records]}.
+    """
+    res = dm.query_station_fields(section, field, op, value, limit)
+    if res.get('success'):
+        _decorate_full_schema(res['stations'])
+    return res
+
+@eel.expose
+def get_field_summary(section, field):
+    """{success, section, field, count, numeric: {count, min, max, mean, sum} | None, top: [[value, n]]}"""
+    return dm.field_summary(section, field)
+
+@eel.expose
+def get_asset_type_color_table():
+    """
+    Only the colours, for clients that colour markers themselves:
+      {generic: {asset_type: colour}, by_location: {asset_type: {location: colour}}, default}
+    Keys are lower-cased; try by_location, then generic, then default.
+    """
+    return {**lookups_store.color_table(), 'default': '#000000'}
+
+@eel.expose
+def get_station_changes(token=None, summary: bool = False):
+    """
+    Delta since a version token from an earlier call:
+      {token, full: False, upserted: [station records], deleted: [station ids]}
+    or {token, full: True} when the caller must re-fetch get_infrastructure_data()
+    (no token yet, backend restarted, history trimmed, or a colour change).
+    With summary=True the upserted records are get_station_summaries() rows.
+    """
+    delta = dm.changes.since(token)
+    if delta['full'] or not delta['upserted']:
+        return delta
+    changed = dm.get_stations(delta['upserted'], summary=summary)
+    if summary:
+        delta['upserted'] = _decorate_stations(changed, schema_map={})
+    else:
+        delta['upserted'] = _decorate_full_schema(changed)
+    return delta
+
 
 @eel.expose
 def create_new_station(station_obj: dict):
@@ -151,19 +364,7 @@ def get_active_companies():
     """
     Return only those companies whose “active” column is exactly "TRUE".
     """
-    from openpyxl import load_workbook
-    from .lookups_manager import LOOKUPS_PATH
-
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if 'Companies' not in wb.sheetnames:
-        return []
-    ws = wb['Companies']
-    out = []
-    for name, flag in ws.iter_rows(min_row=2, max_col=2, values_only=True):
-        if isinstance(name, str) and isinstance(flag, str) \
-           and flag.strip().upper() == 'TRUE':
-            out.append(name)
-    return out
+    return lookups_store.active_companies()
 
 @eel.expose
 def get_locations_for_company(company_name):
@@ -248,6 +449,47 @@ def delete_station(station_id):
     return dm.delete_station(station_id)
 
 @eel.expose
+def flush_pending_writes():
+    """
+    Write every workbook with pending (write-behind) edits to disk now.
+    Returns {success, saved: [paths], failed: [paths]}.
+    """
+    return workbook_writer.flush()
+
+# ─── Schema migration APIs ──────────────────────────────────────────────────
+@eel.expose
+def migrate_asset_type_schema(asset_type, remove=None, add=None, rename=None):
+    """
+    Queue a background add/remove/rename of columns for one asset type.
+    Returns {success, job}; progress arrives via schemaMigrationProgress(job).
+    """
+    return dm.migrate_asset_type_schema(asset_type, remove=remove, add=add, rename=rename)
+
+@eel.expose
+def get_schema_migration(job_id=None):
+    """One migration job by id, or every recent job when job_id is None."""
+    return dm.get_schema_migration(job_id)
+
+def _push_schema_progress(job: dict):
+    # the UI listens for this; nothing to do if no window is connected yet
+    try:
+        eel.schemaMigrationProgress(job)
+    except Exception:
+        pass
+
+schema_migrator.on_progress(_push_schema_progress)
+
+def _push_data_event(event: dict):
+    # every open view gets each committed change and patches its own caches
+    try:
+        eel.dataChanged(event)
+    except Exception:
+        pass
+
+dm.events.subscribe(_push_data_event)
+
+@eel.expose
+@compressible
 def list_photos(root_dir: str, include_reports: bool = False):
     """
     Return a pruned directory tree:
@@ -371,21 +613,22 @@ def set_asset_type_color(asset_type, color):
     Update the color for an asset type in lookups.xlsx.
     """
     from .lookups_manager import LOOKUPS_PATH
-    from openpyxl import load_workbook
-    wb = load_workbook(LOOKUPS_PATH)
-    if 'AssetTypes' not in wb.sheetnames:
-        return {"success": False, "message": "AssetTypes sheet missing."}
-    ws = wb['AssetTypes']
-    for row in ws.iter_rows(min_row=2, max_col=3):
-        # only match on type
-        if isinstance(row[0].value, str) \
-          and row[0].value.strip().lower() == asset_type.strip().lower() \
-          and ((row[1].value or '').strip() == ''):
-            # this is the “generic” row (no location)
-            row[2].value = color
-            wb.save(LOOKUPS_PATH)
-            return {"success": True}
-    return {"success": False, "message": f"Asset type '{asset_type}' not found."}
+    with workbook_writer.editing(LOOKUPS_PATH):
+        wb = workbook_writer.load(LOOKUPS_PATH)
+        if 'AssetTypes' not in wb.sheetnames:
+            return {"success": False, "message": "AssetTypes sheet missing."}
+        ws = wb['AssetTypes']
+        for row in ws.iter_rows(min_row=2, max_col=3):
+            # only match on type
+            if isinstance(row[0].value, str) \
+              and row[0].value.strip().lower() == asset_type.strip().lower() \
+              and ((row[1].value or '').strip() == ''):
+                # this is the “generic” row (no location)
+                row[2].value = color
+                workbook_writer.save(LOOKUPS_PATH, wb)
+                dm.reset_stations('asset type colour changed', sheet='AssetTypes')
+                return {"success": True}
+        return {"success": False, "message": f"Asset type '{asset_type}' not found."}
 
 # expose the location‑specific color lookup
 @eel.expose
@@ -397,23 +640,25 @@ def get_asset_type_color_for_location(asset_type, location):
 @eel.expose
 def set_asset_type_color_for_location(asset_type, location, color):
     from .lookups_manager import LOOKUPS_PATH
-    from openpyxl import load_workbook
-    wb = load_workbook(LOOKUPS_PATH)
-    ws = wb['AssetTypes']
-    for row in ws.iter_rows(min_row=2, max_col=3):
-        at = row[0].value
-        loc = (row[1].value or '').strip()
-        if (
-          isinstance(at, str)
-          and at.strip().lower() == asset_type.strip().lower()
-          and loc.lower() == location.strip().lower()
-        ):
-            row[2].value = color
-            wb.save(LOOKUPS_PATH)
-            return {"success": True}
-    return {"success": False, "message": f"No row for {asset_type}@{location}"}
-
-@eel.expose
+    with workbook_writer.editing(LOOKUPS_PATH):
+        wb = workbook_writer.load(LOOKUPS_PATH)
+        ws = wb['AssetTypes']
+        for row in ws.iter_rows(min_row=2, max_col=3):
+            at = row[0].value
+            loc = (row[1].value or '').strip()
+            if (
+              isinstance(at, str)
+              and at.strip().lower() == asset_type.strip().lower()
+              and loc.lower() == location.strip().lower()
+            ):
+                row[2].value = color
+                workbook_writer.save(LOOKUPS_PATH, wb)
+                dm.reset_stations('asset type colour changed', sheet='AssetTypes')
+                return {"success": True}
+        return {"success": False, "message": f"No row for {asset_type}@{location}"}
+
+@eel.expose
+@compressible
 def optimize_workplan(payload=None):
     """
     Called by the front-end when the user clicks “Optimize Workplan”.
@@ -581,6 +826,7 @@ def open_file_natively(path: str) -> dict:
 
 
 @eel.expose
+@compressible
 def import_repairs_excel(b64: str) -> dict:
     """
     Parse an .xlsx (first sheet). Return rows as dicts keyed by the EXACT header
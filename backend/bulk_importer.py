@@ -6,8 +6,12 @@ import re
 import openpyxl
 import eel
 import os
+from contextlib import ExitStack
 
 from .lookups_manager import LOCATIONS_DIR
+from .station_cache import station_cache
+from .workbook_writer import workbook_writer
+from .schema_registry import schema_registry
 
 
 def get_sheet_names(base64_data: str):
@@ -66,83 +70,89 @@ def import_sheet_data(
 
     # 4) Batch‑write: one workbook per province
     workbooks = {}  # loc_path -> Workbook
-    sheets = {}     # (loc_path, asset_type) -> Worksheet
-
-    for idx, row_vals in enumerate(data_rows, start=1):
-        rec = dict(zip(headers, row_vals))
-        province = str(location_filter or "").strip()
-        asset_type = str(asset_type_filter or "").strip()
-        sid = str(rec.get("Station ID") or "").strip()
-
-        dm.add_location(province)  # ensures the lookup & workbook exist
-
-        # Prepare the flat row
-        base = {
-            "Station ID": sid,
-            "Asset Type": asset_type,
-            "Site Name":  str(rec.get("Station Name") or "").strip(),
-            "Province":   province,
-            "Latitude":   rec.get("Latitude") or 0,
-            "Longitude":  rec.get("Longitude") or 0,
-            "Status":     str(rec.get("Status") or "UNKNOWN").strip(),
-        }
-
-        # Extras: skip any mapped or redundant columns (including original "Station Name")
-        extras = {}
-        skip_cols = set(base.keys()) | {"Station Name"}
-        for col, val in rec.items():
-            if not col or col in skip_cols:
-                continue
-            parts = re.split(r"\s*[-–]\s*", col, maxsplit=1)
-            if len(parts) == 2:
-                sec, fld = parts
-                extras.setdefault(sec.strip(), {})[fld.strip()] = val
-            else:
-                extras.setdefault("Extra Data", {})[col] = val
-
-        # Flatten extras into full_row
-        full_row = {**base}
-        for sec, fields in extras.items():
-            for fld, val in fields.items():
-                full_row[f"{sec} – {fld}"] = val
-
-        # Load (or reuse) the province workbook
-        loc_path = os.path.join(LOCATIONS_DIR, f"{province}.xlsx")
-        wb_out = workbooks.get(loc_path)
-        if wb_out is None:
-            wb_out = openpyxl.load_workbook(loc_path)
-            workbooks[loc_path] = wb_out
-
-        # Load (or reuse) the asset‑type sheet
-        key = (loc_path, asset_type)
-        ws_out = sheets.get(key)
-        if ws_out is None:
-            if asset_type not in wb_out.sheetnames:
-                ws_out = wb_out.create_sheet(title=asset_type)
-                header_list = list(full_row.keys())
-                for col_idx, heading in enumerate(header_list, start=1):
-                    ws_out.cell(row=2, column=col_idx, value=heading)
-            else:
-                ws_out = wb_out[asset_type]
-                header_list = [c.value for c in ws_out[2]]
-            sheets[key] = ws_out
-        else:
-            header_list = [c.value for c in ws_out[2]]
-
-        # Add any new extra‑section columns to the header
-        missing = [h for h in full_row.keys() if h not in header_list]
-        for new_header in missing:
-            header_list.append(new_header)
-            ws_out.cell(row=2, column=len(header_list), value=new_header)
-
-        # Append the row in the correct column order
-        ws_out.append([full_row.get(h) for h in header_list])
-
-        added += 1
-        eel.updateImportProgress(idx, total)
-
-    # 5) Save every modified workbook once
-    for path, wb in workbooks.items():
-        wb.save(path)
+    sheets = {}     # (loc_path, asset_type) -> (Worksheet, header list kept in step with row 2)
+    imported_ids = []
+
+    with ExitStack() as held:
+        for idx, row_vals in enumerate(data_rows, start=1):
+            rec = dict(zip(headers, row_vals))
+            province = str(location_filter or "").strip()
+            asset_type = str(asset_type_filter or "").strip()
+            sid = str(rec.get("Station ID") or "").strip()
+
+            dm.add_location(province)  # ensures the lookup & workbook exist
+
+            # Prepare the flat row
+            base = {
+                "Station ID": sid,
+                "Asset Type": asset_type,
+                "Site Name":  str(rec.get("Station Name") or "").strip(),
+                "Province":   province,
+                "Latitude":   rec.get("Latitude") or 0,
+                "Longitude":  rec.get("Longitude") or 0,
+                "Status":     str(rec.get("Status") or "UNKNOWN").strip(),
+            }
+
+            # Extras: skip any mapped or redundant columns (including original "Station Name")
+            extras = {}
+            skip_cols = set(base.keys()) | {"Station Name"}
+            for col, val in rec.items():
+                if not col or col in skip_cols:
+                    continue
+                parts = re.split(r"\s*[-–]\s*", col, maxsplit=1)
+                if len(parts) == 2:
+                    sec, fld = parts
+                    extras.setdefault(sec.strip(), {})[fld.strip()] = val
+                else:
+                    extras.setdefault("Extra Data", {})[col] = val
+
+            # Flatten extras into full_row
+            full_row = {**base}
+            for sec, fields in extras.items():
+                for fld, val in fields.items():
+                    full_row[f"{sec} – {fld}"] = val
+
+            # Load (or reuse) the province workbook
+            loc_path = os.path.join(LOCATIONS_DIR, f"{province}.xlsx")
+            wb_out = workbooks.get(loc_path)
+            if wb_out is None:
+                # hold the province workbook until the batch is saved, so no other edit interleaves
+                held.enter_context(workbook_writer.editing(loc_path))
+                wb_out = workbook_writer.load(loc_path)
+                workbooks[loc_path] = wb_out
+
+            # Load (or reuse) the asset‑type sheet
+            key = (loc_path, asset_type)
+            if key not in sheets:
+                if asset_type not in wb_out.sheetnames:
+                    ws_out = wb_out.create_sheet(title=asset_type)
+                    header_list = list(full_row.keys())
+                    for col_idx, heading in enumerate(header_list, start=1):
+                        ws_out.cell(row=2, column=col_idx, value=heading)
+                else:
+                    ws_out = wb_out[asset_type]
+                    # row 2 as the schema registry knows it; read the sheet only if it has no entry
+                    header_list = schema_registry.sheet_headers(loc_path, ws_out)
+                sheets[key] = (ws_out, header_list)
+            ws_out, header_list = sheets[key]
+
+            # Add any new extra‑section columns to the header
+            missing = [h for h in full_row.keys() if h not in header_list]
+            for new_header in missing:
+                header_list.append(new_header)
+                ws_out.cell(row=2, column=len(header_list), value=new_header)
+
+            # Append the row in the correct column order
+            ws_out.append([full_row.get(h) for h in header_list])
+
+            added += 1
+            imported_ids.append(sid)
+            eel.updateImportProgress(idx, total)
+
+        # 5) Save every modified workbook once
+        for path, wb in workbooks.items():
+            workbook_writer.save(path, wb)
+            station_cache.invalidate(path)
+    dm.record_station_changes(upserted=imported_ids)
 
     return {"success": True, "added": added}
@@ -0,0 +1,81 @@
+# backend/change_feed.py
+# Versioned change feed for station data: every committed station write bumps a monotonically increasing
+# version and records which station ids were upserted or deleted, so clients can ask for "what changed since X".
+
+import threading
+import uuid
+from collections import deque
+
+# How many change entries to remember; older tokens get a full-reload answer
+FEED_HISTORY = 5000
+
+
+class ChangeFeed:
+    """
+    Tokens look like "<epoch>.<version>". The epoch is fresh per process, so a
+    token minted before a restart (or data nuke) is never mistaken for a current one.
+    """
+
+    def __init__(self, history: int = FEED_HISTORY):
+        self.epoch    = uuid.uuid4().hex[:8]
+        self.version  = 0
+        self._log     = deque(maxlen=history)    # (version, upserted ids, deleted ids, reset?)
+        self._lock    = threading.Lock()
+
+    @property
+    def token(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    # ─── Writers ────────────────────────────────────────────────────────────
+    def record(self, upserted=(), deleted=()) -> str:
+        """Log a committed write; returns the new token."""
+        up   = {str(s).strip() for s in upserted if s is not None and str(s).strip()}
+        gone = {str(s).strip() for s in deleted if s is not None and str(s).strip()}
+        if not up and not gone:
+            return self.token
+        with self._lock:
+            self.version += 1
+            self._log.append((self.version, up, gone, False))
+            return self.token
+
+    def reset(self) -> str:
+        """Something changed every station (e.g. an asset-type colour); clients must reload."""
+        with self._lock:
+            self.version += 1
+            self._log.append((self.version, set(), set(), True))
+            return self.token
+
+    # ─── Readers ────────────────────────────────────────────────────────────
+    def since(self, token) -> dict:
+        """
+        Net changes after `token`:
+          {'token', 'full': False, 'upserted': [ids], 'deleted': [ids]}
+        or {'token', 'full': True} when the caller has to re-fetch everything
+        (no/unknown token, another process epoch, history trimmed, or a reset).
+        """
+        with self._lock:
+            current = self.token
+            try:
+                epoch, ver = str(token).split('.', 1)
+                ver = int(ver)
+            except (TypeError, ValueError):
+                return {'token': current, 'full': True}
+            if epoch != self.epoch or ver > self.version:
+                return {'token': current, 'full': True}
+            if ver == self.version:
+                return {'token': current, 'full': False, 'upserted': [], 'deleted': []}
+            oldest = self._log[0][0] if self._log else self.version + 1
+            if ver + 1 < oldest:
+                return {'token': current, 'full': True}
+
+            upserted, deleted = set(), set()
+            for v, up, gone, is_reset in self._log:
+                if v <= ver:
+                    continue
+                if is_reset:
+                    return {'token': current, 'full': True}
+                # later entries win: a re-created id is an upsert, a removed one a delete
+                upserted = (upserted - gone) | up
+                deleted  = (deleted - up) | gone
+            return {'token': current, 'full': False,
+                    'upserted': sorted(upserted), 'deleted': sorted(deleted)}
@@ -0,0 +1,264 @@
+# backend/clustering.py
+# Hierarchical grid clustering of station markers. Every zoom level gets a Web-Mercator grid whose cells
+# are ~64 screen pixels wide and nest exactly inside the next coarser level, so a station lives in one
+# cell per level and adding/moving/removing it only touches that chain of cells.
+
+import math
+
+import numpy as np
+
+# Finest zoom with its own grid; deeper zooms reuse it (cells are a few metres wide by then)
+CLUSTER_MAX_ZOOM = 16
+# log2(256 px tile / cell size): 2 → 4 × 4 cells per tile, i.e. 64 px cells
+CELL_SHIFT = 2
+
+_MAX_LAT = 85.05112878   # Web-Mercator cut-off, same as Leaflet's
+
+
+def _mercator(lat: float, lon: float) -> tuple[float, float]:
+    """(x, y) in [0, 1): x east from -180°, y south from the top of the map."""
+    lat = max(-_MAX_LAT, min(_MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+
+
+class ClusterIndex:
+    """
+    levels[z][(cx, cy)] → {(asset_type, province): [count, Σlat, Σlon]}
+    (the finest level adds a 4th slot: the set of member keys)
+
+    Aggregates are kept per (asset_type, province) pair so a query can honour
+    the map's location / asset-type checkboxes without re-clustering.
+    sync(stations, ids) diffs the list (or, with ids, just those stations)
+    against what is indexed and only updates the stations that appeared,
+    vanished or moved.
+    """
+
+    def __init__(self, max_zoom: int = CLUSTER_MAX_ZOOM):
+        self.max_zoom = max_zoom
+        self._levels: list[dict] = [{} for _ in range(max_zoom + 1)]
+        self._members: dict[tuple, tuple] = {}    # key → (lat, lon, pair, station record)
+        self._by_id: dict[str, set] = {}          # station id → keys
+
+    def __len__(self):
+        return len(self._members)
+
+    # ─── Maintenance ────────────────────────────────────────────────────────
+    def _cells(self, lat: float, lon: float):
+        """(zoom, cell) for every level, finest first."""
+        n = 1 << (self.max_zoom + CELL_SHIFT)
+        x, y = _mercator(lat, lon)
+        cx, cy = min(int(x * n), n - 1), min(int(y * n), n - 1)
+        for z in range(self.max_zoom, -1, -1):
+            shift = self.max_zoom - z
+            yield z, (cx >> shift, cy >> shift)
+
+    def _add(self, key, lat: float, lon: float, pair):
+        for z, cell in self._cells(lat, lon):
+            fresh = [0, 0.0, 0.0, set()] if z == self.max_zoom else [0, 0.0, 0.0]
+            agg = self._levels[z].setdefault(cell, {}).setdefault(pair, fresh)
+            agg[0] += 1
+            agg[1] += lat
+            agg[2] += lon
+            if z == self.max_zoom:
+                agg[3].add(key)
+
+    def _remove(self, key, lat: float, lon: float, pair):
+        for z, cell in self._cells(lat, lon):
+            bucket = self._levels[z].get(cell)
+            agg = bucket.get(pair) if bucket else None
+            if agg is None:
+                continue
+            agg[0] -= 1
+            agg[1] -= lat
+            agg[2] -= lon
+            if z == self.max_zoom:
+                agg[3].discard(key)
+            if not agg[0]:
+                del bucket[pair]
+                if not bucket:
+                    del self._levels[z][cell]
+
+    def _build(self, current: dict):
+        """Index every station from scratch, one vectorised group-by per level."""
+        self._levels = [{} for _ in range(self.max_zoom + 1)]
+        self._members = dict(current)
+        self._by_id = {}
+        for key in current:
+            self._by_id.setdefault(key[2], set()).add(key)
+        if not current:
+            return
+        keys  = list(current)
+        lat   = np.array([current[k][0] for k in keys])
+        lon   = np.array([current[k][1] for k in keys])
+        pairs = list(dict.fromkeys(current[k][2] for k in keys))
+        which = {p: i for i, p in enumerate(pairs)}
+        pid   = np.array([which[current[k][2]] for k in keys], dtype=np.int64)
+
+        n = 1 << (self.max_zoom + CELL_SHIFT)
+        clat = np.radians(np.clip(lat, -_MAX_LAT, _MAX_LAT))
+        x = np.clip((lon + 180.0) / 360.0, 0.0, 1.0)
+        y = np.clip(0.5 - np.log((1 + np.sin(clat)) / (1 - np.sin(clat))) / (4 * np.pi), 0.0, 1.0)
+        cx = np.minimum((x * n).astype(np.int64), n - 1)
+        cy = np.minimum((y * n).astype(np.int64), n - 1)
+
+        for z in range(self.max_zoom, -1, -1):
+            shift = self.max_zoom - z
+            gx, gy = cx >> shift, cy >> shift
+            code  = ((gx << (z + CELL_SHIFT)) | gy) * len(pairs) + pid
+            order = np.argsort(code, kind='stable')
+            starts = np.flatnonzero(np.r_[True, np.diff(code[order]) != 0])
+            counts = np.diff(np.r_[starts, len(order)])
+            sum_lat = np.add.reduceat(lat[order], starts)
+            sum_lon = np.add.reduceat(lon[order], starts)
+            firsts = order[starts]
+            level  = self._levels[z]
+            ordered = order.tolist()
+            for a, c, fx, fy, fp, slat, slon in zip(
+                starts.tolist(), counts.tolist(), gx[firsts].tolist(), gy[firsts].tolist(),
+                pid[firsts].tolist(), sum_lat.tolist(), sum_lon.tolist()
+            ):
+                agg = [c, slat, slon]
+                if z == self.max_zoom:
+                    agg.append({keys[i] for i in ordered[a:a + c]})
+                level.setdefault((fx, fy), {})[pairs[fp]] = agg
+
+    def sync(self, stations: list[dict], ids=None) -> dict:
+        """
+        Bring the index in line with `stations`; only changed stations touch
+        the grids. With `ids`, only stations with those ids are looked at (the
+        caller knows nothing else changed). Returns {'added', 'removed', 'moved'} counts.
+        """
+        only = None if ids is None else {str(i).strip() for i in ids}
+        current, seen = {}, {}
+        for stn in stations:
+            if only is not None and str(stn.get('station_id')).strip() not in only:
+                continue
+            lat, lon = stn.get('lat'), stn.get('lon')
+            if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+                continue
+            if not (math.isfinite(lat) and math.isfinite(lon)):
+                continue
+            pair = (stn.get('asset_type'), stn.get('province'))
+            base = (*pair, str(stn.get('station_id')).strip())
+            # duplicate ids in one sheet still get their own slot
+            n = seen.get(base, 0)
+            seen[base] = n + 1
+            current[(*base, n)] = (float(lat), float(lon), pair, stn)
+
+        if not self._members and only is None:
+            self._build(current)
+            return {'added': len(current), 'removed': 0, 'moved': 0}
+
+        if only is None:
+            stale = [k for k in self._members if k not in current]
+        else:
+            stale = [k for sid in only for k in self._by_id.get(sid, ()) if k not in current]
+        added = removed = moved = 0
+        for key in stale:
+            lat, lon, pair, _ = self._members.pop(key)
+            self._remove(key, lat, lon, pair)
+            keys = self._by_id[key[2]]
+            keys.discard(key)
+            if not keys:
+                del self._by_id[key[2]]
+            removed += 1
+        for key, (lat, lon, pair, stn) in current.items():
+            old = self._members.get(key)
+            if old is not None and old[:3] == (lat, lon, pair):
+                self._members[key] = (lat, lon, pair, stn)   # same spot; keep the fresh record
+                continue
+            if old is not None:
+                self._remove(key, *old[:3])
+                moved += 1
+            else:
+                added += 1
+                self._by_id.setdefault(key[2], set()).add(key)
+            self._add(key, lat, lon, pair)
+            self._members[key] = (lat, lon, pair, stn)
+        return {'added': added, 'removed': removed, 'moved': moved}
+
+    # ─── Queries ────────────────────────────────────────────────────────────
+    def _lone_member(self, z: int, cell, allowed):
+        """Key of the one allowed station under `cell`, found by walking down to the finest level."""
+        while z < self.max_zoom:
+            z += 1
+            cx, cy = cell[0] << 1, cell[1] << 1
+            cell = next(
+                c for c in ((cx, cy), (cx + 1, cy), (cx, cy + 1), (cx + 1, cy + 1))
+                if any(allowed(pair) for pair in self._levels[z].get(c, ()))
+            )
+        bucket = self._levels[z][cell]
+        return next(iter(next(agg[3] for pair, agg in bucket.items() if allowed(pair))))
+
+    def query(self, south, west, north, east, zoom, provinces=None, asset_types=None) -> dict:
+        """
+        Clusters of the cells overlapping the box at `zoom`, counting only
+        stations whose province / asset type is allowed (None = any):
+          {'clusters': [{'lat', 'lon', 'count', 'asset_type', 'province'}],
+           'stations': [records of cells holding a single station]}
+        `asset_type` / `province` name the cluster's dominant pair (the most
+        stations; ties go to the alphabetically first name).
+        """
+        z = max(0, min(self.max_zoom, int(zoom)))
+        level = self._levels[z]
+        n = 1 << (z + CELL_SHIFT)
+        provinces   = None if provinces is None else set(provinces)
+        asset_types = None if asset_types is None else set(asset_types)
+
+        def col(lon):
+            return min(max(int(_mercator(0.0, lon)[0] * n), 0), n - 1)
+        y0 = min(int(_mercator(float(north), 0.0)[1] * n), n - 1)
+        y1 = min(int(_mercator(float(south), 0.0)[1] * n), n - 1)
+        west, east = float(west), float(east)
+        x_ranges = [(col(west), col(east))] if west <= east else [(col(west), n - 1), (0, col(east))]
+
+        wanted = sum((x1 - x0 + 1) for x0, x1 in x_ranges) * (y1 - y0 + 1)
+        if wanted <= len(level):
+            cells = [
+                ((cx, cy), level[(cx, cy)])
+                for x0, x1 in x_ranges for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)
+                if (cx, cy) in level
+            ]
+        else:
+            cells = [
+                (cell, bucket) for cell, bucket in level.items()
+                if y0 <= cell[1] <= y1 and any(x0 <= cell[0] <= x1 for x0, x1 in x_ranges)
+            ]
+
+        def allowed(pair):
+            return ((asset_types is None or pair[0] in asset_types)
+                    and (provinces is None or pair[1] in provinces))
+
+        clusters, singles = [], []
+        for cell, bucket in cells:
+            count, sum_lat, sum_lon, by_type, top = 0, 0.0, 0.0, {}, {}
+            for pair, agg in bucket.items():
+                if not allowed(pair):
+                    continue
+                at, prov = pair
+                count   += agg[0]
+                sum_lat += agg[1]
+                sum_lon += agg[2]
+                by_type[at] = by_type.get(at, 0) + agg[0]
+                # ties go to the first name, so the answer doesn't depend on how the cell was filled
+                best = top.get(at)
+                if best is None or agg[0] > best[0] or (agg[0] == best[0] and str(prov) < str(best[1])):
+                    top[at] = (agg[0], prov)
+            if not count:
+                continue
+            if count == 1:
+                key = self._lone_member(z, cell, allowed)
+                singles.append(dict(self._members[key][3]))
+                continue
+            at = min(by_type, key=lambda t: (-by_type[t], str(t)))
+            clusters.append({
+                'lat':        sum_lat / count,
+                'lon':        sum_lon / count,
+                'count':      count,
+                'asset_type': at,
+                'province':   top[at][1],
+            })
+        return {'clusters': clusters, 'stations': singles}
@@ -0,0 +1,73 @@
+# backend/columnar.py
+# Column-oriented wire format for station lists: one block per asset type with an array per column,
+# missing values dropped and marked in a presence bitmap, so the payload no longer grows as
+# stations × union-of-fields. frontend/js/data_api.js (expandColumnar) turns it back into records.
+
+import base64
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def _bitmap(mask: list[bool]) -> str:
+    """Presence bits, bit i = row i (LSB first within each byte), base64-encoded."""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+def _constant(values: list):
+    """(True, v) if every value is the same non-None v of the same type, else (False, None)."""
+    first = values[0]
+    if first is None or len(values) < 2:
+        return False, None
+    kind = type(first)
+    if all(type(v) is kind and v == first for v in values):
+        return True, first
+    return False, None
+
+def to_columnar(stations: list[dict]) -> dict:
+    """
+    Pack station dicts into
+      {'format': 'columnar', 'version': 1, 'count': n,
+       'groups': [{'asset_type', 'rows': [positions in `stations`],
+                   'columns':  [key, ...],
+                   'values':   [[present values of each column], ...],
+                   'present':  [None (all present) | base64 bitmap, ...],
+                   'const':    {key: value shared by every row}}]}
+    A key a station lacks comes back as null, the same as the schema back-fill.
+    """
+    grouped: dict = {}
+    for pos, stn in enumerate(stations):
+        rows, recs = grouped.setdefault(stn.get('asset_type'), ([], []))
+        rows.append(pos)
+        recs.append(stn)
+
+    groups = []
+    for asset_type, (rows, recs) in grouped.items():
+        columns = list(dict.fromkeys(k for stn in recs for k in stn))
+        values, present, const = [], [], {}
+        for col in columns:
+            col_values = [stn.get(col) for stn in recs]
+            is_const, value = _constant(col_values)
+            if is_const:
+                const[col] = value
+                values.append(None)
+                present.append(None)
+                continue
+            mask = [v is not None for v in col_values]
+            if all(mask):
+                values.append(col_values)
+                present.append(None)
+            else:
+                values.append([v for v in col_values if v is not None])
+                present.append(_bitmap(mask))
+        groups.append({
+            'asset_type': asset_type,
+            'rows':       rows,
+            'columns':    columns,
+            'values':     values,
+            'present':    present,
+            'const':      const,
+        })
+
+    return {'format': 'columnar', 'version': FORMAT_VERSION, 'count': len(stations), 'groups': groups}
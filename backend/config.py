@@ -9,3 +9,47 @@ USE_DATABASE = False   # ← set to True when you want SQL mode
 
 # SQLAlchemy URL; e.g. sqlite for dev, later point at Postgres/MySQL
 DB_URL = "sqlite:///data/app.db"
+
+# Pragmas set on every new SQLite connection in SQL mode (ignored for other databases; {} → SQLite's
+# defaults). WAL lets readers run while the single writer commits; synchronous=NORMAL is crash-safe
+# under WAL and skips an fsync per commit. Run `python -m backend.db_benchmark` to compare against the
+# defaults. Excel mode only mirrors writes into the database and keeps the rollback journal (see
+# EXCEL_MODE_PRAGMAS), since WAL is a persistent setting of the file.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous":  "NORMAL",
+    "cache_size":   -64000,         # negative → KiB, i.e. a 64 MB page cache per connection
+    "mmap_size":    256 * 1024**2,  # read pages through a 256 MB memory map
+    "temp_store":   "MEMORY",
+    "busy_timeout": 5000,           # ms a writer waits for the lock instead of failing
+}
+# ...and in Excel mode: SQLite's default journal, which also undoes a WAL left by a SQL-mode run
+EXCEL_MODE_PRAGMAS = {"journal_mode": "DELETE"}
+
+# Connection pool behind DB_URL: connections kept open, extra ones allowed under load,
+# and seconds to wait for a free one
+DB_POOL_SIZE    = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30
+
+# Excel mode keeps parsed station rows in memory; also persist them as binary .npz
+# snapshots under data/cache/ so a restart only re-parses workbooks that changed since
+STATION_CACHE_SNAPSHOTS = True
+
+# Worker processes used to parse location workbooks on a large (cold) load
+# (None → one per CPU core, 1 → read them one after another in-process)
+EXCEL_READ_WORKERS = None
+
+# Excel edits are kept in memory and each dirty workbook is saved once this many
+# seconds after its last edit (0 → save on every edit, like before)
+WRITE_BEHIND_DELAY = 2.0
+
+# Processes used by background schema migrations (column add/remove/rename across
+# every location workbook); None → one per CPU core, 1 → one workbook at a time
+SCHEMA_MIGRATION_WORKERS = None
+
+# Endpoints marked @compressible send results whose JSON is larger than this many
+# bytes as a zlib + base64 envelope (data_api.js unpackResponse inflates it);
+# False → always send plain JSON
+TRANSPORT_COMPRESSION = True
+TRANSPORT_COMPRESS_THRESHOLD = 32 * 1024
@@ -1,11 +1,25 @@
 # backend/data_manager.py
 # Implements the façade that routes reads/writes to whichever BaseRepo implementations are plugged in, handles dual‑writes, and lazy migration.
 import openpyxl
-from .lookups_manager import LOOKUPS_PATH
+from .lookups_manager import LOOKUPS_PATH, lookups_store
 from .excel_repo    import ExcelRepo
 from .db_repo       import DBRepo
 from .persistence   import BaseRepo
 from .config         import USE_DATABASE
+from .workbook_writer import workbook_writer
+from .change_feed    import ChangeFeed
+from .schema_migration import schema_migrator
+from .filter_index   import FilterIndex
+from .clustering     import ClusterIndex
+from .search_index   import SearchIndex
+from .workbook_reader import SUMMARY_FIELDS
+from .spatial_index  import GridIndex, KDTree
+from .db_sync        import StationSync
+from .db_migrations  import migrate
+from .station_fields import OPERATORS, matches, summarize
+from .event_bus      import (
+    EventBus, STATION_UPSERTED, STATION_DELETED, STATIONS_RESET, LOOKUP_CHANGED, SCHEMA_CHANGED
+)
 class DataManager:
     def __init__(
         self,
@@ -19,8 +33,92 @@ class DataManager:
         self.use_db = USE_DATABASE
         self.excel = excel_provider or ExcelRepo()
         self.db    = db_provider    or DBRepo()
+        # version + upserted/deleted ids of every committed station write
+        self.changes = ChangeFeed()
+        # typed change events, published after each committed write (app.py pushes them to the UI)
+        self.events = EventBus()
+        # a finished column migration reshapes every station of that asset type
+        schema_migrator.on_progress(self._schema_migrated)
+        # unsaved workbook changes were dropped (data wiped), some of which clients were already sent
+        workbook_writer.on_discard(lambda path: self.reset_stations("unsaved edits dropped"))
+        # (station-list version, lookups signature) → FilterIndex
+        self._filters = (None, None)
+        # marker clusters per zoom level, patched in place as stations change
+        self._clusters = ClusterIndex()
+        self._clusters_version = None
+        # full-text index, patched with the stations changed since its last sync
+        self._search = SearchIndex()
+        self._search_version = None
+        # SQL mode: (change-feed token, station list, {'grid': GridIndex, 'tree': KDTree}) for map queries
+        self._geo = (None, None, None)
+        # Excel → SQL station sync; in SQL mode it runs once in the background from start-up
+        self.station_sync = StationSync(
+            self.excel, self.db, on_synced=lambda ids: self.record_station_changes(upserted=ids)
+        )
+        if self.use_db:
+            # the SQL store's indexes / backfills; Excel mode never reads them, so it leaves the file alone
+            migrate(self.db.engine)
+            self.station_sync.start()
 
     # ─── Helpers ──────────────────────────────────────────────────────────────
+    def _schema_migrated(self, job: dict):
+        if job['state'] in ('done', 'failed') and job['done']:
+            prev = self.changes.token
+            self.events.publish(
+                SCHEMA_CHANGED, asset_type=job['asset_type'], job=job,
+                prev_token=prev, token=self.changes.reset()
+            )
+
+    def _committed(self, res, upserted=(), deleted=()):
+        """Record a successful station write in the change feed and pass the result through."""
+        if isinstance(res, dict) and res.get("success"):
+            self.record_station_changes(upserted=upserted, deleted=deleted)
+        return res
+
+    def _lookup_written(self, res, *sheets):
+        """Announce a successful lookups.xlsx write and pass the result through."""
+        if isinstance(res, dict):
+            ok = res.get("success") and res.get("added", True)   # "already there" is not a change
+        else:
+            ok = bool(res)
+        if ok:
+            for sheet in sheets:
+                self.events.publish(LOOKUP_CHANGED, sheet=sheet, token=self.changes.token)
+        return res
+
+    # ─── Change events ────────────────────────────────────────────────────────
+    def record_station_changes(self, upserted=(), deleted=()):
+        """
+        Log committed station writes in the change feed and publish them.
+        Events carry the feed token before/after, so a client whose cache is at
+        prev_token can patch it in place and move to token.
+        """
+        prev  = self.changes.token
+        token = self.changes.record(upserted=upserted, deleted=deleted)
+        if token == prev:
+            return token
+        up   = [str(s).strip() for s in upserted if s is not None and str(s).strip()]
+        gone = [str(s).strip() for s in deleted if s is not None and str(s).strip()]
+        if up:
+            self.events.publish(STATION_UPSERTED, ids=up, prev_token=prev, token=token)
+        if gone:
+            self.events.publish(STATION_DELETED, ids=gone, prev_token=prev, token=token)
+        return token
+
+    def reset_stations(self, reason: str, sheet: str | None = None):
+        """
+        Something touched every station (e.g. an asset-type colour): reset the
+        feed and publish it once, as LOOKUP_CHANGED (stations=True) when a
+        lookup sheet is named, else as STATIONS_RESET.
+        """
+        prev  = self.changes.token
+        token = self.changes.reset()
+        if sheet:
+            self.events.publish(LOOKUP_CHANGED, sheet=sheet, stations=True, reason=reason, prev_token=prev, token=token)
+        else:
+            self.events.publish(STATIONS_RESET, reason=reason, prev_token=prev, token=token)
+        return token
+
     def _migrate_locations(self):
         for name in self.excel.get_locations():
             if not self.db.get_location_by_name(name):
@@ -32,9 +130,13 @@ class DataManager:
                 self.db.add_asset_type(name)
 
     def _migrate_stations(self):
-        for rec in self.excel.list_stations():
-            if not self.db.get_station_by_id(rec["station_id"]):
-                self.db.create_station(rec)
+        # the bulk sync runs once per process (db_sync.py); reads only wait for that first pass
+        self.station_sync.wait()
+
+    def sync_stations_to_db(self) -> dict:
+        """Re-run the Excel → SQL station sync now (only new/changed rows are written)."""
+        self.station_sync.start()
+        return self.station_sync.wait()
 
     # ─── Lookups ──────────────────────────────────────────────────────────────
     def get_locations(self):
@@ -54,7 +156,7 @@ class DataManager:
             "message": None if ok else "Location was empty or already existed."
         }
         res_db = self.db.add_location(name)
-        return res_db if self.use_db else res_excel
+        return self._lookup_written(res_db if self.use_db else res_excel, 'Locations')
 
     # ─── Asset Types ─────────────────────────────────────────────────────────
     def get_asset_types(self):
@@ -67,40 +169,325 @@ class DataManager:
         # Both backends return dicts here, so we can just pick one
         res_excel = self.excel.add_asset_type(name)
         res_db    = self.db.add_asset_type(name)
-        return res_db if self.use_db else res_excel
+        return self._lookup_written(res_db if self.use_db else res_excel, 'AssetTypes')
 
     # ─── Stations ─────────────────────────────────────────────────────────────
+    @staticmethod
+    def _db_record(row) -> dict:
+        """
+        Flatten a DBRepo station row tuple (SUMMARY_FIELDS order, then
+        extra_data if selected) into the dict shape the Excel store returns.
+        """
+        rec = dict(zip(SUMMARY_FIELDS, row))
+        if len(row) > len(SUMMARY_FIELDS):
+            for section_name, fields in (row[-1] or {}).items():
+                for field_name, field_value in fields.items():
+                    rec[f"{section_name} – {field_name}"] = field_value
+        return rec
+
     def list_stations(self):
         # If you're in SQL mode, first migrate and then read from the DB
         if self.use_db:
             self._migrate_stations()
-            out = []
-            for s in self.db.list_stations():
-                rec = {
-                    "station_id": s.station_id,
-                    "name":       s.name,
-                    "province":   s.province,
-                    "lat":        s.lat,
-                    "lon":        s.lon,
-                    "status":     s.status,
-                    "asset_type": s.asset_type.name,
-                }
-                extra = s.extra_data or {}
-                for section_name, fields in extra.items():
-                    for field_name, field_value in fields.items():
-                        rec[f"{section_name} – {field_name}"] = field_value
-                out.append(rec)
-            return out
+            # one joined projection query; no ORM objects, no lazy asset-type loads
+            return [self._db_record(r) for r in self.db.list_station_rows()]
 
         # Excel‑only mode: skip any SQL migration and just return the flat rows
         return self.excel.list_stations()
 
+    def iter_stations(self, extra: bool = True):
+        """
+        Station records one at a time. SQL mode streams them from the database
+        in batches (bounded memory); without `extra` only the core columns come back.
+        """
+        if self.use_db:
+            self._migrate_stations()
+            for row in self.db.iter_station_rows(extra=extra):
+                yield self._db_record(row)
+            return
+        yield from (self.excel.list_stations() if extra else self.excel.list_station_summaries())
+
+    def list_station_summaries(self):
+        """Every station's core columns only (SUMMARY_FIELDS), in list_stations() order."""
+        if self.use_db:
+            self._migrate_stations()
+            # extra_data is never selected, so no JSON is decoded
+            return [self._db_record(r) for r in self.db.list_station_rows(extra=False)]
+        return self.excel.list_station_summaries()
+
+    def get_station(self, station_id):
+        """One station's full record (every extra field), or None."""
+        sid = str(station_id).strip()
+        if self.use_db:
+            self._migrate_stations()
+            row = self.db.get_station_row(sid)
+            return self._db_record(row) if row is not None else None
+        return self.excel.get_station(sid)
+
+    def get_stations(self, station_ids, summary: bool = False) -> list[dict]:
+        """
+        Records of the given ids (unknown ids are skipped), resolved one by one
+        or in one IN query rather than by walking the station list. With
+        summary=True only the SUMMARY_FIELDS of each are returned.
+        """
+        ids = sorted({str(i).strip() for i in station_ids})
+        if self.use_db:
+            self._migrate_stations()
+            records = [self._db_record(r) for r in self.db.get_station_rows(ids)]
+        else:
+            records = [r for r in map(self.excel.get_station, ids) if r is not None]
+        if summary:
+            return [{f: r.get(f) for f in SUMMARY_FIELDS} for r in records]
+        return records
+
+    def stations_in_bbox(self, south, west, north, east, limit=None):
+        """
+        Stations with south <= lat <= north and west <= lon <= east
+        (west > east wraps the antimeridian), at most `limit` of them.
+        Returns {stations, total}.
+        """
+        south, west, north, east = (float(v) for v in (south, west, north, east))
+        limit = None if limit is None else int(limit)
+        if not self.use_db:
+            return self.excel.stations_in_bbox(south, west, north, east, limit)
+        stations, grid = self._geo_grid()
+        hits = grid.query(south, west, north, east)
+        total = len(hits)
+        if limit is not None and limit >= 0:
+            hits = hits[:limit]
+        return {"stations": [dict(stations[i]) for i in hits.tolist()], "total": total}
+
+    # ─── Distance queries ─────────────────────────────────────────────────────
+    def _geo_stations(self):
+        """(stations, indexes built over them) for the SQL station list, reloaded when the change feed moves."""
+        token = self.changes.token
+        if self._geo[0] != token:
+            self._geo = (token, self.list_stations(), {})
+        return self._geo[1], self._geo[2]
+
+    def _geo_grid(self):
+        """(stations, GridIndex) over the SQL station list."""
+        stations, built = self._geo_stations()
+        if "grid" not in built:
+            built["grid"] = GridIndex([s["lat"] for s in stations], [s["lon"] for s in stations])
+        return stations, built["grid"]
+
+    def _geo_index(self):
+        """(stations, KDTree) over the SQL station list."""
+        stations, built = self._geo_stations()
+        if "tree" not in built:
+            built["tree"] = KDTree([s["lat"] for s in stations], [s["lon"] for s in stations])
+        return stations, built["tree"]
+
+    def nearest_stations(self, lat, lon, k=10, max_km=None) -> list[dict]:
+        """
+        The k stations nearest to (lat, lon), within max_km if given,
+        nearest first, each with a 'distance_km' key.
+        """
+        max_km = None if max_km is None else float(max_km)
+        if not self.use_db:
+            return self.excel.nearest_stations(float(lat), float(lon), int(k), max_km)
+        stations, tree = self._geo_index()
+        hits, km = tree.nearest(float(lat), float(lon), int(k), max_km)
+        return [dict(stations[i], distance_km=d) for i, d in zip(hits.tolist(), km.tolist())]
+
+    def stations_within(self, lat, lon, radius_km, limit=None) -> dict:
+        """
+        Stations within radius_km of (lat, lon), nearest first, at most
+        `limit` of them, each with 'distance_km'. Returns {stations, total}.
+        """
+        limit = None if limit is None else int(limit)
+        if not self.use_db:
+            return self.excel.stations_within(float(lat), float(lon), float(radius_km), limit)
+        stations, tree = self._geo_index()
+        hits, km = tree.within(float(lat), float(lon), float(radius_km))
+        total = len(hits)
+        if limit is not None and limit >= 0:
+            hits, km = hits[:limit], km[:limit]
+        return {"stations": [dict(stations[i], distance_km=d) for i, d in zip(hits.tolist(), km.tolist())],
+                "total": total}
+
+    def station_coordinates(self, station_ids=None) -> dict:
+        """{station_id: (lat, lon)} of the given stations (all if None) that have coordinates."""
+        wanted = None if station_ids is None else {str(s).strip() for s in station_ids}
+        out = {}
+        for s in self.iter_stations(extra=False):
+            sid = str(s.get("station_id")).strip()
+            lat, lon = s.get("lat"), s.get("lon")
+            if (wanted is None or sid in wanted) and isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+                out.setdefault(sid, (float(lat), float(lon)))
+        return out
+
+    def stations_near_station(self, station_id, k=10, radius_km=None) -> dict:
+        """
+        Neighbours of one station, itself left out: every station within
+        radius_km (nearest first, at most k if k is given too), or else its
+        k nearest. Returns {success, station, stations, total}.
+        """
+        sid = str(station_id).strip()
+        anchor = self.get_station(sid)
+        if not anchor:
+            return {"success": False, "message": f"Station '{station_id}' not found."}
+        lat, lon = anchor.get("lat"), anchor.get("lon")
+        if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+            return {"success": False, "message": f"Station '{station_id}' has no coordinates."}
+
+        def others(stations):
+            return [s for s in stations if str(s.get("station_id")).strip() != sid]
+
+        if radius_km is not None:
+            res = self.stations_within(lat, lon, radius_km)
+            stations = others(res["stations"])
+            total = len(stations)
+            if k is not None and int(k) >= 0:
+                stations = stations[:int(k)]
+        else:
+            # ask for one extra in case the station itself (or a duplicate id) comes back
+            stations = others(self.nearest_stations(lat, lon, int(k) + 1))[:int(k)]
+            total = len(stations)
+        return {"success": True, "station": anchor, "stations": stations, "total": total}
+
+    def _stations_version(self):
+        """Moves whenever list_stations() would change."""
+        return self.changes.token if self.use_db else self.excel.stations_version()
+
+    def _changed_station_ids(self, since) -> set | None:
+        """
+        Ids whose records changed after `since` (a _stations_version() value), or
+        None when that can't be told and the whole list has to be diffed.
+        """
+        if not self.use_db:
+            return self.excel.stations_changed_since(since)
+        delta = self.changes.since(since)
+        if delta['full']:
+            return None
+        return set(delta['upserted']) | set(delta['deleted'])
+
+    # ─── Filter queries ───────────────────────────────────────────────────────
+    def _filter_index(self) -> FilterIndex:
+        """Inverted indexes over the current station list, rebuilt only when stations or lookups change."""
+        stations_version = self._stations_version()
+        key = (stations_version, workbook_writer.signature(LOOKUPS_PATH))
+        if self._filters[0] != key:
+            self._filters = (key, FilterIndex(self.list_stations(), lookups_store.location_companies()))
+        return self._filters[1]
+
+    def filter_stations(self, criteria: dict | None = None, limit=None) -> dict:
+        """
+        criteria: {field: [allowed values]} over company, province, asset_type,
+        status or any other station key; fields AND together, values OR.
+        Returns {count, stations: [matching records in list order, up to `limit`]}.
+        """
+        index = self._filter_index()
+        hits = index.query(criteria)
+        count = len(hits)
+        if limit is not None and int(limit) >= 0:
+            hits = hits[:int(limit)]
+        return {"count": count, "stations": [dict(index.stations[i]) for i in hits]}
+
+    def filter_station_ids(self, criteria: dict | None = None) -> list[str]:
+        """Only the station ids matching `criteria` (see filter_stations)."""
+        index = self._filter_index()
+        return [str(index.stations[i].get("station_id")).strip() for i in index.query(criteria)]
+
+    def filter_hierarchy(self) -> dict:
+        """{company: {location: {asset_type: station count}}}."""
+        return self._filter_index().hierarchy()
+
+    # ─── Extra-field queries ──────────────────────────────────────────────────
+    def query_station_fields(self, section: str, field: str, op: str = "=", value=None, limit=None) -> dict:
+        """
+        Stations whose `Section – Field` value satisfies `op value`
+        (station_fields.OPERATORS), ordered by station id. SQL mode answers
+        from the indexed station_fields table; Excel mode scans the records.
+        Returns {success, count, stations: [records, up to `limit`]}.
+        """
+        if op not in OPERATORS:
+            return {"success": False, "message": f"Unknown operator '{op}'"}
+        limit = None if limit is None or int(limit) < 0 else int(limit)
+        if self.use_db:
+            self._migrate_stations()
+            ids = self.db.station_ids_where_field(section, field, op, value)
+            rows = self.db.get_station_rows(ids if limit is None else ids[:limit])
+            return {"success": True, "count": len(ids), "stations": [self._db_record(r) for r in rows]}
+
+        key = f"{section} – {field}"
+        hits = [s for s in self.excel.list_stations() if matches(s.get(key), op, value)]
+        hits.sort(key=lambda s: str(s.get("station_id")).strip())
+        return {
+            "success":  True,
+            "count":    len(hits),
+            "stations": [dict(s) for s in (hits if limit is None else hits[:limit])],
+        }
+
+    def field_summary(self, section: str, field: str) -> dict:
+        """
+        Aggregate of one extra field over every station:
+        {success, section, field, count, numeric: {count, min, max, mean, sum} or None,
+         top: [[value, stations], ...]}.
+        """
+        if self.use_db:
+            self._migrate_stations()
+            res = self.db.field_summary(section, field)
+        else:
+            key = f"{section} – {field}"
+            res = summarize(s.get(key) for s in self.excel.list_stations())
+        return {"success": True, "section": section, "field": field, **res}
+
+    # ─── Map clustering ───────────────────────────────────────────────────────
+    def station_clusters(self, south, west, north, east, zoom, criteria: dict | None = None) -> dict:
+        """
+        Grid clusters of the stations inside the box at a Leaflet zoom level.
+        criteria may restrict {"province": [...], "asset_type": [...]}.
+        Returns {clusters: [{lat, lon, count, asset_type, province}], stations: [lone stations]}.
+        """
+        version = self._stations_version()
+        if version != self._clusters_version:
+            ids = self._changed_station_ids(self._clusters_version) if len(self._clusters) else None
+            self._clusters.sync(self.list_stations(), ids)
+            self._clusters_version = version
+        criteria = criteria or {}
+        return self._clusters.query(
+            south, west, north, east, zoom,
+            provinces=criteria.get("province"), asset_types=criteria.get("asset_type")
+        )
+
+    def search_stations(self, query: str, limit=50, criteria: dict | None = None) -> dict:
+        """
+        Full-text search over station id, name, status and every extra field,
+        ranked only among the stations matching `criteria` (as filter_stations).
+        Returns {total, results: [{station_id, name, asset_type, province, score,
+        highlights: [{field, value, spans}]}]}, best match first.
+        """
+        version = self._stations_version()
+        if version != self._search_version:
+            ids = self._changed_station_ids(self._search_version) if len(self._search) else None
+            self._search.sync(self.list_stations(), ids)
+            self._search_version = version
+        within = None
+        if criteria:
+            index = self._filter_index()
+            within = {
+                (s.get("asset_type"), s.get("province"), str(s.get("station_id")).strip())
+                for s in (index.stations[i] for i in index.query(criteria))
+            }
+        return self._search.search(query, limit, within)
+
+    def asset_type_schema(self, asset_type: str, location: str | None = None):
+        """Field layout of an asset type for the station editor: {asset_type, location, core, sections, version}."""
+        return self.excel.asset_type_schema(str(asset_type).strip(), location.strip() if location else None)
+
+    def station_schema(self):
+        """Cached {asset_type: {section: {fields}}} in Excel mode; None when the DB is the source."""
+        return None if self.use_db else self.excel.station_schema()
+
     def create_station(self, station_obj: dict):
         self._migrate_asset_types()
         self._migrate_locations()
         x = self.excel.create_station(station_obj)
         d = self.db.create_station(station_obj)
-        return d if self.use_db else x
+        sid = station_obj["generalInfo"]["stationId"]
+        return self._committed(d if self.use_db else x, upserted=[sid])
 
     # ─── Repairs ──────────────────────────────────────────────────────────────
     def save_repair(self, station_id: str, repair_obj: dict):
@@ -123,24 +510,14 @@ class DataManager:
     def add_company(self, name, active: bool = False):
         excel_res = self.excel.add_company(name, active)
         db_res = self.db.add_company(name)
-        return db_res if self.use_db else excel_res
+        return self._lookup_written(db_res if self.use_db else excel_res, 'Companies')
     
     def get_locations_for_company(self, company_name: str):
         if self.use_db:
             return self.db.get_locations_for_company(company_name)
-        # Excel mode: read LOOKUPS_PATH → “Locations” sheet, filter by company in column B
-        from .lookups_manager import LOOKUPS_PATH
-        import openpyxl
-
-        wb = openpyxl.load_workbook(LOOKUPS_PATH, data_only=True)
-        if 'Locations' not in wb.sheetnames:
-            return []
-        ws = wb['Locations']
-        result = []
-        for loc, comp in ws.iter_rows(min_row=2, max_col=2, values_only=True):
-            if isinstance(loc, str) and comp == company_name:
-                result.append(loc)
-        return result
+        # Excel mode: “Locations” sheet of lookups.xlsx, filtered by company in column B
+        from .lookups_manager import lookups_store
+        return lookups_store.locations_for_company(company_name)
 
 
     def get_asset_types_for_location(self, company_name: str, location_name: str):
@@ -152,8 +529,12 @@ class DataManager:
         path = os.path.join(LOCATIONS_DIR, f'{location_name}.xlsx')
         if not os.path.exists(path):
             return []
-        wb = openpyxl.load_workbook(path, read_only=True)
-        return wb.sheetnames
+        wb = workbook_writer.load(path, read_only=True)
+        try:
+            return wb.sheetnames
+        finally:
+            # read-only workbooks hold the file handle open until closed
+            wb.close()
 
     def add_asset_type_under_location(self, asset_type_name: str, company_name: str, location_name: str):
         # --- Excel mode only: record parent and create sheet ---
@@ -170,23 +551,24 @@ class DataManager:
             add_new_location(location_name)
 
         # 3) open and add a new sheet if needed
-        wb = openpyxl.load_workbook(loc_path)
-        if asset_type_name not in wb.sheetnames:
-            # add the new asset-type sheet
-            ws = wb.create_sheet(title=asset_type_name)
-            # remove the default blank sheet if it's still there
-            if 'Sheet' in wb.sheetnames:
-                wb.remove(wb['Sheet'])
-            headers = [
-                'Station ID','Asset Type','Site Name',
-                'Province','Latitude','Longitude',
-                'Status'
-            ]
-            for idx, col in enumerate(headers, start=1):
-                ws.cell(row=2, column=idx, value=col)
-            wb.save(loc_path)
-            return {"success": True, "added": True}
-        return {"success": True, "added": False}
+        with workbook_writer.editing(loc_path):
+            wb = workbook_writer.load(loc_path)
+            if asset_type_name not in wb.sheetnames:
+                # add the new asset-type sheet
+                ws = wb.create_sheet(title=asset_type_name)
+                # remove the default blank sheet if it's still there
+                if 'Sheet' in wb.sheetnames:
+                    wb.remove(wb['Sheet'])
+                headers = [
+                    'Station ID','Asset Type','Site Name',
+                    'Province','Latitude','Longitude',
+                    'Status'
+                ]
+                for idx, col in enumerate(headers, start=1):
+                    ws.cell(row=2, column=idx, value=col)
+                workbook_writer.save(loc_path, wb)
+                return self._lookup_written({"success": True, "added": True}, 'AssetTypes')
+            return self._lookup_written({"success": True, "added": False}, 'AssetTypes')
 
     def add_location_under_company(self, location_name: str, company_name: str):
         if self.use_db:
@@ -197,7 +579,7 @@ class DataManager:
         ok = update_lookup_parent('Locations', location_name, company_name)
         # 2) ensure the physical workbook exists
         add_new_location(location_name)
-        return {"success": ok}
+        return self._lookup_written({"success": ok}, 'Locations')
 
 
 
@@ -225,7 +607,7 @@ class DataManager:
         if not os.path.exists(path):
             return {"success": False, "message": f"No workbook for location '{location_name}'"}
 
-        wb = openpyxl.load_workbook(path, data_only=True)
+        wb = workbook_writer.load(path, data_only=True)
         if sheet_name not in wb.sheetnames:
             return {"success": False, "message": f"Sheet '{sheet_name}' not found"}
 
@@ -269,19 +651,36 @@ class DataManager:
         # first update Excel, then DB (or vice‑versa)
         res_xl = self.excel.update_station(station_obj)
         res_db = self.db.update_station(station_obj)
-        return res_db if self.use_db else res_xl
+        sid = station_obj["generalInfo"]["stationId"]
+        return self._committed(res_db if self.use_db else res_xl, upserted=[sid])
 
     def delete_station(self, station_id: str):
         # need to know province+asset_type for Excel delete
-        # find the record in the flat Excel list
-        recs = self.excel.list_stations()
-        target = next((r for r in recs if r["station_id"] == station_id), None)
+        # resolve it through the station index instead of listing every station
+        target = self.excel.find_station(station_id)
         if not target:
             return {"success": False, "message": f"Station '{station_id}' not found."}
 
         res_xl = self.excel.delete_station(target)
         res_db = self.db.delete_station(station_id)
-        return res_db if self.use_db else res_xl
+        return self._committed(res_db if self.use_db else res_xl, deleted=[station_id])
+
+    # ─── Schema migrations (Excel) ───────────────────────────────────────────
+    def migrate_asset_type_schema(self, asset_type: str, remove=None, add=None, rename=None):
+        """
+        Queue a background column change for one asset type across every
+        location workbook. Returns {success, job} straight away; follow the
+        job with get_schema_migration(job['id']).
+        """
+        if not (asset_type or '').strip():
+            return {"success": False, "message": "Missing asset type"}
+        if not (remove or add or rename):
+            return {"success": False, "message": "Nothing to migrate"}
+        job = schema_migrator.submit(asset_type, remove=remove, add=add, rename=rename)
+        return {"success": True, "job": job}
+
+    def get_schema_migration(self, job_id: str = None):
+        return schema_migrator.status(job_id)
 
     # ─── Merge-only: fill blank existing fields for one station ─────────────
     def merge_fields_for_station(self, station_id: str, col_values: dict):
@@ -296,5 +695,5 @@ class DataManager:
                 res_db = self.db.merge_fields_for_station(station_id, col_values)  # type: ignore[attr-defined]
             except Exception:
                 res_db = {"success": True, "updated": 0, "checked": res_xl.get("checked", 0)}
-            return res_db
-        return res_xl
+            return self._committed(res_db, upserted=[station_id] if res_db.get("updated") else [])
+        return self._committed(res_xl, upserted=[station_id] if res_xl.get("updated") else [])
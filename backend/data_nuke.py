@@ -6,6 +6,7 @@ import sys
 import eel
 from .lookups_manager import DATA_DIR, LOCATIONS_DIR, REPAIRS_DIR
 from .config import DB_URL
+from .workbook_writer import workbook_writer
 
 @eel.expose
 def data_nuke():
@@ -18,6 +19,8 @@ def data_nuke():
             dm.db.engine.dispose()
     except Exception:
         pass
+    # unsaved write-behind edits must not be flushed back over the wiped folder
+    workbook_writer.discard()
 
     patterns = [
         os.path.join(DATA_DIR, '*.xlsx'),
@@ -25,6 +28,7 @@ def data_nuke():
         os.path.join(REPAIRS_DIR, '*.xlsx'),
         os.path.join(LOCATIONS_DIR, '*.xlsx'),
         os.path.join(DATA_DIR, 'repairs', '*.xlsx'),
+        os.path.join(DATA_DIR, 'cache', '*'),
     ]
 
     # Also delete the SQLite file(s) created by SQLAlchemy in the project root’s data/ folder
@@ -0,0 +1,151 @@
+# backend/db_benchmark.py
+# Compares the tuned SQLite engine profile (config.SQLITE_PRAGMAS + pooled connections) with a plain
+# create_engine() on a throw-away database: single-row commits, bulk inserts, full and point reads,
+# and point reads running alongside a writer.
+#
+#   python -m backend.db_benchmark [--rows 20000] [--commits 500] [--readers 4] [--seconds 3]
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+from .db_repo import DBRepo, Station, AssetType, make_engine
+from .db_migrations import migrate
+
+
+def _stations(n: int, at_id: int, start: int = 0) -> list[dict]:
+    rnd = random.Random(start)
+    return [{
+        'station_id':    f'BM{i:07d}',
+        'name':          f'Benchmark station {i}',
+        'province':      rnd.choice(('Western Cape', 'Gauteng', 'Limpopo', 'Free State')),
+        'lat':           rnd.uniform(-35, -22),
+        'lon':           rnd.uniform(16, 33),
+        'status':        rnd.choice(('Active', 'Planned', 'Closed')),
+        'asset_type_id': at_id,
+        'extra_data':    {'General': {'Owner': f'Owner {i % 50}', 'Notes': 'x' * 40}},
+    } for i in range(start, start + n)]
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def run_profile(engine, rows: int, commits: int, readers: int, seconds: float) -> dict:
+    """Every measurement for one engine; rates are operations per second."""
+    db = DBRepo(engine=engine, index_fields=True)
+    migrate(engine)     # the indexes SQL mode runs with
+    with db.Session() as s:
+        at = AssetType(name='Benchmark')
+        s.add(at)
+        s.commit()
+        at_id = at.id
+    out = {}
+
+    # one bulk transaction, like the Excel → SQL sync
+    t0 = time.perf_counter()
+    with db.Session() as s:
+        s.bulk_insert_mappings(Station, _stations(rows, at_id))
+        s.commit()
+    out['bulk insert rows/s'] = _rate(rows, time.perf_counter() - t0)
+
+    # one commit per row, like add/update station from the UI
+    fresh = _stations(commits, at_id, start=rows)
+    t0 = time.perf_counter()
+    for rec in fresh:
+        with db.Session() as s:
+            s.add(Station(**rec))
+            s.commit()
+    out['single-row commits/s'] = _rate(commits, time.perf_counter() - t0)
+
+    total = rows + commits
+    t0 = time.perf_counter()
+    for _ in range(3):
+        db.list_station_rows()
+    out['full reads rows/s'] = _rate(3 * total, time.perf_counter() - t0)
+
+    ids = [f'BM{i:07d}' for i in range(total)]
+    rnd = random.Random(1)
+    t0 = time.perf_counter()
+    for _ in range(2000):
+        db.get_station_row(rnd.choice(ids))
+    out['point reads/s'] = _rate(2000, time.perf_counter() - t0)
+
+    # readers keep going while one writer commits row by row
+    stop = threading.Event()
+    counts = [0] * (readers + 1)
+    errors = []
+
+    def reader(slot):
+        r = random.Random(slot)
+        try:
+            while not stop.is_set():
+                db.get_station_row(r.choice(ids))
+                counts[slot] += 1
+        except Exception as e:
+            errors.append(e)
+
+    def writer():
+        r = random.Random(0)
+        try:
+            while not stop.is_set():
+                with db.Session() as s:
+                    s.query(Station).filter(Station.station_id == r.choice(ids)) \
+                     .update({'status': r.choice(('Active', 'Planned', 'Closed'))})
+                    s.commit()
+                counts[readers] += 1
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    out['mixed reads/s'] = _rate(sum(counts[:readers]), seconds)
+    out['mixed writes/s'] = _rate(counts[readers], seconds)
+    out['mixed errors'] = len(errors)
+
+    engine.dispose()
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Tuned vs default SQLite engine throughput')
+    p.add_argument('--rows', type=int, default=20000, help='stations bulk-inserted up front')
+    p.add_argument('--commits', type=int, default=500, help='stations added one commit at a time')
+    p.add_argument('--readers', type=int, default=4, help='reader threads in the mixed test')
+    p.add_argument('--seconds', type=float, default=3.0, help='length of the mixed test')
+    args = p.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='db_benchmark_')
+    try:
+        results = {}
+        for label, factory in (
+            ('defaults', lambda url: create_engine(url, echo=False)),
+            ('tuned',    lambda url: make_engine(url)),
+        ):
+            url = f"sqlite:///{os.path.join(tmp, label + '.db')}"
+            print(f"[db_benchmark] running {label} …")
+            results[label] = run_profile(factory(url), args.rows, args.commits, args.readers, args.seconds)
+
+        print(f"\n{'':24}{'defaults':>14}{'tuned':>14}{'speed-up':>10}")
+        for metric in results['defaults']:
+            a, b = results['defaults'][metric], results['tuned'][metric]
+            ratio = f"{b / a:.1f}×" if a and metric != 'mixed errors' else ''
+            print(f"{metric:24}{a:>14,.0f}{b:>14,.0f}{ratio:>10}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# backend/db_migrations.py
+# Versioned schema migrations for the SQL store. Base.metadata.create_all only creates missing tables,
+# so anything added to an existing table (indexes, columns) ships here as a numbered step. DataManager
+# runs migrate() on startup in SQL mode only; each pending step and its schema_migrations row commit in
+# one transaction.
+
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, inspect, select, text
+
+from .db_repo import Base, Station, StationField, ID_CHUNK_SIZE, write_station_fields
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version",     Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at",  DateTime, nullable=False),
+)
+
+
+def _create_indexes(conn, *names: str):
+    """Create the named model indexes (declared in db_repo.py) that the database lacks."""
+    declared = {ix.name: ix for table in Base.metadata.tables.values() for ix in table.indexes}
+    for name in names:
+        declared[name].create(conn, checkfirst=True)
+
+
+# ─── Migrations ─────────────────────────────────────────────────────────────
+def _v1_station_filters(conn):
+    # province / status / asset-type filters, and asset type + province pairs (map checkboxes, clusters);
+    # the composite's leading asset_type_id also serves the stations → asset_types join
+    _create_indexes(conn, "ix_stations_province", "ix_stations_status", "ix_stations_asset_type_province")
+
+def _v2_foreign_keys(conn):
+    # repairs by station, and the name-under-parent lookups of locations / asset types
+    # (leading company_id / location_id also serve the relationship loads)
+    _create_indexes(
+        conn,
+        "ix_repairs_station_id",
+        "ix_locations_name", "ix_locations_company_name",
+        "ix_asset_types_name", "ix_asset_types_location_name",
+    )
+
+def _v3_station_fields(conn):
+    # create_all made the table; fill it from every station's extra_data, a page of ids at a time
+    conn.execute(delete(StationField))
+    last = None
+    while True:
+        q = select(Station.station_id, Station.extra_data).order_by(Station.station_id).limit(ID_CHUNK_SIZE)
+        if last is not None:
+            q = q.where(Station.station_id > last)
+        page = conn.execute(q).all()
+        if not page:
+            break
+        write_station_fields(conn, page)
+        last = page[-1][0]
+
+
+# (version, description, step) in order; never renumber or edit a released step, add a new one
+MIGRATIONS = [
+    (1, "index station filter columns", _v1_station_filters),
+    (2, "index foreign keys and lookup names", _v2_foreign_keys),
+    (3, "fill station_fields from extra_data", _v3_station_fields),
+]
+
+
+# ─── Runner ─────────────────────────────────────────────────────────────────
+def current_version(engine) -> int:
+    if not inspect(engine).has_table(schema_migrations.name):
+        return 0
+    with engine.connect() as conn:
+        versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+def migrate(engine) -> list[int]:
+    """Apply every pending migration in order; returns the versions applied."""
+    _meta.create_all(engine)
+    done = current_version(engine)
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= done:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.datetime.now(),
+            ))
+        applied.append(version)
+        print(f"[db_migrations] ✅ v{version}: {description}")
+
+    if applied and engine.dialect.name == "sqlite":
+        # refresh planner statistics so the new indexes get used
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    return applied
@@ -3,20 +3,68 @@
 
 from sqlalchemy import (
     create_engine,
+    event,
     Column,
     Integer,
     String,
     Float,
     ForeignKey,
+    Index,
     JSON,
+    delete,
+    func,
 )
 
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
-from .config            import DB_URL
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, joinedload, attributes
+from sqlalchemy.pool import QueuePool, StaticPool
+from .config            import (
+    DB_URL, SQLITE_PRAGMAS, EXCEL_MODE_PRAGMAS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, USE_DATABASE
+)
 from .persistence      import BaseRepo
+from .station_fields   import field_rows, field_number, field_text, OPERATORS, SUMMARY_TOP_VALUES
 
 Base = declarative_base()
 
+# Rows fetched per round trip when streaming stations with iter_station_rows()
+STATION_STREAM_BATCH = 1000
+# Ids per IN (...) list (SQLite caps bound parameters) and per station_fields rewrite
+ID_CHUNK_SIZE = 500
+
+
+def make_engine(url: str = DB_URL, pragmas: dict | None = None):
+    """
+    Engine with the configured profile: a sized connection pool, and for
+    SQLite the SQLITE_PRAGMAS (or `pragmas`) run on every new connection.
+    """
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url, echo=False, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT, pool_pre_ping=True,
+        )
+
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # one shared in-memory database; a pool of separate connections would each see an empty one
+        engine = create_engine(
+            url, echo=False, poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+    else:
+        engine = create_engine(
+            url, echo=False, poolclass=QueuePool, pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT,
+            # pooled connections move between threads (gevent's threadpool, the benchmark)
+            connect_args={"check_same_thread": False},
+        )
+
+    if pragmas:
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+    return engine
+
 
 class Station(Base):
     __tablename__ = "stations"
@@ -31,6 +79,72 @@ class Station(Base):
     repairs        = relationship("Repair", back_populates="station")
     # store all user‑added extraSections as JSON
     extra_data     = Column(JSON, nullable=True, default={})
+    # existing databases get these through db_migrations.py
+    __table_args__ = (
+        Index("ix_stations_province", "province"),
+        Index("ix_stations_status", "status"),
+        Index("ix_stations_asset_type_province", "asset_type_id", "province"),
+    )
+
+class StationHash(Base):
+    """Content hash of each station's Excel row as of the last Excel → SQL sync (db_sync.py)."""
+    __tablename__ = "station_hashes"
+    station_id   = Column(String, ForeignKey("stations.station_id"), primary_key=True)
+    content_hash = Column(String, nullable=False)
+
+class StationField(Base):
+    """
+    One non-blank extra_data value per row, so extra fields can be filtered and
+    aggregated in SQL. Mirrors Station.extra_data, which stays the record format;
+    kept in step by the session hooks below and by db_sync's bulk writes (SQL
+    mode only; Excel mode just drops the rows of deleted stations).
+    """
+    __tablename__ = "station_fields"
+    station_id = Column(String, ForeignKey("stations.station_id"), primary_key=True)
+    section    = Column(String, primary_key=True)
+    field      = Column(String, primary_key=True)
+    value_text = Column(String, nullable=False)
+    value_num  = Column(Float)      # set when the value reads as a number
+    # value_text.casefold(), for `contains`: SQL lower() only folds ASCII
+    value_folded = Column(String, nullable=False)
+    __table_args__ = (
+        Index("ix_station_fields_text", "section", "field", "value_text"),
+        Index("ix_station_fields_num", "section", "field", "value_num"),
+    )
+
+
+def write_station_fields(conn, items):
+    """Replace the station_fields rows of every (station_id, extra_data) in `items`."""
+    items = list(items)
+    for i in range(0, len(items), ID_CHUNK_SIZE):
+        chunk = items[i:i + ID_CHUNK_SIZE]
+        conn.execute(delete(StationField).where(StationField.station_id.in_([sid for sid, _ in chunk])))
+        rows = [row for sid, extra in chunk for row in field_rows(sid, extra)]
+        if rows:
+            # plain table insert: one executemany, without the ORM bulk-insert bookkeeping
+            conn.execute(StationField.__table__.insert(), rows)
+
+def _fields_before_flush(session, _context, _instances):
+    # deleted stations drop their field rows first (the FK points at them);
+    # new / re-assigned extra_data is written once the station rows exist
+    gone = [st.station_id for st in session.deleted if isinstance(st, Station)]
+    if gone:
+        session.connection().execute(delete(StationField).where(StationField.station_id.in_(gone)))
+    if not session.info.get("index_fields"):
+        return
+    pending = session.info.setdefault("station_fields", {})
+    for st in session.new:
+        if isinstance(st, Station):
+            pending[st.station_id] = st.extra_data
+    for st in session.dirty:
+        if isinstance(st, Station) and attributes.get_history(st, "extra_data").has_changes():
+            pending[st.station_id] = st.extra_data
+
+def _fields_after_flush(session, _context):
+    pending = session.info.pop("station_fields", None)
+    if pending:
+        write_station_fields(session.connection(), pending.items())
+
 
 class Repair(Base):
     __tablename__ = "repairs"
@@ -44,12 +158,22 @@ class Repair(Base):
     priority   = Column(Integer)
     category   = Column(String)
     station    = relationship("Station", back_populates="repairs")
+    __table_args__ = (Index("ix_repairs_station_id", "station_id"),)
 
 class DBRepo(BaseRepo):
-    def __init__(self):
-        self.engine = create_engine(DB_URL, echo=False)
+    def __init__(self, engine=None, index_fields: bool = USE_DATABASE):
+        if engine is None:
+            engine = make_engine(pragmas=SQLITE_PRAGMAS if USE_DATABASE else EXCEL_MODE_PRAGMAS)
+        self.engine = engine
         Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        # station_fields is written only where it is queried and migrated (SQL mode); the Excel → SQL
+        # sync rewrites the rows of stations changed in Excel mode once SQL mode starts
+        self.index_fields = index_fields
+        self.Session = sessionmaker(
+            bind=self.engine, expire_on_commit=False, info={"index_fields": index_fields}
+        )
+        event.listen(self.Session, "before_flush", _fields_before_flush)
+        event.listen(self.Session, "after_flush", _fields_after_flush)
 
     # ─── Lookups ─────────────────────────────────────────
     def list_locations(self):
@@ -96,11 +220,101 @@ class DBRepo(BaseRepo):
     # ─── Stations ────────────────────────────────────────
     def list_stations(self):
         with self.Session() as s:
-            return s.query(Station).all()
+            return s.query(Station).options(joinedload(Station.asset_type)).all()
+
+    @staticmethod
+    def _station_rows(s, extra: bool = True):
+        """
+        Projection of the columns a station record needs, asset type joined in:
+        (station_id, name, province, lat, lon, status, asset_type[, extra_data]) tuples.
+        """
+        cols = [
+            Station.station_id, Station.name, Station.province,
+            Station.lat, Station.lon, Station.status,
+            AssetType.name.label("asset_type"),
+        ]
+        if extra:
+            cols.append(Station.extra_data)
+        return s.query(*cols).outerjoin(AssetType, Station.asset_type_id == AssetType.id)
+
+    def list_station_rows(self, extra: bool = True) -> list:
+        """Every station as a plain row tuple, in one query (see _station_rows)."""
+        with self.Session() as s:
+            return self._station_rows(s, extra).all()
+
+    def iter_station_rows(self, extra: bool = True, batch_size: int = STATION_STREAM_BATCH):
+        """
+        Stream station row tuples `batch_size` at a time; memory stays bounded
+        however many stations there are. The session is held until the
+        iterator is exhausted or closed.
+        """
+        with self.Session() as s:
+            yield from self._station_rows(s, extra).yield_per(batch_size)
+
+    def get_station_row(self, sid: str):
+        """One station's row tuple (with extra_data), or None."""
+        with self.Session() as s:
+            return self._station_rows(s).filter(Station.station_id == sid).first()
+
+    def get_station_rows(self, ids) -> list:
+        """Row tuples (with extra_data) of the given station ids, ordered by station id."""
+        ids = list(ids)
+        rows = []
+        with self.Session() as s:
+            for i in range(0, len(ids), ID_CHUNK_SIZE):
+                rows.extend(self._station_rows(s).filter(Station.station_id.in_(ids[i:i + ID_CHUNK_SIZE])))
+        rows.sort(key=lambda r: r[0])
+        return rows
+
+    # ─── Extra fields (station_fields) ──────────────────
+    @staticmethod
+    def _field_condition(op: str, value):
+        """WHERE clause on station_fields for `op value` (see station_fields.OPERATORS)."""
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}'; expected one of {', '.join(OPERATORS)}")
+        if op == "contains":
+            return StationField.value_folded.contains(str(value).casefold(), autoescape=True)
+        number = field_number(value)
+        column, target = (
+            (StationField.value_num, number) if number is not None
+            else (StationField.value_text, field_text(value) or "")
+        )
+        return {
+            "=":  column == target, "!=": column != target,
+            "<":  column < target,  "<=": column <= target,
+            ">":  column > target,  ">=": column >= target,
+        }[op]
+
+    def station_ids_where_field(self, section: str, field: str, op: str = "=", value=None) -> list[str]:
+        """Ids of stations whose `section – field` value satisfies `op value`, sorted."""
+        cond = self._field_condition(op, value)
+        with self.Session() as s:
+            q = (s.query(StationField.station_id)
+                  .filter(StationField.section == section, StationField.field == field, cond)
+                  .order_by(StationField.station_id))
+            return [sid for (sid,) in q]
+
+    def field_summary(self, section: str, field: str, top: int = SUMMARY_TOP_VALUES) -> dict:
+        """Same shape as station_fields.summarize(), computed in the database."""
+        where = (StationField.section == section, StationField.field == field)
+        with self.Session() as s:
+            count, n, lo, hi, mean, total = s.query(
+                func.count(), func.count(StationField.value_num), func.min(StationField.value_num),
+                func.max(StationField.value_num), func.avg(StationField.value_num),
+                func.sum(StationField.value_num),
+            ).filter(*where).one()
+            ranked = (s.query(StationField.value_text, func.count().label("n"))
+                       .filter(*where).group_by(StationField.value_text)
+                       .order_by(func.count().desc(), StationField.value_text).limit(top).all())
+        numeric = None
+        if n:
+            numeric = {"count": n, "min": lo, "max": hi, "mean": float(mean), "sum": float(total)}
+        return {"count": count, "numeric": numeric, "top": [[v, c] for v, c in ranked]}
 
     def get_station_by_id(self, sid: str):
         with self.Session() as s:
-            return s.query(Station).filter_by(station_id=sid).first()
+            # load the asset type with it; the row is used after the session closes
+            return s.query(Station).options(joinedload(Station.asset_type)).filter_by(station_id=sid).first()
 
     def create_station(self, station_obj: dict):
         # 1) Create the core Station row if it doesn't already exist
@@ -274,6 +488,8 @@ class DBRepo(BaseRepo):
             st = s.query(Station).filter_by(station_id=station_id).first()
             if not st:
                 return {"success": False, "message": f"Station '{station_id}' not found"}
+            # its sync hash goes too, or re-adding the id in Excel would collide with it on the next sync
+            s.execute(delete(StationHash).where(StationHash.station_id == station_id))
             s.delete(st)
             s.commit()
         return {"success": True}
@@ -342,6 +558,10 @@ class Location(Base):
     company_id = Column(Integer, ForeignKey("companies.id"))
     company = relationship("Company", back_populates="locations")
     asset_types = relationship("AssetType", back_populates="location")
+    __table_args__ = (
+        Index("ix_locations_name", "name"),
+        Index("ix_locations_company_name", "company_id", "name"),
+    )
 
 
 class AssetType(Base):
@@ -350,4 +570,8 @@ class AssetType(Base):
     name = Column(String, nullable=False)
     location_id = Column(Integer, ForeignKey("locations.id"))
     location = relationship("Location", back_populates="asset_types")
-    stations = relationship("Station", back_populates="asset_type")
\ No newline at end of file
+    stations = relationship("Station", back_populates="asset_type")
+    __table_args__ = (
+        Index("ix_asset_types_name", "name"),
+        Index("ix_asset_types_location_name", "location_id", "name"),
+    )
@@ -0,0 +1,169 @@
+# backend/db_sync.py
+# Bulk Excel → SQL station sync. Reads the Excel inventory once, diffs it against the stations table by
+# a per-row content hash, and writes only new or changed rows with chunked bulk inserts/updates.
+# Runs once in a background greenlet when SQL mode starts, instead of on every read.
+
+import datetime
+import hashlib
+import json
+import time
+
+import gevent
+from sqlalchemy import delete
+
+from .db_repo import Station, StationHash, AssetType, write_station_fields
+
+# Rows per bulk INSERT / UPDATE statement batch; the diff also yields to other greenlets this often
+SYNC_CHUNK_SIZE = 500
+
+
+def _json_safe(value):
+    """Cell values as the JSON column can store them (dates → ISO strings)."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+def station_row(rec: dict) -> dict:
+    """
+    A flat Excel station record as stations-table columns (without asset_type_id):
+    `Section – Field` keys nest into extra_data {section: {field: value}}.
+    """
+    extra = {}
+    for key, value in rec.items():
+        if isinstance(key, str) and ' – ' in key:
+            section, field = key.split(' – ', 1)
+            extra.setdefault(section, {})[field] = _json_safe(value)
+    return {
+        'station_id': str(rec.get('station_id')).strip(),
+        'name':       _json_safe(rec.get('name')),
+        'province':   _json_safe(rec.get('province')),
+        'lat':        rec.get('lat'),
+        'lon':        rec.get('lon'),
+        'status':     _json_safe(rec.get('status')),
+        'extra_data': extra,
+    }
+
+def content_hash(rec: dict) -> str:
+    """Hash of a flat Excel station record (keys in sheet column order, values as written)."""
+    payload = json.dumps(rec, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def _chunks(rows: list, size: int = SYNC_CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+class StationSync:
+    """
+    start()  → kick off a sync in the background (no-op while one is running)
+    wait()   → block until the current/first sync finished; returns its result
+    run()    → sync now: {success, inserted, updated, unchanged, db_only, seconds}
+
+    `on_synced(ids)` is called after a sync that changed rows, with the
+    inserted/updated station ids, so the caller can publish them.
+    """
+
+    def __init__(self, excel, db, on_synced=None):
+        self.excel     = excel
+        self.db        = db
+        self.on_synced = on_synced
+        self._job      = None
+        self.last: dict | None = None
+
+    # ─── Scheduling ─────────────────────────────────────────────────────────
+    def start(self):
+        if self._job is None or self._job.ready():
+            self._job = gevent.spawn(self.run)
+        return self._job
+
+    def wait(self, timeout=None) -> dict | None:
+        job = self._job if self._job is not None else self.start()
+        job.join(timeout)
+        return self.last
+
+    # ─── The sync itself ────────────────────────────────────────────────────
+    def _asset_type_ids(self, s, names: set) -> dict:
+        """{asset type name: id}, creating any that are missing (first row wins on duplicates)."""
+        ids = {}
+        for at_id, name in s.query(AssetType.id, AssetType.name).order_by(AssetType.id):
+            ids.setdefault(name, at_id)
+        missing = sorted(n for n in names if n not in ids)
+        if missing:
+            s.bulk_insert_mappings(AssetType, [{'name': n} for n in missing])
+            s.flush()
+            for at_id, name in s.query(AssetType.id, AssetType.name).filter(AssetType.name.in_(missing)):
+                ids.setdefault(name, at_id)
+        return ids
+
+    def run(self) -> dict:
+        t0 = time.perf_counter()
+        try:
+            # one pass over the Excel inventory; duplicate ids keep their first row (station_id is the key)
+            wanted = {}
+            for rec in self.excel.list_stations():
+                sid = str(rec.get('station_id')).strip()
+                if rec.get('station_id') is not None and sid and sid not in wanted:
+                    wanted[sid] = rec
+
+            with self.db.Session() as s:
+                at_ids = self._asset_type_ids(s, {rec.get('asset_type') for rec in wanted.values()} - {None})
+
+                # every existing id with its last synced hash, in one query
+                known = dict(
+                    s.query(Station.station_id, StationHash.content_hash)
+                     .outerjoin(StationHash, StationHash.station_id == Station.station_id)
+                )
+
+                inserts, updates, hashes_new, hashes_changed = [], [], [], []
+                for n, (sid, rec) in enumerate(wanted.items(), 1):
+                    if n % SYNC_CHUNK_SIZE == 0:
+                        gevent.sleep(0)   # let eel calls in between
+                    digest = content_hash(rec)
+                    if sid in known and known[sid] == digest:
+                        continue
+                    row = dict(station_row(rec), asset_type_id=at_ids.get(rec.get('asset_type')))
+                    if sid not in known:
+                        inserts.append(row)
+                        hashes_new.append({'station_id': sid, 'content_hash': digest})
+                    else:
+                        updates.append(row)
+                        (hashes_new if known[sid] is None else hashes_changed).append(
+                            {'station_id': sid, 'content_hash': digest}
+                        )
+
+                for chunk in _chunks(inserts):
+                    s.bulk_insert_mappings(Station, chunk)
+                for chunk in _chunks(updates):
+                    s.bulk_update_mappings(Station, chunk)
+                for chunk in _chunks(hashes_new):
+                    # upsert: a hash left behind by a station deleted outside delete_station must not
+                    # fail the insert (and with it every later sync) on its primary key
+                    s.execute(delete(StationHash).where(StationHash.station_id.in_([h['station_id'] for h in chunk])))
+                    s.bulk_insert_mappings(StationHash, chunk)
+                for chunk in _chunks(hashes_changed):
+                    s.bulk_update_mappings(StationHash, chunk)
+                # bulk mappings skip the session hooks that keep station_fields in step
+                if self.db.index_fields:
+                    write_station_fields(
+                        s.connection(), ((r['station_id'], r['extra_data']) for r in inserts + updates)
+                    )
+                s.commit()
+
+            result = {
+                'success':   True,
+                'inserted':  len(inserts),
+                'updated':   len(updates),
+                'unchanged': len(wanted) - len(inserts) - len(updates),
+                'db_only':   len(set(known) - set(wanted)),
+                'seconds':   round(time.perf_counter() - t0, 3),
+            }
+            print(f"[db_sync] ✅ {result}")
+            if (inserts or updates) and self.on_synced:
+                self.on_synced([r['station_id'] for r in inserts + updates])
+        except Exception as e:
+            print(f"[db_sync] ❌ sync failed: {e}")
+            result = {'success': False, 'message': str(e)}
+        self.last = result
+        return result
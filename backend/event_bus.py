@@ -0,0 +1,50 @@
+# backend/event_bus.py
+# In-process publish/subscribe for data-change events. DataManager publishes a typed event after every
+# committed write; subscribers (app.py pushes them to the browser over eel) decide what to refresh.
+
+import threading
+
+# Event types
+STATION_UPSERTED = 'station.upserted'   # {ids}
+STATION_DELETED  = 'station.deleted'    # {ids}
+STATIONS_RESET   = 'stations.reset'     # every station may have changed; {reason}
+LOOKUP_CHANGED   = 'lookup.changed'     # {sheet}; stations=True (+ reason) if it reset every station
+SCHEMA_CHANGED   = 'schema.changed'     # {asset_type, job}
+
+
+class EventBus:
+    """
+    subscribe(callback, types=None) → unsubscribe()
+    publish(type, **fields)         → the event dict handed to subscribers
+
+    Callbacks run synchronously in the publishing greenlet, in the order they
+    subscribed; one that raises is logged and does not stop the others.
+    """
+
+    def __init__(self):
+        self._subscribers: list[tuple] = []    # (callback, set of types or None)
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, types=None):
+        entry = (callback, set(types) if types else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, event_type: str, **fields) -> dict:
+        event = {'type': event_type, **fields}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, types in subscribers:
+            if types is not None and event_type not in types:
+                continue
+            try:
+                callback(dict(event))
+            except Exception as e:
+                print(f"[event_bus] subscriber failed on {event_type}: {e}")
+        return event
@@ -9,11 +9,12 @@ from .lookups_manager import (
 )
 from .repairs_manager import save_repair as lm_save_repair
 from .persistence       import BaseRepo
-import os, glob, openpyxl
+from .station_cache     import station_cache
+from .schema_registry   import schema_registry
+from .workbook_writer   import workbook_writer
+from .schema_migration  import schema_migrator
 from .lookups_manager import LOCATIONS_DIR
-import openpyxl
-from openpyxl import load_workbook
-import os, glob
+import os
 
 class ExcelRepo(BaseRepo):
     # ─── Lookups ─────────────────────────────────────────
@@ -32,36 +33,76 @@ class ExcelRepo(BaseRepo):
 
     # ─── Stations ────────────────────────────────────────
     def list_stations(self):
-        stations = []
-        for loc_file in glob.glob(os.path.join(LOCATIONS_DIR, '*.xlsx')):
-            location = os.path.splitext(os.path.basename(loc_file))[0]
-            wb = openpyxl.load_workbook(loc_file, data_only=True)
-            for asset_type in wb.sheetnames:
-                ws = wb[asset_type]
-                headers = [c.value for c in ws[2]]
-                for row in ws.iter_rows(min_row=3, values_only=True):
-                    rec = dict(zip(headers, row))
-                    try:
-                        lat = float(rec.get('Latitude'))
-                        lon = float(rec.get('Longitude'))
-                    except (TypeError, ValueError):
-                        continue
-                    station = {
-                        'station_id': rec.get('Station ID'),
-                        'name':       rec.get('Site Name'),
-                        'province':   location,
-                        'lat':        lat,
-                        'lon':        lon,
-                        'status':     rec.get('Status'),
-                        'asset_type': asset_type,
-                        **{k: v for k, v in rec.items() if k not in (
-                            'Station ID','Site Name','Province',
-                            'Latitude','Longitude','Status',
-                            'Asset Type'
-                        )}
-                    }
-                    stations.append(station)
-        return stations
+        # parsed rows come from the shared mtime-keyed cache; only changed workbooks are re-read
+        return station_cache.list_stations()
+
+    def list_station_summaries(self):
+        # core columns only, without copying every extra field first
+        return station_cache.list_summaries()
+
+    def stations_version(self):
+        # moves whenever list_stations() would change (edits here or on disk)
+        return station_cache.version()
+
+    def stations_changed_since(self, version):
+        # ids written through this repo since `version`, or None if anything else moved
+        return station_cache.changed_since(version)
+
+    def stations_in_bbox(self, south, west, north, east, limit=None):
+        # served from the cache's spatial grid; cost follows the stations in view
+        stations, total = station_cache.stations_in_bbox(south, west, north, east, limit)
+        return {"stations": stations, "total": total}
+
+    def nearest_stations(self, lat, lon, k, max_km=None):
+        # KD-tree over the cached coordinates; copies carry 'distance_km'
+        return station_cache.nearest_stations(lat, lon, k, max_km)
+
+    def stations_within(self, lat, lon, radius_km, limit=None):
+        stations, total = station_cache.stations_within(lat, lon, radius_km, limit)
+        return {"stations": stations, "total": total}
+
+    def get_station(self, station_id):
+        # one record straight from the station index, no list walk
+        return station_cache.station(station_id)
+
+    def station_schema(self):
+        # {asset_type: {section: {fields}}} over every workbook, rebuilt only when headers change
+        return schema_registry.schema_map()
+
+    def asset_type_schema(self, asset_type: str, location: str | None = None):
+        # ordered {core, sections} for one asset type (one workbook's layout if location is given)
+        return schema_registry.describe(asset_type, location)
+
+    def find_station(self, station_id: str):
+        """
+        Resolve a station id to its workbook via the shared station index.
+        Returns {station_id, province, asset_type} or None.
+        """
+        hit = station_cache.locate(station_id)
+        if not hit:
+            return None
+        path, sheet, _row, _headers = hit
+        return {
+            'station_id': str(station_id).strip(),
+            'province':   os.path.splitext(os.path.basename(path))[0],
+            'asset_type': sheet,
+        }
+
+    def _find_row(self, ws, path: str, sheet: str, headers: list, sid: str):
+        """
+        Row number of `sid` in `ws`, straight from the station index.
+        Falls back to the old top-down scan if the index disagrees with the sheet.
+        """
+        idx_sid = headers.index('Station ID') + 1
+        hit = station_cache.locate(sid)
+        if hit and hit[0] == path and hit[1] == sheet:
+            row_num = hit[2]
+            if str(ws.cell(row=row_num, column=idx_sid).value).strip() == sid:
+                return row_num
+        for r in range(3, ws.max_row + 1):
+            if str(ws.cell(row=r, column=idx_sid).value).strip() == sid:
+                return r
+        return None
 
     def create_station(self, station_obj: dict):
         sid      = str(station_obj['generalInfo']['stationId']).strip()
@@ -71,51 +112,54 @@ class ExcelRepo(BaseRepo):
         if not os.path.exists(path):
             return {'success': False, 'message': f'No workbook for location \"{location}\"'}
 
-        wb = openpyxl.load_workbook(path)
-        if asset not in wb.sheetnames:
-            # auto‑create sheet for this asset type
-            ws = wb.create_sheet(title=asset)
-            headers = [
-                'Station ID','Asset Type','Site Name',
-                'Province','Latitude','Longitude',
-                'Status'
-            ]
-            for idx, col in enumerate(headers, start=1):
-                c = ws.cell(row=2, column=idx)
-                c.value = col
-        else:
-            ws = wb[asset]
-
-        headers = [c.value for c in ws[2]]
-        base = {
-            'Station ID':  sid,
-            'Asset Type':  asset,
-            'Site Name':   station_obj['generalInfo']['siteName'].strip(),
-            'Province':    location,
-            'Latitude':    station_obj['generalInfo']['latitude'],
-            'Longitude':   station_obj['generalInfo']['longitude'],
-            'Status':      station_obj['generalInfo']['status'].strip(),
-        }
-        extra      = station_obj.get('extraSections', {})
-        extra_flat = {}
-        for section, fields in extra.items():
-            for fld, val in fields.items():
-                col = f"{section} – {fld}"
-                extra_flat[col] = val
-                if col not in headers:
-                    headers.append(col)
-                    ws.cell(row=2, column=len(headers), value=col)
-
-        row = []
-        for h in headers:
-            if h in base:
-                row.append(base[h])
-            elif h in extra_flat:
-                row.append(extra_flat[h])
+        with workbook_writer.editing(path):
+            wb = workbook_writer.load(path)
+            if asset not in wb.sheetnames:
+                # auto‑create sheet for this asset type
+                ws = wb.create_sheet(title=asset)
+                headers = [
+                    'Station ID','Asset Type','Site Name',
+                    'Province','Latitude','Longitude',
+                    'Status'
+                ]
+                for idx, col in enumerate(headers, start=1):
+                    c = ws.cell(row=2, column=idx)
+                    c.value = col
             else:
-                row.append(None)
-        ws.append(row)
-        wb.save(path)
+                ws = wb[asset]
+                # the registry already knows this sheet's header row (parsed from the same workbook)
+                headers = schema_registry.sheet_headers(path, ws)
+
+            base = {
+                'Station ID':  sid,
+                'Asset Type':  asset,
+                'Site Name':   station_obj['generalInfo']['siteName'].strip(),
+                'Province':    location,
+                'Latitude':    station_obj['generalInfo']['latitude'],
+                'Longitude':   station_obj['generalInfo']['longitude'],
+                'Status':      station_obj['generalInfo']['status'].strip(),
+            }
+            extra      = station_obj.get('extraSections', {})
+            extra_flat = {}
+            for section, fields in extra.items():
+                for fld, val in fields.items():
+                    col = f"{section} – {fld}"
+                    extra_flat[col] = val
+                    if col not in headers:
+                        headers.append(col)
+                        ws.cell(row=2, column=len(headers), value=col)
+
+            row = []
+            for h in headers:
+                if h in base:
+                    row.append(base[h])
+                elif h in extra_flat:
+                    row.append(extra_flat[h])
+                else:
+                    row.append(None)
+            ws.append(row)
+            workbook_writer.save(path, wb)
+            station_cache.note_row(path, asset, ws.max_row, headers, row)
         return {'success': True}
 
 
@@ -150,35 +194,11 @@ class ExcelRepo(BaseRepo):
         if not sid:
             return {"success": False, "message": "Missing station_id"}
 
-        # Scan all location workbooks to find the first matching sheet/row
-        dbg = {"stage": "locate_row", "searched": [], "match": None}
-        target = None
-        for loc_file in glob.glob(os.path.join(LOCATIONS_DIR, '*.xlsx')):
-            try:
-                wb = load_workbook(loc_file)
-            except Exception:
-                continue
-            for sheetname in wb.sheetnames:
-                ws = wb[sheetname]
-                # Headers are on row 2 in this project
-                headers = [c.value for c in ws[2]]
-                if not headers or 'Station ID' not in headers:
-                    continue
-                idx_sid = headers.index('Station ID') + 1
-                row_num = None
-                for r in range(3, ws.max_row + 1):
-                    val = ws.cell(row=r, column=idx_sid).value
-                    if val is not None and str(val).strip() == sid:
-                        row_num = r
-                        break
-                if row_num:
-                    target = (loc_file, sheetname, row_num, headers)
-                    dbg["match"] = {"path": loc_file, "sheet": sheetname, "row": row_num}
-                    break
-                else:   
-                    dbg["searched"].append({"path": loc_file, "sheet": sheetname, "rows": ws.max_row})
-            if target:
-                break
+        # Jump straight to the station's workbook/sheet/row via the station index
+        dbg = {"stage": "locate_row", "match": None}
+        target = station_cache.locate(sid)
+        if target:
+            dbg["match"] = {"path": target[0], "sheet": target[1], "row": target[2]}
 
         if not target:
             dbg["reason"] = "station_not_found"
@@ -186,39 +206,46 @@ class ExcelRepo(BaseRepo):
 
 
         path, sheet, row_num, headers = target
-        wb = load_workbook(path)
-        ws = wb[sheet]
-
-        updated = 0
-        checked = 0
-        dbg_updates = {"headers_count": len(headers), "keys_present": [], "keys_missing": [], "keys_updated": []}
-        # Only touch columns that already exist in headers
-        for key, val in (col_values or {}).items():
-            if key not in headers:
-                dbg_updates["keys_missing"].append(key)
-                continue  # do not add new columns
-            col_idx = headers.index(key) + 1
-            cell = ws.cell(row=row_num, column=col_idx)
-            checked += 1
-            current = cell.value
-            incoming = val if val is not None else ''
-            # only fill if current is empty and incoming non-empty
-            if (current is None or (isinstance(current, str) and current.strip() == '')):
-                if isinstance(incoming, str):
-                    if incoming.strip() == '':
-                        continue
-                    cell.value = incoming
+        with workbook_writer.editing(path):
+            wb = workbook_writer.load(path)
+            ws = wb[sheet]
+            headers = [c.value for c in ws[2]]
+            row_num = self._find_row(ws, path, sheet, headers, sid) if 'Station ID' in headers else None
+            if row_num is None:
+                dbg["reason"] = "station_not_found"
+                return {"success": False, "message": f"Station '{sid}' not found in location workbooks.", "debug": dbg}
+
+            updated = 0
+            checked = 0
+            dbg_updates = {"headers_count": len(headers), "keys_present": [], "keys_missing": [], "keys_updated": []}
+            # Only touch columns that already exist in headers
+            for key, val in (col_values or {}).items():
+                if key not in headers:
+                    dbg_updates["keys_missing"].append(key)
+                    continue  # do not add new columns
+                col_idx = headers.index(key) + 1
+                cell = ws.cell(row=row_num, column=col_idx)
+                checked += 1
+                current = cell.value
+                incoming = val if val is not None else ''
+                # only fill if current is empty and incoming non-empty
+                if (current is None or (isinstance(current, str) and current.strip() == '')):
+                    if isinstance(incoming, str):
+                        if incoming.strip() == '':
+                            continue
+                        cell.value = incoming
+                    else:
+                        cell.value = incoming
+                    updated += 1
+                    dbg_updates["keys_updated"].append(key)
                 else:
-                    cell.value = incoming
-                updated += 1
-                dbg_updates["keys_updated"].append(key)
-            else:
-                dbg_updates["keys_present"].append(key)
+                    dbg_updates["keys_present"].append(key)
 
-        if updated:
-            wb.save(path)
-        dbg_final = {"path": path, "sheet": sheet, "row": row_num}
-        return {"success": True, "updated": updated, "checked": checked, "debug": {"repo": dbg, "updates": dbg_updates, "target": dbg_final}}
+            if updated:
+                workbook_writer.save(path, wb)
+                station_cache.note_row(path, sheet, row_num, headers, [c.value for c in ws[row_num]])
+            dbg_final = {"path": path, "sheet": sheet, "row": row_num}
+            return {"success": True, "updated": updated, "checked": checked, "debug": {"repo": dbg, "updates": dbg_updates, "target": dbg_final}}
 
 
 
@@ -248,110 +275,93 @@ class ExcelRepo(BaseRepo):
             print(f"[excel_repo.update_station] ❌ {msg}")
             return {"success": False, "message": msg}
 
-        wb = openpyxl.load_workbook(path)
-        if asset not in wb.sheetnames:
-            msg = f"No sheet '{asset}' in '{loc}.xlsx'"
-            print(f"[excel_repo.update_station] ❌ {msg}")
-            return {"success": False, "message": msg}
-        ws = wb[asset]
-
-        # ─── Identify removed Section–Field columns ────────────────────────────────
-        # reload the updated workbook so our in-memory copy includes the deletions
-        wb = openpyxl.load_workbook(path)
-        ws = wb[asset]
-        headers = [c.value for c in ws[2]]
-        desired_extra = {
-            f"{sec} – {fld}"
-            for sec, fields in station_obj.get("extraSections", {}).items()
-            for fld in fields
-        }
-        removed_cols = [
-            col for col in headers
-            if isinstance(col, str) and " – " in col and col not in desired_extra
-        ]
-        print(f"[excel_repo.update_station]   headers before: {headers}")
-        print(f"[excel_repo.update_station]   desired_extra: {desired_extra}")
-        print(f"[excel_repo.update_station]   removed_cols: {removed_cols}")
-
-        if removed_cols:
-            print(f"[excel_repo.update_station] ↪ Deleting columns {removed_cols} across all workbooks")
-            for loc_file in glob.glob(os.path.join(LOCATIONS_DIR, '*.xlsx')):
-                wb_loc = openpyxl.load_workbook(loc_file)
-                if asset in wb_loc.sheetnames:
-                    ws_loc = wb_loc[asset]
-                    hdrs_loc = [c.value for c in ws_loc[2]]
-                    # delete in reverse so indices stay valid
-                    for idx in range(len(hdrs_loc) - 1, -1, -1):
-                        if hdrs_loc[idx] in removed_cols:
-                            print(f"    • Deleting '{hdrs_loc[idx]}' at col {idx+1} in {loc_file}")
-                            ws_loc.delete_cols(idx + 1)
-                    wb_loc.save(loc_file)
-            # reload the updated file so our `wb` reflects the disk changes
-            print("[update_station] ⏬ reloading workbook to pick up deletions")
-            wb = openpyxl.load_workbook(path)
+        with workbook_writer.editing(path):
+            wb = workbook_writer.load(path)
+            if asset not in wb.sheetnames:
+                msg = f"No sheet '{asset}' in '{loc}.xlsx'"
+                print(f"[excel_repo.update_station] ❌ {msg}")
+                return {"success": False, "message": msg}
             ws = wb[asset]
-            headers = [c.value for c in ws[2]]
-            print(f"[update_station]   headers now: {headers}")
-            print(f"[excel_repo.update_station]   headers after deletion: {headers}")
-
-        # ─── Locate the station’s row ────────────────────────────────────────────────
-        try:
-            idx_sid = headers.index("Station ID") + 1
-        except ValueError:
-            msg = "Missing 'Station ID' column"
-            print(f"[excel_repo.update_station] ❌ {msg}")
-            return {"success": False, "message": msg}
 
-        row_num = None
-        for r in range(3, ws.max_row + 1):
-            if str(ws.cell(row=r, column=idx_sid).value).strip() == sid:
-                row_num = r
-                break
-        if row_num is None:
-            msg = f"Station '{sid}' not found"
-            print(f"[excel_repo.update_station] ❌ {msg}")
-            return {"success": False, "message": msg}
-        print(f"[excel_repo.update_station]   Found station at row {row_num}")
-
-        # ─── Write core fields ──────────────────────────────────────────────────────
-        gen = station_obj["generalInfo"]
-        mapping = {
-            "Site Name":  gen["siteName"],
-            "Province":   gen["province"],
-            "Latitude":   gen["latitude"],
-            "Longitude":  gen["longitude"],
-            "Status":     gen["status"],
-        }
-        print(f"[excel_repo.update_station]   Updating core fields: {mapping}")
-        for col_name, val in mapping.items():
-            if col_name in headers:
-                col_idx = headers.index(col_name) + 1
-            else:
-                headers.append(col_name)
-                col_idx = len(headers)
-                ws.cell(row=2, column=col_idx, value=col_name)
-                print(f"    • Added header '{col_name}' at col {col_idx}")
-            ws.cell(row=row_num, column=col_idx, value=val)
-            print(f"    • Wrote {col_name} = {val!r} at row {row_num}, col {col_idx}")
-
-        # ─── Write remaining extraSections ───────────────────────────────────────────
-        print(f"[excel_repo.update_station]   Writing extraSections for row {row_num}")
-        for sec, fields in station_obj.get("extraSections", {}).items():
-            for fld, val in fields.items():
-                col_name = f"{sec} – {fld}"
+            # ─── Identify removed Section–Field columns ────────────────────────────────
+            headers = schema_registry.sheet_headers(path, ws)
+            desired_extra = {
+                f"{sec} – {fld}"
+                for sec, fields in station_obj.get("extraSections", {}).items()
+                for fld in fields
+            }
+            removed_cols = [
+                col for col in headers
+                if isinstance(col, str) and " – " in col and col not in desired_extra
+            ]
+            print(f"[excel_repo.update_station]   headers before: {headers}")
+            print(f"[excel_repo.update_station]   desired_extra: {desired_extra}")
+            print(f"[excel_repo.update_station]   removed_cols: {removed_cols}")
+
+            # ─── Locate the station’s row ────────────────────────────────────────────────
+            if "Station ID" not in headers:
+                msg = "Missing 'Station ID' column"
+                print(f"[excel_repo.update_station] ❌ {msg}")
+                return {"success": False, "message": msg}
+
+            row_num = self._find_row(ws, path, asset, headers, sid)
+            if row_num is None:
+                msg = f"Station '{sid}' not found"
+                print(f"[excel_repo.update_station] ❌ {msg}")
+                return {"success": False, "message": msg}
+            print(f"[excel_repo.update_station]   Found station at row {row_num}")
+
+            # ─── Write core fields ──────────────────────────────────────────────────────
+            gen = station_obj["generalInfo"]
+            mapping = {
+                "Site Name":  gen["siteName"],
+                "Province":   gen["province"],
+                "Latitude":   gen["latitude"],
+                "Longitude":  gen["longitude"],
+                "Status":     gen["status"],
+            }
+            print(f"[excel_repo.update_station]   Updating core fields: {mapping}")
+            for col_name, val in mapping.items():
                 if col_name in headers:
                     col_idx = headers.index(col_name) + 1
                 else:
                     headers.append(col_name)
                     col_idx = len(headers)
                     ws.cell(row=2, column=col_idx, value=col_name)
-                    print(f"    • Added new extra header '{col_name}' at col {col_idx}")
+                    print(f"    • Added header '{col_name}' at col {col_idx}")
                 ws.cell(row=row_num, column=col_idx, value=val)
                 print(f"    • Wrote {col_name} = {val!r} at row {row_num}, col {col_idx}")
 
-        wb.save(path)
-        print(f"[excel_repo.update_station] ✅ Saved workbook {path}")
-        return {"success": True}
+            # ─── Write remaining extraSections ───────────────────────────────────────────
+            print(f"[excel_repo.update_station]   Writing extraSections for row {row_num}")
+            for sec, fields in station_obj.get("extraSections", {}).items():
+                for fld, val in fields.items():
+                    col_name = f"{sec} – {fld}"
+                    if col_name in headers:
+                        col_idx = headers.index(col_name) + 1
+                    else:
+                        headers.append(col_name)
+                        col_idx = len(headers)
+                        ws.cell(row=2, column=col_idx, value=col_name)
+                        print(f"    • Added new extra header '{col_name}' at col {col_idx}")
+                    ws.cell(row=row_num, column=col_idx, value=val)
+                    print(f"    • Wrote {col_name} = {val!r} at row {row_num}, col {col_idx}")
+
+            # the columns themselves go in a background job; this station's values go now
+            for col_name in removed_cols:
+                ws.cell(row=row_num, column=headers.index(col_name) + 1).value = None
+
+            workbook_writer.save(path, wb)
+            station_cache.note_row(path, asset, row_num, headers, [c.value for c in ws[row_num]])
+            print(f"[excel_repo.update_station] ✅ Saved workbook {path}")
+
+            if removed_cols:
+                # dropping a field is a schema change for every workbook with this asset type;
+                # it runs as a background job, so this save returns as soon as the row is written
+                migration = schema_migrator.submit(asset, remove=removed_cols)
+                print(f"[excel_repo.update_station] ↪ Queued column removal {removed_cols} as job {migration['id']}")
+                return {"success": True, "migration": migration}
+            return {"success": True}
 
 
     def delete_station(self, station_obj: dict):
@@ -362,25 +372,21 @@ class ExcelRepo(BaseRepo):
         if not os.path.exists(path):
             return {"success": False, "message": f"No workbook for '{loc}'"}
 
-        wb = openpyxl.load_workbook(path)
-        if asset not in wb.sheetnames:
-            return {"success": False, "message": f"No sheet '{asset}' in '{loc}.xlsx'"}
-        ws = wb[asset]
-
-        headers = [c.value for c in ws[2]]
-        try:
-            idx_sid = headers.index("Station ID") + 1
-        except ValueError:
-            return {"success": False, "message": "Missing 'Station ID' column"}
+        with workbook_writer.editing(path):
+            wb = workbook_writer.load(path)
+            if asset not in wb.sheetnames:
+                return {"success": False, "message": f"No sheet '{asset}' in '{loc}.xlsx'"}
+            ws = wb[asset]
 
-        # find and delete the row
-        row_to_del = None
-        for r in range(3, ws.max_row + 1):
-            if str(ws.cell(row=r, column=idx_sid).value).strip() == sid:
-                row_to_del = r
-                break
-        if row_to_del is None:
-            return {"success": False, "message": f"Station '{sid}' not found"}
-        ws.delete_rows(row_to_del)
-        wb.save(path)
-        return {"success": True}
+            headers = [c.value for c in ws[2]]
+            if "Station ID" not in headers:
+                return {"success": False, "message": "Missing 'Station ID' column"}
+
+            # find and delete the row
+            row_to_del = self._find_row(ws, path, asset, headers, sid)
+            if row_to_del is None:
+                return {"success": False, "message": f"Station '{sid}' not found"}
+            ws.delete_rows(row_to_del)
+            workbook_writer.save(path, wb)
+            station_cache.note_row_deleted(path, asset, row_to_del)
+            return {"success": True}
@@ -0,0 +1,145 @@
+# backend/file_locks.py
+# Per-file reader/writer locks for the Excel store plus atomic (temp file + rename) saves.
+# Writers exclude each other for their whole load → edit → save span; readers only ever wait for the
+# instant a new version is swapped in, so dashboard reads are never queued behind an import.
+
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from gevent.event import Event
+from gevent.lock import RLock
+
+
+class FileLock:
+    """
+    Three modes for one file:
+      write()  – exclusive among writers (re-entrant for the same greenlet)
+      commit() – held by a writer only while the new file replaces the old one
+      read()   – shared; waits only while a commit is in progress
+
+    Built on gevent primitives: eel runs every call as a greenlet on one
+    thread, and a plain threading lock would block the whole hub.
+    """
+
+    def __init__(self):
+        self._writer    = RLock()
+        self._readers   = 0
+        self._no_commit = Event()
+        self._no_commit.set()
+        self._idle      = Event()     # set while no reader is inside
+        self._idle.set()
+
+    @contextmanager
+    def write(self):
+        with self._writer:
+            yield
+
+    @contextmanager
+    def commit(self):
+        with self._writer:
+            self._no_commit.clear()
+            try:
+                # let readers that already opened the old version finish with it
+                self._idle.wait()
+                yield
+            finally:
+                self._no_commit.set()
+
+    @contextmanager
+    def read(self):
+        self._no_commit.wait()
+        self._readers += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._readers -= 1
+            if self._readers == 0:
+                self._idle.set()
+
+
+class FileLockManager:
+    """Hands out one FileLock per absolute path."""
+
+    def __init__(self):
+        self._locks: dict[str, FileLock] = {}
+        self._guard = threading.Lock()    # never held across a wait
+
+    def get(self, path: str) -> FileLock:
+        key = os.path.normcase(os.path.abspath(path))
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = FileLock()
+            return lock
+
+    def read(self, path: str):
+        return self.get(path).read()
+
+    def write(self, path: str):
+        return self.get(path).write()
+
+    def commit(self, path: str):
+        return self.get(path).commit()
+
+
+file_locks = FileLockManager()
+
+
+def new_temp(path: str) -> str:
+    """
+    Create an empty temp file next to `path` (same folder, so the later
+    rename stays on one filesystem) with the permissions `path` has, or
+    would get as a new file, and return its path.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.~', suffix='.xlsx', dir=folder)
+    os.close(fd)
+    try:
+        # mkstemp files are private (0600); keep the permissions the workbook had
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp, mode)
+    except Exception:
+        discard_temp(tmp)
+        raise
+    return tmp
+
+def write_temp(wb, path: str) -> str:
+    """Save `wb` to a new_temp() file for `path` and return the temp file's path."""
+    tmp = new_temp(path)
+    try:
+        wb.save(tmp)
+    except Exception:
+        discard_temp(tmp)
+        raise
+    return tmp
+
+def commit_temp(tmp: str, path: str):
+    """Swap a finished temp file in for `path` while readers are held off."""
+    try:
+        with file_locks.commit(path):
+            os.replace(tmp, path)
+    except Exception:
+        discard_temp(tmp)
+        raise
+
+def discard_temp(tmp: str):
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+
+def atomic_save(wb, path: str):
+    """
+    Save an openpyxl workbook without ever exposing a half-written file:
+    write a temp file next to `path`, then swap it in with os.replace.
+    """
+    commit_temp(write_temp(wb, path), path)
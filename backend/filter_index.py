@@ -0,0 +1,103 @@
+# backend/filter_index.py
+# Inverted indexes over the station list for the filter panel: value → set of station positions per
+# categorical field (company, location, asset type, status, …), so a filter query is a handful of set
+# unions/intersections instead of a walk over every record.
+
+# Fields indexed up front; any other station key is indexed the first time a query uses it
+FILTER_FIELDS = ('company', 'province', 'asset_type', 'status')
+
+
+def _norm(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+class FilterIndex:
+    """
+    Built once per station-list version:
+      stations            the records, in list_stations() order
+      query(criteria)     sorted positions matching every field of
+                          {field: [allowed values]} (any value within a field)
+      hierarchy()         {company: {location: {asset_type: count}}}
+
+    `companies` maps each location to the companies that own it (from the
+    Locations lookup); a station's company comes from its province.
+    """
+
+    def __init__(self, stations: list[dict], companies: dict[str, list[str]] | None = None):
+        self.stations  = stations
+        self.companies = companies or {}
+        self._postings: dict[str, dict] = {}
+        for field in FILTER_FIELDS:
+            self._field(field)
+
+    def __len__(self):
+        return len(self.stations)
+
+    def _field(self, field: str) -> dict:
+        """{value: set(positions)} for one field, built on first use."""
+        postings = self._postings.get(field)
+        if postings is None:
+            postings = {}
+            if field == 'company':
+                for pos, stn in enumerate(self.stations):
+                    for company in self.companies.get(_norm(stn.get('province')), ()):
+                        postings.setdefault(_norm(company), set()).add(pos)
+            else:
+                for pos, stn in enumerate(self.stations):
+                    value = _norm(stn.get(field))
+                    try:
+                        postings.setdefault(value, set()).add(pos)
+                    except TypeError:
+                        continue   # unhashable cell value; not filterable
+            self._postings[field] = postings
+        return postings
+
+    def values(self, field: str) -> dict:
+        """{value: station count} of one field."""
+        return {v: len(p) for v, p in self._field(field).items()}
+
+    def query(self, criteria: dict | None) -> list[int]:
+        """
+        Positions matching every {field: [values]} entry. A field given as
+        None is not constrained; an empty list matches nothing.
+        """
+        picks = []
+        for field, wanted in (criteria or {}).items():
+            if wanted is None:
+                continue
+            if isinstance(wanted, (str, int, float, bool)):
+                wanted = [wanted]
+            postings = self._field(field)
+            hits = set()
+            for value in wanted:
+                hits |= postings.get(_norm(value), set())
+            if not hits:
+                return []
+            picks.append(hits)
+        if not picks:
+            return list(range(len(self.stations)))
+
+        # intersect smallest first so every step only shrinks
+        picks.sort(key=len)
+        result = set(picks[0])
+        for other in picks[1:]:
+            result &= other
+            if not result:
+                return []
+        return sorted(result)
+
+    def hierarchy(self) -> dict:
+        """{company: {location: {asset_type: station count}}} from the indexes."""
+        provinces = self._field('province')
+        types     = self._field('asset_type')
+        tree = {}
+        for company, positions in self._field('company').items():
+            for location, loc_positions in provinces.items():
+                in_loc = positions & loc_positions
+                if not in_loc:
+                    continue
+                tree.setdefault(company, {})[location] = {
+                    at: len(in_loc & at_positions)
+                    for at, at_positions in types.items() if in_loc & at_positions
+                }
+        return tree
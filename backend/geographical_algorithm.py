@@ -7,10 +7,21 @@ import os, json, math
 from typing import Any, Dict, List, Tuple
 import eel
 
+from .spatial_index import KDTree
+
 HERE = os.path.dirname(__file__)
 DATA_DIR = os.path.abspath(os.path.join(HERE, "..", "data"))
 PLAN_PATH = os.path.join(DATA_DIR, "algorithm_data", "longterm_inspection_plan.json")
 
+# An unplanned station is suggested for the trip of the nearest planned station within this distance
+NEAREST_TRIP_MAX_KM = 100.0
+
+# DataManager, injected by app.py (station coordinates for the nearest-trip suggestions)
+_dm = None
+def set_dm(dm_obj):
+    global _dm
+    _dm = dm_obj
+
 def _load_plan() -> dict:
     if not os.path.exists(PLAN_PATH):
         raise FileNotFoundError(f"Plan file not found: {PLAN_PATH}")
@@ -128,6 +139,38 @@ def _schedule_by_item_duration(items: List[dict]) -> Tuple[List[dict], int]:
     return scheduled, max(total_used, 1)
 
 
+def _suggest_trips(unplanned: List[dict], station_to_trip: Dict[str, Tuple[str, str, int]]) -> None:
+    """
+    Annotate unplanned items with 'nearest_trip': {trip_name, station_id, distance_km}
+    of the closest planned station within NEAREST_TRIP_MAX_KM, via a KD-tree
+    over the plan's station coordinates.
+    """
+    if _dm is None or not unplanned or not station_to_trip:
+        return
+    try:
+        coords = _dm.station_coordinates(list(station_to_trip) + [it["station_id"] for it in unplanned])
+    except Exception as e:
+        print(f"[geographical_algorithm] no station coordinates: {e}")
+        return
+
+    planned = [sid for sid in station_to_trip if sid in coords]
+    if not planned:
+        return
+    tree = KDTree([coords[sid][0] for sid in planned], [coords[sid][1] for sid in planned])
+    for it in unplanned:
+        here = coords.get(it["station_id"])
+        if here is None:
+            continue
+        hits, km = tree.nearest(here[0], here[1], 1, max_km=NEAREST_TRIP_MAX_KM)
+        if len(hits):
+            sid = planned[int(hits[0])]
+            it["nearest_trip"] = {
+                "trip_name":   station_to_trip[sid][0],
+                "station_id":  sid,
+                "distance_km": round(float(km[0]), 1),
+            }
+
+
 @eel.expose
 def run_geographical_algorithm(payload: Dict[str, Any] | None = None) -> Dict[str, Any]:
     """
@@ -176,6 +219,7 @@ def run_geographical_algorithm(payload: Dict[str, Any] | None = None) -> Dict[st
             grouped.setdefault(tname, []).append(entry)
         else:
             unplanned.append(dict(it))
+    _suggest_trips(unplanned, station_to_trip)
 
     # Build trip outputs with per-day schedule and subtotals
     trips_out: List[Dict[str, Any]] = []
@@ -3,13 +3,19 @@
 
 import os
 import glob
-import threading
 import random
+import shutil
+import functools
+from contextlib import contextmanager
 
 import pandas as pd
-from openpyxl import load_workbook, Workbook
+from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font
 
+from .workbook_writer import workbook_writer
+from .file_locks      import file_locks, atomic_save, new_temp, commit_temp, discard_temp
+from .lookups_store   import LookupsStore
+
 # ─── Paths & constants ──────────────────────────────────────────────────────
 HERE = os.path.dirname(__file__)
 DATA_DIR        = os.path.abspath(os.path.join(HERE, '..', 'data'))
@@ -17,18 +23,52 @@ REPAIRS_DIR     = os.path.join(DATA_DIR, 'repairs')
 LOOKUPS_PATH    = os.path.join(DATA_DIR, 'lookups.xlsx')
 LOCATIONS_DIR   = os.path.join(DATA_DIR, 'locations')
 
+# Sheets ensure_lookups_file() guarantees
+_REQUIRED_SHEETS = ('Companies', 'Locations', 'AssetTypes', 'Custom Weights', 'Workplan Constants')
+
+# Parsed, mtime-checked copy of lookups.xlsx that every read below is served from
+lookups_store = LookupsStore(LOOKUPS_PATH)
+
 # Random color generator
 def _get_random_color() -> str:
     """Return a random hex colour string, e.g. '#3fa4c2'."""
     return '#{:06x}'.format(random.randint(0, 0xFFFFFF))
 
 
-# ─── Per‑asset‑type locks ────────────────────────────────────────────────────
-_lock_dict = {}
-def _get_lock(key: str):
-    if key not in _lock_dict:
-        _lock_dict[key] = threading.Lock()
-    return _lock_dict[key]
+# ─── lookups.xlsx write lock ─────────────────────────────────────────────────
+def _writes_lookups(fn):
+    """Run fn's whole load → edit → save of lookups.xlsx under its writer lock."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with workbook_writer.editing(LOOKUPS_PATH):
+            return fn(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def _pandas_writer(mode: str = 'w'):
+    """
+    pd.ExcelWriter for lookups.xlsx that writes a temp copy (mode='a' starts
+    from the current file) and swaps it in only once pandas has finished.
+    """
+    with file_locks.write(LOOKUPS_PATH):
+        # land any pending edits first, so the copy pandas appends to has them
+        workbook_writer.flush(LOOKUPS_PATH)
+        tmp = new_temp(LOOKUPS_PATH)
+        try:
+            if mode == 'a':
+                shutil.copyfile(LOOKUPS_PATH, tmp)
+            with pd.ExcelWriter(tmp, engine='openpyxl', mode=mode) as writer:
+                yield writer
+        except BaseException:
+            discard_temp(tmp)
+            raise
+        commit_temp(tmp, LOOKUPS_PATH)
+
+def _pandas_append_sheet(sheet_name: str, columns: list[str]):
+    """Add an empty sheet with a bold pandas header."""
+    with _pandas_writer(mode='a') as writer:
+        pd.DataFrame(columns=columns) \
+          .to_excel(writer, sheet_name=sheet_name, index=False)
 
 # ─── Ensure data folder & lookups.xlsx exist and are well‑formed ────────────
 def ensure_data_folder():
@@ -36,6 +76,7 @@ def ensure_data_folder():
     os.makedirs(LOCATIONS_DIR,   exist_ok=True)
     os.makedirs(REPAIRS_DIR,     exist_ok=True)
 
+@_writes_lookups
 def ensure_lookups_file():
     """
     Guarantee lookups.xlsx exists with both
@@ -43,9 +84,12 @@ def ensure_lookups_file():
     """
     ensure_data_folder()
 
+    if os.path.exists(LOOKUPS_PATH) and all(lookups_store.has_sheet(s) for s in _REQUIRED_SHEETS):
+        return
+
     if not os.path.exists(LOOKUPS_PATH):
         # fresh file: create Companies, Locations, and AssetTypes (now with color!)
-        with pd.ExcelWriter(LOOKUPS_PATH, engine='openpyxl') as writer:
+        with _pandas_writer() as writer:
             # Companies: “company” + “active”
             pd.DataFrame(columns=['company','active']) \
               .to_excel(writer, sheet_name='Companies', index=False)
@@ -59,15 +103,13 @@ def ensure_lookups_file():
 
 
     # patch missing sheets if needed
-    wb = load_workbook(LOOKUPS_PATH)
+    wb = workbook_writer.load(LOOKUPS_PATH)
 
     # — create Companies via pandas so header is bold —
     if 'Companies' not in wb.sheetnames:
-        with pd.ExcelWriter(LOOKUPS_PATH, engine='openpyxl', mode='a') as writer:
-            pd.DataFrame(columns=['company', 'active']) \
-              .to_excel(writer, sheet_name='Companies', index=False)
+        _pandas_append_sheet('Companies', ['company', 'active'])
         # reload so we can patch the other sheets below
-        wb = load_workbook(LOOKUPS_PATH)
+        wb = workbook_writer.load(LOOKUPS_PATH)
 
     # — ensure Locations & AssetTypes exist as before —
     changed = False
@@ -104,7 +146,7 @@ def ensure_lookups_file():
         ws.append(['O&M Current Split', ''])
         changed = True
     if changed:
-        wb.save(LOOKUPS_PATH)
+        workbook_writer.save(LOOKUPS_PATH, wb)
 
 
 # ─── Core lookup routines ───────────────────────────────────────────────────
@@ -113,7 +155,16 @@ def read_lookup_list(sheet_name: str) -> list[str]:
     Read all non‑empty values from column A, rows 2+ of LOOKUPS_PATH[sheet_name].
     If the sheet doesn't exist, create it (with header) and return [].
     """
-    wb = load_workbook(LOOKUPS_PATH)
+    values = lookups_store.lookup_list(sheet_name)
+    if values is None:
+        with workbook_writer.editing(LOOKUPS_PATH):
+            _create_lookup_sheet(sheet_name)
+        return []
+    return values
+
+def _create_lookup_sheet(sheet_name: str):
+    # caller holds the lookups write lock; re-load in case another call got here first
+    wb = workbook_writer.load(LOOKUPS_PATH)
     if sheet_name not in wb.sheetnames:
         ws = wb.create_sheet(sheet_name)
         # match our canonical headers
@@ -127,24 +178,20 @@ def read_lookup_list(sheet_name: str) -> list[str]:
         else:
             # for sheets like "Companies" or "Custom Weights"
             ws['A1'] = sheet_name.rstrip('s').lower().replace(' ', '_')
-        wb.save(LOOKUPS_PATH)
-        return []
-
-
-    ws = wb[sheet_name]
-    result = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        v = row[0]
-        if isinstance(v, str) and v.strip():
-            result.append(v.strip())
-    return result
+        workbook_writer.save(LOOKUPS_PATH, wb)
 
+@_writes_lookups
 def append_to_lookup(sheet_name: str, entry_value: str, second_value: str = None) -> bool:
     """
     Append entry_value (trimmed) to LOOKUPS_PATH[sheet_name], if not already present
     (case‐insensitive). Returns True if added, False if duplicate/empty.
     """
-    wb = load_workbook(LOOKUPS_PATH)
+    val = (entry_value or '').strip()
+    if not val or lookups_store.contains(sheet_name, val):
+        # nothing to write, so don't open the workbook at all
+        return False
+
+    wb = workbook_writer.load(LOOKUPS_PATH)
     if sheet_name not in wb.sheetnames:
         ws = wb.create_sheet(sheet_name)
         ws['A1'] = 'LocationName' if sheet_name == 'Locations' else 'AssetTypeName'
@@ -173,12 +220,12 @@ def append_to_lookup(sheet_name: str, entry_value: str, second_value: str = None
     elif sheet_name == 'Custom Weights':
         # entry_value = weight, second_value = 'TRUE' or ''
         ws.append([entry_value, second_value or ''])
-        wb.save(LOOKUPS_PATH)
+        workbook_writer.save(LOOKUPS_PATH, wb)
         return True
     else:
         ws.append([val])
         
-    wb.save(LOOKUPS_PATH)
+    workbook_writer.save(LOOKUPS_PATH, wb)
     return True
 
 # ─── Public lookup APIs ─────────────────────────────────────────────────────
@@ -191,8 +238,8 @@ def add_new_location(new_loc: str) -> bool:
         return False
     # create the locations workbook
     loc_path = os.path.join(LOCATIONS_DIR, f'{new_loc}.xlsx')
-    wb = Workbook()
-    wb.save(loc_path)
+    with file_locks.write(loc_path):
+        atomic_save(Workbook(), loc_path)
     return True
 
 
@@ -205,8 +252,8 @@ def add_new_asset_type_internal(new_asset_type: str) -> dict:
     If missing, append [asset_type, <whatever B was>, <random color>] and save.
     Return the hex color string in Col C.
     """
-    lock = _get_lock(new_asset_type)
-    with lock:
+    # hold lookups.xlsx for the whole add so two calls can't both pass the duplicate check
+    with workbook_writer.editing(LOOKUPS_PATH):
         name = (new_asset_type or '').strip()
         if not name:
             return {'success': False, 'message': 'Invalid asset type.'}
@@ -223,42 +270,45 @@ def add_new_asset_type_internal(new_asset_type: str) -> dict:
             'Status'
         ]
         for loc_file in glob.glob(os.path.join(LOCATIONS_DIR, '*.xlsx')):
-            wb = None
-            # try loading; on any failure, delete & recreate, then reload
-            try:
-                wb = load_workbook(loc_file)
-            except Exception:
-                try:
-                    os.remove(loc_file)
-                except OSError:
-                    pass
-                basename = os.path.splitext(os.path.basename(loc_file))[0]
-                add_new_location(basename)
+            with workbook_writer.editing(loc_file):
+                wb = None
+                # try loading; on any failure, delete & recreate, then reload
                 try:
-                    wb = load_workbook(loc_file)
+                    wb = workbook_writer.load(loc_file)
                 except Exception:
-                    # still bad? give up on this file
+                    try:
+                        os.remove(loc_file)
+                    except OSError:
+                        pass
+                    basename = os.path.splitext(os.path.basename(loc_file))[0]
+                    add_new_location(basename)
+                    try:
+                        wb = workbook_writer.load(loc_file)
+                    except Exception:
+                        # still bad? give up on this file
+                        continue
+
+                # if the sheet already exists, skip it
+                if name in wb.sheetnames:
                     continue
 
-            # if the sheet already exists, skip it
-            if name in wb.sheetnames:
-                continue
+                # otherwise, create the new asset‑type sheet
+                ws = wb.create_sheet(title=name)
+                # if the default 'Sheet' placeholder still exists (and there's >1 sheet), drop it
+                if 'Sheet' in wb.sheetnames and len(wb.sheetnames) > 1:
+                    wb.remove(wb['Sheet'])
 
-            # otherwise, create the new asset‑type sheet
-            ws = wb.create_sheet(title=name)
-            # if the default 'Sheet' placeholder still exists (and there's >1 sheet), drop it
-            if 'Sheet' in wb.sheetnames and len(wb.sheetnames) > 1:
-                wb.remove(wb['Sheet'])
-
-            # write the header row
-            for idx, col in enumerate(core_cols, start=1):
-                ws.cell(row=2, column=idx, value=col)
-            wb.save(loc_file)
+                # write the header row
+                for idx, col in enumerate(core_cols, start=1):
+                    ws.cell(row=2, column=idx, value=col)
+                workbook_writer.save(loc_file, wb)
 
         # 3) done all locations—return success immediately (no exception)
         return {'success': True, 'added': True}
 
 def delete_all_data_files() -> dict:
+    # drop unsaved edits so they can't resurrect the files below
+    workbook_writer.discard()
     # remove lookup file
     for p in glob.glob(os.path.join(DATA_DIR,   '*.xlsx')):
         if os.path.basename(p) == 'lookups.xlsx':
@@ -280,6 +330,7 @@ def add_new_company(name: str, active: bool = False) -> bool:
     flag = "TRUE" if active else ""
     return append_to_lookup('Companies', name, flag)
 
+@_writes_lookups
 def update_lookup_parent(sheet_name: str, entry_value: str, parent_value: str) -> bool:
     """
     In LOOKUPS_PATH[sheet_name], find or append rows of (entry, parent).
@@ -287,7 +338,18 @@ def update_lookup_parent(sheet_name: str, entry_value: str, parent_value: str) -
       (each with its own random color), never reuse colors.
     * Companies/Locations → do nothing if already present; else update or append.
     """
-    wb = load_workbook(LOOKUPS_PATH)
+    # answer the common "already recorded" case from memory without opening the workbook
+    known = lookups_store.parents(sheet_name, entry_value)
+    if known is None:
+        return False
+    wanted = (parent_value or '').strip().lower()
+    if sheet_name == 'AssetTypes':
+        if '' not in known and wanted in (p.lower() for p in known):
+            return False
+    elif known and known[0].lower() == wanted:
+        return False
+
+    wb = workbook_writer.load(LOOKUPS_PATH)
     if sheet_name not in wb.sheetnames:
         return False
     ws = wb[sheet_name]
@@ -309,7 +371,7 @@ def update_lookup_parent(sheet_name: str, entry_value: str, parent_value: str) -
             loc = (row[1].value or '').strip()
             if loc == '':
                 row[1].value = parent
-                wb.save(LOOKUPS_PATH)
+                workbook_writer.save(LOOKUPS_PATH, wb)
                 return True
 
         # 2) if this exact parent already exists, do nothing
@@ -319,7 +381,7 @@ def update_lookup_parent(sheet_name: str, entry_value: str, parent_value: str) -
 
         # 3) otherwise append a brand‐new row with its own color
         ws.append([entry, parent, _get_random_color()])
-        wb.save(LOOKUPS_PATH)
+        workbook_writer.save(LOOKUPS_PATH, wb)
         return True
 
     # ——— Companies & Locations: update in‑place if found, no‑op if same, else append ———
@@ -331,12 +393,12 @@ def update_lookup_parent(sheet_name: str, entry_value: str, parent_value: str) -
                 return False
             # else overwrite
             row[1].value = parent
-            wb.save(LOOKUPS_PATH)
+            workbook_writer.save(LOOKUPS_PATH, wb)
             return True
 
     # not found → append new row
     ws.append([entry, parent])
-    wb.save(LOOKUPS_PATH)
+    workbook_writer.save(LOOKUPS_PATH, wb)
     return True
 
 
@@ -345,15 +407,7 @@ def get_asset_type_color(sheet_name: str, asset_type: str) -> str | None:
     Read LOOKUPS_PATH[sheet_name] for asset_type in Col A,
     return the hex color in Col C (or None if missing sheet/row).
     """
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if sheet_name not in wb.sheetnames:
-        return None
-    ws = wb[sheet_name]
-    for row in ws.iter_rows(min_row=2, max_col=3):
-        val = row[0].value
-        if isinstance(val, str) and val.strip().lower() == asset_type.strip().lower():
-            return row[2].value
-    return None
+    return lookups_store.asset_type_color(sheet_name, asset_type)
 
 def get_asset_type_color_for_location(
     sheet_name: str,
@@ -363,21 +417,7 @@ def get_asset_type_color_for_location(
     """
     Return the hex color for the row matching both asset_type AND location.
     """
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if sheet_name not in wb.sheetnames:
-        return None
-    ws = wb[sheet_name]
-    for row in ws.iter_rows(min_row=2, max_col=3):
-        at   = row[0].value
-        loc  = (row[1].value or '').strip()
-        col  = row[2].value
-        if (
-          isinstance(at, str)
-          and at.strip().lower() == asset_type.strip().lower()
-          and loc.lower() == location.strip().lower()
-        ):
-            return col
-    return None
+    return lookups_store.asset_type_color_for_location(sheet_name, asset_type, location)
 
 
 # ─── Algorithm Parameters (4th sheet) ────────────────────────────────────
@@ -386,25 +426,19 @@ def read_algorithm_parameters() -> list[dict]:
     Ensure the 'Algorithm Parameters' sheet exists, then return all rows
     as dicts [{'parameter': str, 'weight': int}, …].
     """
-    from openpyxl import load_workbook
     import pandas as pd
 
     # Create sheet if missing
     if not os.path.exists(LOOKUPS_PATH):
         ensure_lookups_file()
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if 'Algorithm Parameters' not in wb.sheetnames:
+    if not lookups_store.has_sheet('Algorithm Parameters'):
         # create blank sheet with proper header
-        with pd.ExcelWriter(LOOKUPS_PATH, engine='openpyxl', mode='a') as writer:
-            pd.DataFrame(columns=['Parameter','Weight']) \
-              .to_excel(writer, sheet_name='Algorithm Parameters', index=False)
-        wb = load_workbook(LOOKUPS_PATH, data_only=True)
+        _pandas_append_sheet('Algorithm Parameters', ['Parameter','Weight'])
 
-    ws = wb['Algorithm Parameters']
     result = []
     # columns: Applies To, Parameter, Condition, MaxWeight, Option, Weight
     for applies_to, param, condition, max_weight, option, weight, selected in \
-        ws.iter_rows(min_row=2, max_col=7, values_only=True):
+        lookups_store.rows('Algorithm Parameters', 7) or []:
         if param is None:
             continue
         result.append({
@@ -418,8 +452,9 @@ def read_algorithm_parameters() -> list[dict]:
         })
     return result
 
+@_writes_lookups
 def write_algorithm_parameters(params: list[dict]) -> dict:
-    wb = load_workbook(LOOKUPS_PATH)
+    wb = workbook_writer.load(LOOKUPS_PATH)
     if 'Algorithm Parameters' in wb.sheetnames:
         wb.remove(wb['Algorithm Parameters'])
     ws = wb.create_sheet('Algorithm Parameters')
@@ -437,7 +472,7 @@ def write_algorithm_parameters(params: list[dict]) -> dict:
             'TRUE' if row.get('selected', False) else ''
         ])
 
-    wb.save(LOOKUPS_PATH)
+    workbook_writer.save(LOOKUPS_PATH, wb)
     return {'success': True}
 
 
@@ -447,23 +482,17 @@ def read_workplan_details() -> list[dict]:
     Ensure 'Workplan Details' sheet exists, then return rows:
     [{'parameter': str, 'value': any}, ...].
     """
-    from openpyxl import load_workbook
     import pandas as pd
 
     # Guarantee lookup file
     ensure_lookups_file()
 
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if 'Workplan Details' not in wb.sheetnames:
+    if not lookups_store.has_sheet('Workplan Details'):
         # create blank sheet with header
-        with pd.ExcelWriter(LOOKUPS_PATH, engine='openpyxl', mode='a') as writer:
-            pd.DataFrame(columns=['Parameter','Value']) \
-              .to_excel(writer, sheet_name='Workplan Details', index=False)
-        wb = load_workbook(LOOKUPS_PATH, data_only=True)
+        _pandas_append_sheet('Workplan Details', ['Parameter','Value'])
 
-    ws = wb['Workplan Details']
     result = []
-    for param, val in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+    for param, val in lookups_store.rows('Workplan Details', 2) or []:
         if param is None:
             continue
         result.append({
@@ -472,13 +501,12 @@ def read_workplan_details() -> list[dict]:
         })
     return result
 
+@_writes_lookups
 def write_workplan_details(entries: list[dict]) -> dict:
     """
     Overwrite the 'Workplan Details' sheet with entries list.
     """
-    from openpyxl import load_workbook
-
-    wb = load_workbook(LOOKUPS_PATH)
+    wb = workbook_writer.load(LOOKUPS_PATH)
     # remove old sheet if present
     if 'Workplan Details' in wb.sheetnames:
         wb.remove(wb['Workplan Details'])
@@ -488,7 +516,7 @@ def write_workplan_details(entries: list[dict]) -> dict:
     # write each row
     for e in entries:
         ws.append([e.get('parameter',''), e.get('value','')])
-    wb.save(LOOKUPS_PATH)
+    workbook_writer.save(LOOKUPS_PATH, wb)
     return {'success': True}
 
 # ─── Custom Weights APIs ───────────────────────────────────────────────────
@@ -496,14 +524,11 @@ def read_custom_weights() -> list[dict]:
     """
     Return list of {'weight': str, 'active': bool}
     """
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if 'Custom Weights' not in wb.sheetnames:
+    if not lookups_store.has_sheet('Custom Weights'):
         # created earlier in ensure_data_folder
         ensure_lookups_file()
-        wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    ws = wb['Custom Weights']
     out = []
-    for w, flag in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+    for w, flag in lookups_store.rows('Custom Weights', 2) or []:
         if w is None: continue
         out.append({
             'weight': str(w),
@@ -522,24 +547,20 @@ def read_workplan_constants() -> list[dict]:
     Ensure 'Workplan Constants' exists, then return rows as
     [{'field': str, 'value': any}, …].
     """
-    if not os.path.exists(LOOKUPS_PATH):
-        ensure_lookups_file()
-    wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    if 'Workplan Constants' not in wb.sheetnames:
+    if not lookups_store.has_sheet('Workplan Constants'):
         ensure_lookups_file()
-        wb = load_workbook(LOOKUPS_PATH, data_only=True)
-    ws = wb['Workplan Constants']
     out = []
-    for field, val in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+    for field, val in lookups_store.rows('Workplan Constants', 2) or []:
         if field is None: continue
         out.append({'field': str(field), 'value': val})
     return out
 
+@_writes_lookups
 def write_workplan_constants(entries: list[dict]) -> dict:
     """
     Overwrite the 'Workplan Constants' sheet with the given entries.
     """
-    wb = load_workbook(LOOKUPS_PATH)
+    wb = workbook_writer.load(LOOKUPS_PATH)
     if 'Workplan Constants' in wb.sheetnames:
         wb.remove(wb['Workplan Constants'])
     ws = wb.create_sheet('Workplan Constants')
@@ -549,5 +570,5 @@ def write_workplan_constants(entries: list[dict]) -> dict:
     ws['B1'].font = Font(bold=True)
     for e in entries:
         ws.append([e.get('field',''), e.get('value','')])
-    wb.save(LOOKUPS_PATH)
+    workbook_writer.save(LOOKUPS_PATH, wb)
     return {'success': True}
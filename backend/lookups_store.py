@@ -0,0 +1,204 @@
+# backend/lookups_store.py
+# In-memory copy of lookups.xlsx: every sheet parsed once into row tables plus dict indexes for the hot
+# lookups (asset-type colours, company → locations, duplicate checks). Rebuilt only when the file's
+# (mtime_ns, size) moves or a write-behind edit is pending, so reads never reopen the workbook.
+
+import threading
+
+import openpyxl
+
+from .file_locks      import file_locks
+from .workbook_writer import workbook_writer
+
+
+def _text(value) -> str:
+    return str(value).strip() if value is not None else ''
+
+def station_color(table: dict, asset_type, location, default: str = '#000000') -> str:
+    """
+    Resolve one station's colour against a color_table(): the
+    (asset_type + location) row first, then the asset type's generic row.
+    """
+    at = _text(asset_type).lower()
+    return (
+        table['by_location'].get(at, {}).get(_text(location).lower())
+        or table['generic'].get(at)
+        or default
+    )
+
+def _read_tables(wb) -> dict[str, list[tuple]]:
+    """{sheet: [row tuples from row 1]} for every sheet of an open workbook."""
+    return {name: [tuple(r) for r in wb[name].iter_rows(values_only=True)] for name in wb.sheetnames}
+
+
+class LookupsStore:
+    """
+    Read side of lookups.xlsx. Writers keep going through lookups_manager
+    (load → edit → workbook_writer.save); the next read sees the pending
+    workbook straight from memory and the file is written once by the
+    write-behind flush.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature = None
+        self._tables: dict[str, list[tuple]] = {}
+        self._indexes: dict[tuple, object] = {}
+        self._lock = threading.RLock()
+        workbook_writer.on_flush(self._flushed)
+
+    # ─── Loading ────────────────────────────────────────────────────────────
+    def _fresh(self):
+        """Re-parse lookups.xlsx if it changed since the last read (caller holds the lock)."""
+        sig = workbook_writer.signature(self.path)
+        if sig is not None and sig == self._signature:
+            return
+        tables = {}
+        pending = workbook_writer.pending(self.path)
+        if pending is not None:
+            tables = _read_tables(pending)
+        elif sig is not None:
+            with file_locks.read(self.path):
+                wb = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+                try:
+                    tables = _read_tables(wb)
+                finally:
+                    wb.close()
+        self._tables, self._indexes, self._signature = tables, {}, sig
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+    def _flushed(self, path: str, generation: int):
+        # the pending workbook we parsed is now the file on disk; adopt its stat
+        if path != self.path:
+            return
+        with self._lock:
+            if self._signature == ('pending', generation):
+                self._signature = workbook_writer.signature(self.path)
+
+    def _index(self, kind: str, sheet: str, build):
+        key = (kind, sheet)
+        if key not in self._indexes:
+            self._indexes[key] = build(self._tables.get(sheet, []))
+        return self._indexes[key]
+
+    # ─── Generic tables ─────────────────────────────────────────────────────
+    def has_sheet(self, sheet: str) -> bool:
+        with self._lock:
+            self._fresh()
+            return sheet in self._tables
+
+    def rows(self, sheet: str, width: int) -> list[tuple] | None:
+        """Rows 2+ of `sheet`, padded/cut to `width` values; None if the sheet is missing."""
+        with self._lock:
+            self._fresh()
+            table = self._tables.get(sheet)
+            if table is None:
+                return None
+            pad = (None,) * width
+            return [(r + pad)[:width] for r in table[1:]]
+
+    def lookup_list(self, sheet: str) -> list[str] | None:
+        """Non-empty column A strings of rows 2+, stripped; None if the sheet is missing."""
+        with self._lock:
+            self._fresh()
+            if sheet not in self._tables:
+                return None
+            return list(self._index('list', sheet, lambda rows: [
+                r[0].strip() for r in rows[1:] if r and isinstance(r[0], str) and r[0].strip()
+            ]))
+
+    def contains(self, sheet: str, value: str) -> bool:
+        """Case-insensitive: is `value` already in column A (rows 2+) of `sheet`?"""
+        with self._lock:
+            self._fresh()
+            names = self._index('names', sheet, lambda rows: {
+                r[0].strip().lower() for r in rows[1:] if r and isinstance(r[0], str)
+            })
+            return _text(value).lower() in names
+
+    def parents(self, sheet: str, entry: str) -> list[str] | None:
+        """Column B of every row whose column A matches `entry` (case-insensitive), in sheet order."""
+        with self._lock:
+            self._fresh()
+            if sheet not in self._tables:
+                return None
+
+            def build(rows):
+                out = {}
+                for r in rows[1:]:
+                    r = tuple(r) + (None, None)
+                    if isinstance(r[0], str):
+                        out.setdefault(r[0].strip().lower(), []).append(_text(r[1]))
+                return out
+            return list(self._index('parents', sheet, build).get(_text(entry).lower(), []))
+
+    # ─── Companies / locations ──────────────────────────────────────────────
+    def active_companies(self) -> list[str]:
+        """Companies whose 'active' column is exactly TRUE."""
+        return [
+            name for name, flag in (self.rows('Companies', 2) or [])
+            if isinstance(name, str) and isinstance(flag, str) and flag.strip().upper() == 'TRUE'
+        ]
+
+    def locations_for_company(self, company: str) -> list[str]:
+        with self._lock:
+            self._fresh()
+
+            def build(rows):
+                out = {}
+                for r in rows[1:]:
+                    r = tuple(r) + (None, None)
+                    if isinstance(r[0], str):
+                        out.setdefault(r[1], []).append(r[0])
+                return out
+            return list(self._index('by_company', 'Locations', build).get(company, []))
+
+    def location_companies(self) -> dict[str, list[str]]:
+        """{location: [companies listing it]} from the Locations sheet (shared; read-only)."""
+        with self._lock:
+            self._fresh()
+
+            def build(rows):
+                out = {}
+                for r in rows[1:]:
+                    r = tuple(r) + (None, None)
+                    if isinstance(r[0], str) and isinstance(r[1], str):
+                        out.setdefault(r[0].strip(), []).append(r[1].strip())
+                return out
+            return self._index('companies_of', 'Locations', build)
+
+    # ─── Asset-type colours ─────────────────────────────────────────────────
+    def color_table(self, sheet: str = 'AssetTypes') -> dict:
+        """
+        Every colour in one lookup table, rebuilt only when lookups.xlsx changes:
+          {'generic':     {asset_type: colour of its first row},
+           'by_location': {asset_type: {location: colour}}}
+        Keys are stripped + lower-cased; the first matching row wins, like the
+        old top-down scans. Shared between callers, so treat it as read-only.
+        """
+        with self._lock:
+            self._fresh()
+
+            def build(rows):
+                generic, by_location = {}, {}
+                for r in rows[1:]:
+                    r = tuple(r) + (None, None, None)
+                    if not isinstance(r[0], str):
+                        continue
+                    at = r[0].strip().lower()
+                    generic.setdefault(at, r[2])
+                    by_location.setdefault(at, {}).setdefault(_text(r[1]).lower(), r[2])
+                return {'generic': generic, 'by_location': by_location}
+            return self._index('colors', sheet, build)
+
+    def asset_type_color(self, sheet: str, asset_type: str):
+        """Colour (column C) of the first row for `asset_type`, whatever its location."""
+        return self.color_table(sheet)['generic'].get(_text(asset_type).lower())
+
+    def asset_type_color_for_location(self, sheet: str, asset_type: str, location: str):
+        """Colour (column C) of the row matching both `asset_type` and `location`."""
+        by_location = self.color_table(sheet)['by_location']
+        return by_location.get(_text(asset_type).lower(), {}).get(_text(location).lower())
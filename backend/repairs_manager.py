@@ -3,11 +3,12 @@
 
 import os
 import glob
-from openpyxl import load_workbook
 import openpyxl
-from threading import Lock
 from .lookups_manager import LOCATIONS_DIR
 from .lookups_manager import REPAIRS_DIR
+from .station_cache import station_cache
+from .workbook_writer import workbook_writer
+from .file_locks import file_locks, atomic_save
 
 # Where to store repair files
 HERE        = os.path.dirname(__file__)
@@ -16,40 +17,27 @@ REPAIRS_DIR = os.path.join(DATA_DIR, 'repairs')
 
 # Ensure directory exists
 os.makedirs(REPAIRS_DIR, exist_ok=True)
-_lock = Lock()
 
 def _ensure_repair_file(station_id: str) -> str:
     """
-    Find the station's location by scanning data/locations/*.xlsx,
+    Find the station's location via the shared station index,
     then ensure and return the path to that location's repairs workbook.
     """
     location = None
-    for loc_file in glob.glob(os.path.join(LOCATIONS_DIR, '*.xlsx')):
-        wb = openpyxl.load_workbook(loc_file, data_only=True)
-        for sheet in wb.sheetnames:
-            ws = wb[sheet]
-            headers = [c.value for c in ws[2]]
-            if 'Station ID' not in headers:
-                continue
-            idx = headers.index('Station ID')
-            for row in ws.iter_rows(min_row=3, values_only=True):
-                if row and row[idx] and str(row[idx]).strip() == station_id:
-                    location = os.path.splitext(os.path.basename(loc_file))[0]
-                    break
-            if location:
-                break
-        if location:
-            break
+    hit = station_cache.locate(station_id)
+    if hit:
+        location = os.path.splitext(os.path.basename(hit[0]))[0]
     if not location:
         # fallback if not found
         location = station_id
 
     path = os.path.join(REPAIRS_DIR, f'{location}_repairs.xlsx')
     if not os.path.exists(path):
-        # create a fresh repairs workbook (will have exactly one sheet: "Sheet")
-        from openpyxl import Workbook
-        wb_new = Workbook()
-        wb_new.save(path)
+        with file_locks.write(path):
+            if not os.path.exists(path):
+                # create a fresh repairs workbook (will have exactly one sheet: "Sheet")
+                from openpyxl import Workbook
+                atomic_save(Workbook(), path)
 
     return path
 
@@ -62,38 +50,39 @@ def save_repair(station_id: str, repair: dict):
     """
     # 1) Ensure the workbook exists
     path = _ensure_repair_file(station_id)
-    wb = load_workbook(path)
+    with workbook_writer.editing(path):
+        wb = workbook_writer.load(path)
 
-   # 2) Use only the Station ID (max 31 chars) as the tab name
-    sheet_name = station_id[:31]
+        # 2) Use only the Station ID (max 31 chars) as the tab name
+        sheet_name = station_id[:31]
 
-    # 3) If this station’s sheet doesn’t exist yet, create it *once* and write headers
-    if sheet_name not in wb.sheetnames:
-        ws = wb.create_sheet(title=sheet_name)
+        # 3) If this station’s sheet doesn’t exist yet, create it *once* and write headers
+        if sheet_name not in wb.sheetnames:
+            ws = wb.create_sheet(title=sheet_name)
+            ws.append([
+                'Site Name',
+                'Station Number',
+                'Repair Name',
+                'Severity Ranking',
+                'Priority Ranking',
+                'Repair Cost',
+                'Category'
+            ])
+        else:
+            ws = wb[sheet_name]
+
+        # append the repair row
         ws.append([
-            'Site Name',
-            'Station Number',
-            'Repair Name',
-            'Severity Ranking',
-            'Priority Ranking',
-            'Repair Cost',
-            'Category'
+            repair['siteName'],
+            station_id,
+            repair['name'],
+            repair['severity'],
+            repair['priority'],
+            repair['cost'],
+            repair['category']
         ])
-    else:
-        ws = wb[sheet_name]
-
-    # append the repair row
-    ws.append([
-        repair['siteName'],
-        station_id,
-        repair['name'],
-        repair['severity'],
-        repair['priority'],
-        repair['cost'],
-        repair['category']
-    ])
 
-    wb.save(path)
+        workbook_writer.save(path, wb)
 
 def list_repairs(station_id: str) -> list[dict]:
     """
@@ -101,7 +90,7 @@ def list_repairs(station_id: str) -> list[dict]:
     Returns a list of dicts keyed by your header names.
     """
     path = _ensure_repair_file(station_id)
-    wb = load_workbook(path, data_only=True)
+    wb = workbook_writer.load(path, data_only=True)
     sheet_name = station_id[:31]
     if sheet_name not in wb.sheetnames:
         return []
@@ -122,15 +111,16 @@ def delete_repair(station_id: str, row_index: int) -> dict:
     for this station.
     """
     path = _ensure_repair_file(station_id)
-    wb = load_workbook(path)
-    sheet_name = station_id[:31]
-    if sheet_name not in wb.sheetnames:
-        return {"success": False, "message": f"No repairs sheet for {station_id}"}
-    ws = wb[sheet_name]
-    # header is row 1, data starts at row 2:
-    excel_row = row_index + 1
-    if excel_row < 2 or excel_row > ws.max_row:
-        return {"success": False, "message": "Row out of range"}
-    ws.delete_rows(excel_row)
-    wb.save(path)
-    return {"success": True}
+    with workbook_writer.editing(path):
+        wb = workbook_writer.load(path)
+        sheet_name = station_id[:31]
+        if sheet_name not in wb.sheetnames:
+            return {"success": False, "message": f"No repairs sheet for {station_id}"}
+        ws = wb[sheet_name]
+        # header is row 1, data starts at row 2:
+        excel_row = row_index + 1
+        if excel_row < 2 or excel_row > ws.max_row:
+            return {"success": False, "message": "Row out of range"}
+        ws.delete_rows(excel_row)
+        workbook_writer.save(path, wb)
+        return {"success": True}
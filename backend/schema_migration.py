@@ -0,0 +1,255 @@
+# backend/schema_migration.py
+# Background schema migrations for the Excel store: add / remove / rename columns of one asset-type sheet
+# across every location workbook. Jobs run one after another in a greenlet, fan the workbooks out to the
+# app's shared process pool, save each workbook exactly once and report progress, so the caller never
+# waits on them.
+
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+
+import gevent
+import gevent.queue
+import openpyxl
+
+from .config          import SCHEMA_MIGRATION_WORKERS
+from .file_locks      import file_locks, write_temp, commit_temp, discard_temp
+from .workbook_reader import _shared_pool, shutdown_pool
+from .workbook_writer import workbook_writer
+
+# How many finished jobs status() still remembers
+JOB_HISTORY = 50
+# Times a workbook edited while it was being migrated is migrated again from its new version
+MIGRATION_ATTEMPTS = 3
+
+
+# ─── Worker side (runs in the process pool; openpyxl only) ──────────────────
+def _needs_change(headers: list, remove, add, rename) -> bool:
+    return (
+        any(h in remove or h in rename for h in headers)
+        or any(h not in headers for h in add)
+    )
+
+def migrate_sheet_columns(path: str, sheet: str, remove, add, rename) -> dict | None:
+    """
+    Apply one column change-set to `sheet` of the workbook at `path`
+    (headers on row 2): delete `remove`, rename {old: new}, append `add`.
+    The result is saved to a temp file next to `path`; returns
+    {'tmp': temp path, 'headers': new headers}, or None if nothing changed.
+    """
+    wb = openpyxl.load_workbook(path)
+    if sheet not in wb.sheetnames:
+        return None
+    ws = wb[sheet]
+    headers = [c.value for c in ws[2]]
+    if not _needs_change(headers, remove, add, rename):
+        return None
+
+    # delete in reverse so indices stay valid
+    for idx in range(len(headers) - 1, -1, -1):
+        if headers[idx] in remove:
+            ws.delete_cols(idx + 1)
+            del headers[idx]
+    for idx, h in enumerate(headers):
+        if h in rename:
+            headers[idx] = rename[h]
+            ws.cell(row=2, column=idx + 1, value=headers[idx])
+    for h in add:
+        if h not in headers:
+            headers.append(h)
+            ws.cell(row=2, column=len(headers), value=h)
+
+    return {'tmp': write_temp(wb, path), 'headers': headers}
+
+
+# ─── Job runner ─────────────────────────────────────────────────────────────
+class SchemaMigrator:
+    """
+    submit(asset_type, remove, add, rename) → job dict (returns at once)
+    status(job_id=None)                     → one job, or every remembered job
+
+    A job dict looks like
+      {'id', 'asset_type', 'remove', 'add', 'rename',
+       'state': 'queued' | 'running' | 'done' | 'failed',
+       'done', 'total', 'failed': [paths], 'message'}
+    and is handed to every on_progress() callback after each workbook.
+    """
+
+    def __init__(self, workers: int | None = SCHEMA_MIGRATION_WORKERS):
+        self.workers = workers
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._queue = gevent.queue.Queue()
+        self._runner = None
+        self._listeners = []
+
+    # ─── Public API ─────────────────────────────────────────────────────────
+    def submit(self, asset_type: str, remove=(), add=(), rename=None) -> dict:
+        job = {
+            'id':         uuid.uuid4().hex[:12],
+            'asset_type': str(asset_type).strip(),
+            'remove':     [c for c in (remove or []) if c],
+            'add':        [c for c in (add or []) if c],
+            'rename':     {o: n for o, n in (rename or {}).items() if o and n and o != n},
+            'state':      'queued',
+            'done':       0,
+            'total':      0,
+            'failed':     [],
+            'message':    '',
+        }
+        self._jobs[job['id']] = job
+        self._trim()
+        self._queue.put(job['id'])
+        if self._runner is None or self._runner.dead:
+            self._runner = gevent.spawn(self._drain)
+        return dict(job)
+
+    def status(self, job_id: str | None = None):
+        if job_id is None:
+            return [dict(j) for j in self._jobs.values()]
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block (cooperatively) until every queued job has finished."""
+        runner = self._runner
+        if runner is None:
+            return True
+        runner.join(timeout)
+        return runner.dead
+
+    def on_progress(self, callback):
+        """Register callback(job dict) to run whenever a job moves forward."""
+        self._listeners.append(callback)
+
+    # ─── Internals ──────────────────────────────────────────────────────────
+    def _trim(self):
+        finished = [jid for jid, j in self._jobs.items() if j['state'] in ('done', 'failed')]
+        for jid in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[jid]
+
+    def _notify(self, job: dict):
+        for cb in self._listeners:
+            try:
+                cb(dict(job))
+            except Exception as e:
+                print(f"[schema_migration] progress listener failed: {e}")
+
+    def _drain(self):
+        while not self._queue.empty():
+            job = self._jobs.get(self._queue.get())
+            if job is None:
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                job['state'], job['message'] = 'failed', str(e)
+                print(f"[schema_migration] job {job['id']} failed: {e}")
+                self._notify(job)
+
+    def _run(self, job: dict):
+        from .station_cache import station_cache
+
+        job['state'] = 'running'
+        remove, add, rename = set(job['remove']), job['add'], job['rename']
+        targets = [
+            path for path, headers in station_cache.sheet_headers(job['asset_type']).items()
+            if _needs_change(headers, remove, add, rename)
+        ]
+        job['total'] = len(targets)
+        print(f"[schema_migration] ▶️ {job['asset_type']!r}: -{job['remove']} +{add} ~{rename} in {len(targets)} workbook(s)")
+        self._notify(job)
+
+        # Workbooks are locked one at a time and only briefly: to land their unsaved edits before
+        # the copy is migrated, and to swap the result in. A workbook edited in between is not
+        # overwritten; it goes round again from the new version.
+        pending = targets
+        for _ in range(MIGRATION_ATTEMPTS):
+            if not pending:
+                break
+            ready = {}
+            for path in pending:
+                with file_locks.write(path):
+                    if workbook_writer.flush(path)['success']:
+                        ready[path] = workbook_writer.signature(path)
+                        continue
+                # unsaved edits could not reach disk; migrating the file would lose them
+                job['failed'].append(path)
+                job['done'] += 1
+
+            pending = []
+            for path, result in self._migrate(list(ready), job['asset_type'], remove, add, rename):
+                if isinstance(result, Exception):
+                    print(f"[schema_migration] could not migrate {path}: {result}")
+                    job['failed'].append(path)
+                elif result is not None:
+                    with file_locks.write(path):
+                        edited = workbook_writer.signature(path) != ready[path]
+                        if edited:
+                            discard_temp(result['tmp'])
+                        else:
+                            try:
+                                commit_temp(result['tmp'], path)
+                            except Exception as e:
+                                print(f"[schema_migration] could not replace {path}: {e}")
+                                job['failed'].append(path)
+                    if edited:
+                        pending.append(path)
+                        continue
+                    station_cache.invalidate(path)
+                job['done'] += 1
+                self._notify(job)
+        for path in pending:
+            print(f"[schema_migration] {path} kept changing; gave up after {MIGRATION_ATTEMPTS} attempts")
+            job['failed'].append(path)
+            job['done'] += 1
+
+        job['state'] = 'failed' if job['failed'] else 'done'
+        job['message'] = (
+            f"{len(job['failed'])} workbook(s) could not be migrated" if job['failed']
+            else f"Migrated {job['total']} workbook(s)"
+        )
+        print(f"[schema_migration] ✅ {job['id']}: {job['message']}")
+        self._notify(job)
+
+    def _migrate(self, paths: list[str], sheet: str, remove, add, rename):
+        """
+        Yield (path, migrate_sheet_columns() result or exception) per workbook.
+        Waits happen on the hub's thread pool, so other eel calls keep running.
+        Several workbooks go to the app's one spawn-based process pool
+        (workbook_reader); if that can't start or breaks, the rest run here.
+        """
+        args = (sheet, remove, add, rename)
+        threadpool = gevent.get_hub().threadpool
+        workers = min(len(paths), self.workers or os.cpu_count() or 1)
+
+        todo = list(paths)
+        if workers > 1:
+            try:
+                pool = _shared_pool(workers)
+                futures = [(p, pool.submit(migrate_sheet_columns, p, *args)) for p in todo]
+            except Exception as e:
+                print(f"[schema_migration] process pool unavailable ({e}); migrating sequentially")
+                shutdown_pool()
+                futures = []
+            for path, fut in futures:
+                try:
+                    result = threadpool.apply(fut.result)
+                except BrokenProcessPool as e:
+                    print(f"[schema_migration] process pool broke ({e}); migrating the rest sequentially")
+                    shutdown_pool()
+                    break
+                except Exception as e:
+                    result = e
+                todo.remove(path)
+                yield path, result
+
+        for path in todo:
+            try:
+                yield path, threadpool.apply(migrate_sheet_columns, (path, *args))
+            except Exception as e:
+                yield path, e
+
+
+# One migrator per process
+schema_migrator = SchemaMigrator()
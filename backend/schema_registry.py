@@ -0,0 +1,111 @@
+# backend/schema_registry.py
+# One place that knows the field layout of every asset type in the Excel store: the ordered row-2
+# headers per location workbook and their union per asset type. Derived from the station cache's
+# parsed headers and rebuilt only when some sheet's headers change, never per request.
+
+import os
+
+from .station_cache   import station_cache
+from .workbook_reader import CORE_COLUMNS
+
+
+def _split(header: str) -> tuple[str, str]:
+    section, field = header.split(' – ', 1)
+    return section, field
+
+def _is_extra(header) -> bool:
+    return isinstance(header, str) and ' – ' in header
+
+
+class SchemaRegistry:
+    """
+    headers(path, sheet)            → row-2 headers of one workbook sheet (a copy), or None
+    fields(asset_type, location)    → ordered `Section – Field` columns
+    sections(asset_type, location)  → {section: [fields]} in column order
+    schema_map()                    → {asset_type: {section: {fields}}} for back-filling records
+
+    Without a location, an asset type's fields are the union over every
+    workbook (sorted path order, first appearance wins). schema_map() only
+    counts sheets that hold stations, matching the old per-request union.
+    """
+
+    def __init__(self, cache=station_cache):
+        self.cache = cache
+        # (layout version, {path: {sheet: headers}}, {asset_type: [fields]}, schema map, {location: path})
+        self._state = (None, {}, {}, {}, {})
+
+    def _sync(self):
+        version, layout = self.cache.layout()
+        if version == self._state[0]:
+            return self._state
+
+        headers, fields, schema, paths = {}, {}, {}, {}
+        for path in sorted(layout):
+            paths[os.path.splitext(os.path.basename(path))[0]] = path
+            headers[path] = {}
+            for sheet, (row2, populated) in layout[path].items():
+                headers[path][sheet] = list(row2)
+                ordered = fields.setdefault(sheet, {})
+                for h in row2:
+                    if not _is_extra(h):
+                        continue
+                    ordered.setdefault(h, None)
+                    if populated:
+                        section, field = _split(h)
+                        schema.setdefault(sheet, {}).setdefault(section, set()).add(field)
+
+        self._state = (version, headers, {at: list(o) for at, o in fields.items()}, schema, paths)
+        return self._state
+
+    @property
+    def version(self):
+        """Moves whenever any sheet's headers change."""
+        return self._sync()[0]
+
+    # ─── Lookups ────────────────────────────────────────────────────────────
+    def headers(self, path: str, sheet: str) -> list | None:
+        row2 = self._sync()[1].get(path, {}).get(sheet)
+        return list(row2) if row2 is not None else None
+
+    def sheet_headers(self, path: str, ws) -> list:
+        """
+        Row-2 headers of an open worksheet for the write paths: the registry's
+        copy padded to the sheet's width (like `[c.value for c in ws[2]]`),
+        read from the sheet itself only when the registry has no entry.
+        """
+        row2 = self.headers(path, ws.title)
+        if row2 is None or len(row2) > ws.max_column:
+            return [c.value for c in ws[2]]
+        return row2 + [None] * (ws.max_column - len(row2))
+
+    def fields(self, asset_type: str, location: str | None = None) -> list[str]:
+        _version, headers, fields, _schema, paths = self._sync()
+        if location is None:
+            return list(fields.get(asset_type, []))
+        row2 = headers.get(paths.get(location), {}).get(asset_type) or []
+        return [h for h in row2 if _is_extra(h)]
+
+    def sections(self, asset_type: str, location: str | None = None) -> dict[str, list[str]]:
+        out = {}
+        for h in self.fields(asset_type, location):
+            section, field = _split(h)
+            out.setdefault(section, []).append(field)
+        return out
+
+    def schema_map(self) -> dict[str, dict[str, set]]:
+        """Shared between callers; treat as read-only."""
+        return self._sync()[3]
+
+    def describe(self, asset_type: str, location: str | None = None) -> dict:
+        """What the station editor needs to lay out a form, without any station data."""
+        return {
+            'asset_type': asset_type,
+            'location':   location,
+            'core':       list(CORE_COLUMNS),
+            'sections':   self.sections(asset_type, location),
+            'version':    self._state[0],
+        }
+
+
+# One registry per process, on top of the shared station cache
+schema_registry = SchemaRegistry()
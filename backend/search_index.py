@@ -0,0 +1,321 @@
+# backend/search_index.py
+# In-memory full-text search over stations: an inverted index of folded word tokens (station id, site
+# name, status and every `Section – Field` value) with a sorted term list for prefix matches and a
+# trigram index for matches inside words. Kept up to date one station at a time.
+
+import bisect
+import functools
+import re
+import unicodedata
+
+import numpy as np
+
+# Field weights: a hit in the id outranks one in the name, which outranks status / extra fields
+FIELD_WEIGHTS = {'station_id': 4.0, 'name': 3.0, 'status': 2.0}
+EXTRA_WEIGHT  = 1.0
+# How a query token matched a term: whole word > start of a word > inside a word
+EXACT, PREFIX, INFIX = 3.0, 2.0, 1.0
+# Shorter query words only match whole words; "a" as a prefix would match most of the index
+MIN_PREFIX = 2
+
+_TOKEN = re.compile(r'[0-9a-z]+')
+
+
+def _fold_char(ch: str) -> str:
+    """Lower-case, accent-free form of one character ('É' → 'e', 'ß' → 'ss')."""
+    if ch.isascii():
+        return ch.lower()
+    return ''.join(c for c in unicodedata.normalize('NFKD', ch.casefold()) if not unicodedata.combining(c))
+
+def _fold(text: str) -> tuple[str, list[int]]:
+    """Folded text plus, for every folded character, its index in `text`."""
+    if text.isascii():
+        return text.lower(), list(range(len(text)))
+    out, where = [], []
+    for i, ch in enumerate(text):
+        folded = _fold_char(ch)
+        out.append(folded)
+        where.extend([i] * len(folded))
+    return ''.join(out), where
+
+@functools.lru_cache(maxsize=1 << 16)
+def tokenize(text: str) -> tuple[str, ...]:
+    # station sheets repeat the same values (statuses, offices, provinces) thousands of times
+    folded = text.lower() if text.isascii() else _fold(text)[0]
+    return tuple(_TOKEN.findall(folded))
+
+def _trigrams(term: str) -> set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+@functools.lru_cache(maxsize=4096)
+def _searchable(key) -> bool:
+    return key in FIELD_WEIGHTS or (isinstance(key, str) and ' – ' in key)
+
+def _text(value) -> str | None:
+    if type(value) is str:
+        return value.strip() or None
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+def searchable_fields(stn: dict) -> dict[str, str]:
+    """{field: text} of the station values the index covers."""
+    out = {}
+    for key, value in stn.items():
+        if value is not None and _searchable(key):
+            text = _text(value)
+            if text is not None:
+                out[key] = text
+    return out
+
+
+class SearchIndex:
+    """
+    search(query, limit, within)
+                           → {'total', 'results': [{station_id, name, asset_type,
+                              province, score, highlights}]}, best first
+    sync(stations, ids)    → bring the index in line with the station list,
+                              re-tokenising only stations whose text changed
+
+    Every query word must match some term of the station: the whole word,
+    the start of a word, or (3+ characters) anywhere inside one. Stations
+    live in integer slots so scoring runs over numpy arrays; equal scores
+    are ordered by station id (then asset type, province), however the
+    index got to its current contents.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._docs: list = []                     # slot → (key, station record, {field: text}) or None
+        self._slots: dict[tuple, int] = {}        # key → slot
+        self._by_id: dict[str, set] = {}          # station id → keys
+        self._postings: dict[str, dict] = {}      # term → {slot: best field weight}
+        self._arrays: dict[str, tuple] = {}       # term → (slots, weights) as numpy, built on first use
+        self._trigrams: dict[str, set] = {}       # trigram → terms containing it
+        self._sorted: list[str] | None = None     # sorted terms for prefix ranges, rebuilt on first use
+        self._order = None                        # slot → tie-break rank (numpy), rebuilt on first use
+
+    def __len__(self):
+        return len(self._slots)
+
+    # ─── Maintenance ────────────────────────────────────────────────────────
+    @staticmethod
+    def _terms_of(texts: dict) -> dict[str, float]:
+        terms = {}
+        for field, text in texts.items():
+            weight = FIELD_WEIGHTS.get(field, EXTRA_WEIGHT)
+            for term in tokenize(text):
+                if weight > terms.get(term, 0.0):
+                    terms[term] = weight
+        return terms
+
+    def _add(self, key, stn: dict, texts: dict):
+        slot = len(self._docs)
+        self._docs.append((key, stn, texts))
+        self._slots[key] = slot
+        self._by_id.setdefault(key[2], set()).add(key)
+        self._order = None
+        for term, weight in self._terms_of(texts).items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted = None
+                for tri in _trigrams(term):
+                    self._trigrams.setdefault(tri, set()).add(term)
+            postings[slot] = weight
+            if self._arrays:
+                self._arrays.pop(term, None)
+
+    def _remove(self, key):
+        slot = self._slots.pop(key)
+        _key, _stn, texts = self._docs[slot]
+        self._docs[slot] = None
+        self._order = None
+        ids = self._by_id.get(key[2])
+        if ids is not None:
+            ids.discard(key)
+            if not ids:
+                del self._by_id[key[2]]
+        for term in self._terms_of(texts):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(slot, None)
+            self._arrays.pop(term, None)
+            if postings:
+                continue
+            del self._postings[term]
+            self._sorted = None
+            for tri in _trigrams(term):
+                terms = self._trigrams.get(tri)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self._trigrams[tri]
+
+    def sync(self, stations: list[dict], ids=None) -> dict:
+        """
+        Index `stations`. With `ids`, only stations with those ids are looked
+        at (the caller knows nothing else changed); otherwise the whole list is
+        diffed against the index. Returns {'added', 'removed', 'updated'} counts.
+        """
+        only = None if ids is None else {str(i).strip() for i in ids}
+        current, seen = {}, {}
+        for stn in stations:
+            sid = str(stn.get('station_id')).strip()
+            if only is not None and sid not in only:
+                continue
+            base = (stn.get('asset_type'), stn.get('province'), sid)
+            # duplicate ids in one sheet still get their own slot
+            n = seen.get(base, 0)
+            seen[base] = n + 1
+            current[(*base, n)] = stn
+
+        if only is None:
+            stale = [k for k in self._slots if k not in current]
+        else:
+            stale = [k for sid in only for k in self._by_id.get(sid, ()) if k not in current]
+        for key in stale:
+            self._remove(key)
+
+        added = updated = 0
+        for key, stn in current.items():
+            slot = self._slots.get(key)
+            if slot is not None:
+                _key, old, old_texts = self._docs[slot]
+                if old == stn:
+                    continue
+                texts = searchable_fields(stn)
+                if old_texts == texts:
+                    self._docs[slot] = (key, stn, texts)   # only unindexed values moved
+                    continue
+                self._remove(key)
+                updated += 1
+            else:
+                texts = searchable_fields(stn)
+                added += 1
+            self._add(key, stn, texts)
+
+        # edits leave dead slots behind; renumber once they outweigh the live ones
+        if len(self._docs) > 2 * len(self._slots) + 1024:
+            live = [d for d in self._docs if d is not None]
+            self._reset()
+            for key, stn, texts in live:
+                self._add(key, stn, texts)
+        return {'added': added, 'removed': len(stale), 'updated': updated}
+
+    # ─── Queries ────────────────────────────────────────────────────────────
+    def _tie_order(self) -> np.ndarray:
+        if self._order is None:
+            live = sorted(
+                ((key[2], str(key[0] or ''), str(key[1] or ''), key[3]), slot)
+                for slot, (key, _stn, _texts) in ((i, d) for i, d in enumerate(self._docs) if d is not None)
+            )
+            order = np.zeros(len(self._docs), dtype=np.int64)
+            order[[slot for _k, slot in live]] = np.arange(len(live))
+            self._order = order
+        return self._order
+
+    def _array(self, term: str) -> tuple:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return arrays
+
+    def _terms_matching(self, token: str) -> dict[str, float]:
+        """{term: EXACT | PREFIX | INFIX} for one query token."""
+        terms = {}
+        if token in self._postings:
+            terms[token] = EXACT
+        if len(token) >= MIN_PREFIX:
+            if self._sorted is None:
+                self._sorted = sorted(self._postings)
+            i = bisect.bisect_left(self._sorted, token)
+            while i < len(self._sorted) and self._sorted[i].startswith(token):
+                terms.setdefault(self._sorted[i], PREFIX)
+                i += 1
+        if len(token) >= 3:
+            grams = sorted((self._trigrams.get(t, set()) for t in _trigrams(token)), key=len)
+            for term in set(grams[0]).intersection(*grams[1:]):
+                if token in term:
+                    terms.setdefault(term, INFIX)
+        return terms
+
+    def _highlights(self, texts: dict, tokens: list[str]) -> list[dict]:
+        """[{field, value, spans: [[start, end], ...]}] of the fields a query token hits."""
+        out = []
+        for field, text in texts.items():
+            folded, where = _fold(text)
+            spans = []
+            for token in tokens:
+                start = folded.find(token)
+                while start != -1:
+                    end = start + len(token)
+                    spans.append([where[start], where[end - 1] + 1])
+                    start = folded.find(token, end)
+            if not spans:
+                continue
+            spans.sort()
+            merged = [spans[0]]
+            for s, e in spans[1:]:
+                if s <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], e)
+                else:
+                    merged.append([s, e])
+            out.append({'field': field, 'value': text, 'spans': merged})
+        out.sort(key=lambda h: -FIELD_WEIGHTS.get(h['field'], EXTRA_WEIGHT))
+        return out
+
+    def search(self, query: str, limit: int | None = 50, within: set | None = None) -> dict:
+        """
+        With `within`, a set of (asset_type, province, station_id) triples, only
+        those stations are ranked, so `limit` and `total` count inside it.
+        """
+        tokens = list(dict.fromkeys(tokenize(query or '')))
+        if not tokens or not self._slots:
+            return {'total': 0, 'results': []}
+
+        n = len(self._docs)
+        total = None
+        for token in tokens:
+            # best (match kind × field weight) of each station for this token
+            best = np.zeros(n)
+            for term, kind in self._terms_matching(token).items():
+                slots, weights = self._array(term)
+                best[slots] = np.maximum(best[slots], kind * weights)
+            total = best if total is None else np.where((total > 0) & (best > 0), total + best, 0.0)
+
+        hits = np.flatnonzero(total)
+        if within is not None:
+            keep = np.fromiter((self._docs[s][0][:3] in within for s in hits.tolist()), dtype=bool, count=len(hits))
+            hits = hits[keep]
+        count = len(hits)
+        order = self._tie_order()[hits]
+        if limit is not None and 0 <= int(limit) < count:
+            # top `limit` by score, ties by tie rank: score * 2^32 - rank is exact in float64
+            rank = total[hits] * 4294967296.0 - order
+            top = np.argpartition(-rank, int(limit))[:int(limit)]
+            hits, order = hits[top], order[top]
+        hits = hits[np.lexsort((order, -total[hits]))]
+
+        results = []
+        for slot in hits.tolist():
+            key, stn, texts = self._docs[slot]
+            results.append({
+                'station_id': key[2],
+                'name':       stn.get('name'),
+                'asset_type': stn.get('asset_type'),
+                'province':   stn.get('province'),
+                'score':      float(total[slot]),
+                'highlights': self._highlights(texts, tokens),
+            })
+        return {'total': count, 'results': results}
@@ -0,0 +1,204 @@
+# backend/spatial_index.py
+# Spatial indexes over station coordinates. A uniform lat/lon grid answers viewport (bounding-box) queries
+# by only looking at the cells the box overlaps; a KD-tree over points on the unit sphere answers
+# nearest-neighbour and radius queries, with great-circle distances computed in one numpy pass.
+
+import heapq
+import math
+
+import numpy as np
+
+# Cell edge in degrees (≈ 28 km north–south); a province-wide view spans a few hundred cells
+GRID_CELL_DEG = 0.25
+# Points per KD-tree leaf; a leaf is scanned with one vectorised distance call
+KD_LEAF_SIZE = 32
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat, lon, lats, lons) -> np.ndarray:
+    """Great-circle distance in km from (lat, lon) to every (lats[i], lons[i])."""
+    lat1, lon1 = math.radians(float(lat)), math.radians(float(lon))
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _unit_xyz(lats, lons) -> np.ndarray:
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+def _chord(km: float) -> float:
+    """Straight-line distance through the unit sphere for a great-circle distance."""
+    return 2.0 * math.sin(min(float(km) / EARTH_RADIUS_KM, math.pi) / 2.0)
+
+
+class GridIndex:
+    """
+    Positions (0..n-1, in the order the coordinates were given) bucketed by
+    grid cell. Cells are numbered row-major, so each row of a query box is
+    one contiguous key range that two binary searches find.
+    """
+
+    def __init__(self, lats, lons, cell: float = GRID_CELL_DEG):
+        self.cell  = float(cell)
+        self.ncols = int(math.ceil(360.0 / self.cell)) + 1
+        self.lat   = np.asarray(lats, dtype=np.float64)
+        self.lon   = np.asarray(lons, dtype=np.float64)
+
+        ok = np.isfinite(self.lat) & np.isfinite(self.lon)
+        keys = np.full(len(self.lat), -1, dtype=np.int64)   # -1: never inside any box
+        keys[ok] = self._row(self.lat[ok]) * self.ncols + self._col(self.lon[ok])
+        self._order = np.argsort(keys, kind='stable')
+        self._keys  = keys[self._order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _row(self, lat):
+        return np.floor((np.clip(lat, -90.0, 90.0) + 90.0) / self.cell).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor((np.clip(lon, -180.0, 180.0) + 180.0) / self.cell).astype(np.int64)
+
+    def query(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        Sorted positions of every point with south <= lat <= north and
+        west <= lon <= east. A box with west > east wraps the antimeridian.
+        """
+        if south > north or not len(self.lat):
+            return np.empty(0, dtype=np.int64)
+        if west > east:
+            return np.union1d(self.query(south, west, north, 180.0), self.query(south, -180.0, north, east))
+
+        rows = np.arange(self._row(np.float64(south)), self._row(np.float64(north)) + 1, dtype=np.int64)
+        c0, c1 = self._col(np.float64(west)), self._col(np.float64(east))
+        lo = np.searchsorted(self._keys, rows * self.ncols + c0, side='left')
+        hi = np.searchsorted(self._keys, rows * self.ncols + c1, side='right')
+        spans = [self._order[a:b] for a, b in zip(lo, hi) if b > a]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+
+        # edge cells stick out of the box; keep only the points really inside it
+        hits = np.concatenate(spans)
+        lat, lon = self.lat[hits], self.lon[hits]
+        hits = hits[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        hits.sort()
+        return hits
+
+
+class KDTree:
+    """
+    Positions (0..n-1, in the order the coordinates were given) in a KD-tree
+    over 3-D unit vectors, so distances have no seam at the antimeridian or
+    the poles. Straight-line (chord) distance orders points exactly like
+    great-circle distance, which lets the tree prune with plain boxes; the
+    points that survive are measured with haversine_km.
+    """
+
+    def __init__(self, lats, lons, leaf_size: int = KD_LEAF_SIZE):
+        lat = np.asarray(lats, dtype=np.float64)
+        lon = np.asarray(lons, dtype=np.float64)
+        ok  = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        self.size = len(lat)
+        xyz = _unit_xyz(lat[ok], lon[ok])
+
+        # nodes in arrays: [start, end) of the reordered points, children (-1 for a leaf), bounding box
+        start, end, left, right, lo, hi = [], [], [], [], [], []
+        order = np.arange(len(ok))
+        stack = [(0, len(ok), None, False)] if len(ok) else []
+        while stack:
+            a, b, parent, is_right = stack.pop()
+            node = len(start)
+            if parent is not None:
+                (right if is_right else left)[parent] = node
+            pts = xyz[order[a:b]]
+            start.append(a); end.append(b); left.append(-1); right.append(-1)
+            lo.append(pts.min(axis=0)); hi.append(pts.max(axis=0))
+            if b - a <= leaf_size:
+                continue
+            axis = int(np.argmax(hi[-1] - lo[-1]))
+            mid  = (a + b) // 2
+            sub  = order[a:b]
+            order[a:b] = sub[np.argpartition(xyz[sub, axis], mid - a)]
+            stack.append((mid, b, node, True))
+            stack.append((a, mid, node, False))
+
+        self._start = np.array(start, dtype=np.int64)
+        self._end   = np.array(end, dtype=np.int64)
+        self._left  = left
+        self._right = right
+        self._lo    = np.array(lo).reshape(-1, 3)
+        self._hi    = np.array(hi).reshape(-1, 3)
+        self._xyz   = xyz[order]
+        self._pos   = ok[order]
+        self._lat   = lat[self._pos]
+        self._lon   = lon[self._pos]
+
+    def __len__(self):
+        return len(self._pos)
+
+    def _box_dist2(self, node: int, q: np.ndarray) -> float:
+        gap = np.maximum(np.maximum(self._lo[node] - q, q - self._hi[node]), 0.0)
+        return float(gap @ gap)
+
+    def _finish(self, idx: np.ndarray, lat: float, lon: float) -> tuple[np.ndarray, np.ndarray]:
+        km = haversine_km(lat, lon, self._lat[idx], self._lon[idx])
+        order = np.lexsort((self._pos[idx], km))
+        return self._pos[idx][order], km[order]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> tuple[np.ndarray, np.ndarray]:
+        """(positions, km) of every point within `radius_km`, nearest first."""
+        if not len(self._pos) or radius_km < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        q  = _unit_xyz([lat], [lon])[0]
+        r2 = _chord(radius_km) ** 2 + 1e-12
+        spans, stack = [], [0]
+        while stack:
+            node = stack.pop()
+            if self._box_dist2(node, q) > r2:
+                continue
+            if self._left[node] < 0:
+                spans.append(np.arange(self._start[node], self._end[node]))
+            else:
+                stack.extend((self._left[node], self._right[node]))
+        if not spans:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        idx = np.concatenate(spans)
+        # boxes only prune; the haversine pass decides
+        km  = haversine_km(lat, lon, self._lat[idx], self._lon[idx])
+        idx = idx[km <= radius_km]
+        return self._finish(idx, lat, lon)
+
+    def nearest(self, lat: float, lon: float, k: int, max_km: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """(positions, km) of the `k` nearest points (within `max_km` if given), nearest first."""
+        k = min(int(k), len(self._pos))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        q = _unit_xyz([lat], [lon])[0]
+        bound = _chord(max_km) ** 2 + 1e-12 if max_km is not None else math.inf
+
+        best_idx, best_d2 = np.empty(0, dtype=np.int64), np.empty(0)
+        heap = [(0.0, 0)]
+        while heap:
+            d2, node = heapq.heappop(heap)
+            if d2 > bound:
+                break
+            if self._left[node] >= 0:
+                for child in (self._left[node], self._right[node]):
+                    cd2 = self._box_dist2(child, q)
+                    if cd2 <= bound:
+                        heapq.heappush(heap, (cd2, child))
+                continue
+            idx  = np.arange(self._start[node], self._end[node])
+            diff = self._xyz[idx] - q
+            leaf_d2 = np.einsum('ij,ij->i', diff, diff)
+            keep = leaf_d2 <= bound
+            best_idx = np.concatenate((best_idx, idx[keep]))
+            best_d2  = np.concatenate((best_d2, leaf_d2[keep]))
+            if len(best_d2) >= k:
+                top = np.argpartition(best_d2, k - 1)[:k]
+                best_idx, best_d2 = best_idx[top], best_d2[top]
+                bound = min(bound, float(best_d2.max()))
+        return self._finish(best_idx, lat, lon)
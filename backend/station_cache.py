@@ -0,0 +1,507 @@
+# backend/station_cache.py
+# Keeps the parsed station rows of every data/locations/*.xlsx workbook in memory (and in an optional
+# on-disk .npz snapshot), keyed by path + mtime + size, so only workbooks that changed on disk get re-parsed.
+
+import atexit
+import os
+import glob
+import threading
+from collections import deque
+from contextlib import ExitStack
+
+from .config          import STATION_CACHE_SNAPSHOTS, EXCEL_READ_WORKERS
+from .file_locks      import file_locks
+from .lookups_manager import DATA_DIR, LOCATIONS_DIR
+from .workbook_reader import (
+    parse_location_workbooks, parse_workbook, station_key, _row_to_station, CORE_COLUMNS, SUMMARY_FIELDS
+)
+from .workbook_writer import workbook_writer
+from .station_snapshot import read_snapshot, write_snapshot
+from .spatial_index   import GridIndex, KDTree
+
+# ─── Paths & constants ──────────────────────────────────────────────────────
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+# Write-through patches remembered for changed_since(); asking about an older version means "diff everything"
+PATCH_HISTORY = 5000
+
+
+# ─── Cache ──────────────────────────────────────────────────────────────────
+def _signature(path: str):
+    """
+    (mtime_ns, size) of a workbook, or None if it vanished.
+    Workbooks with unsaved write-behind edits are keyed by ('pending', generation).
+    """
+    return workbook_writer.signature(path)
+
+class StationCache:
+    """
+    path → {'signature': (mtime_ns, size), 'stations': [...], 'rows': {sid: (sheet, row)}, 'headers': {sheet: [...]}}.
+    refresh() stats every workbook and only re-parses the ones whose
+    signature moved; callers always get shallow copies of the records.
+
+    On top of the per-workbook entries sits one station_id → path index,
+    so single-station operations (update, delete, merge, repairs) can jump
+    straight to (workbook, sheet, row, headers) instead of scanning.
+    Writes patch just their own row through note_row() / note_row_deleted();
+    the snapshot of a patched workbook is written on flush or at exit.
+    """
+
+    def __init__(
+        self,
+        locations_dir: str = LOCATIONS_DIR,
+        snapshot_dir:  str | None = None,
+        workers:       int | None = None
+    ):
+        self.locations_dir = locations_dir
+        self.snapshot_dir  = snapshot_dir
+        self.workers       = workers
+        self._entries: dict[str, dict] = {}
+        self._index:   dict[str, str]  = {}
+        self._derived = None      # (flat station list, GridIndex); rebuilt after any change
+        self._tree = None         # (flat station list, KDTree); built on the first distance query
+        self._version = 0         # bumps whenever any cached station data changes
+        self._layout: dict[str, dict] = {}   # path → {sheet: (headers, has stations)}
+        self._layout_version = 0  # bumps only when some sheet's headers (or population) change
+        self._unsaved: set[str] = set()      # patched workbooks whose snapshot is out of date
+        self._patches = deque(maxlen=PATCH_HISTORY)   # (version, station ids that patch touched)
+        self._reloaded_at = 0     # version of the last change that was not a write-through patch
+        self._lock = threading.RLock()
+
+    # ─── Snapshot files ─────────────────────────────────────────────────────
+    def _snapshot_path(self, path: str) -> str:
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.snapshot_dir, f'{name}.snapshot.npz')
+
+    def _load_snapshot(self, path: str, signature):
+        if not self.snapshot_dir:
+            return None
+        location = os.path.splitext(os.path.basename(path))[0]
+        return read_snapshot(self._snapshot_path(path), signature, location)
+
+    def _save_snapshot(self, path: str, signature, parsed: dict):
+        self._unsaved.discard(path)
+        if not self.snapshot_dir or not signature or signature[0] == 'pending':
+            return
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            write_snapshot(self._snapshot_path(path), signature, parsed)
+        except Exception as e:
+            print(f"[station_cache] could not write snapshot for {path}: {e}")
+
+    # ─── Refresh / invalidate ───────────────────────────────────────────────
+    def refresh(self) -> bool:
+        """
+        Bring the cache in line with the workbooks on disk.
+        Returns True if any workbook was (re)loaded or dropped.
+        """
+        with self._lock:
+            paths = sorted(glob.glob(os.path.join(self.locations_dir, '*.xlsx')))
+            changed = False
+
+            for gone in set(self._entries) - set(paths):
+                del self._entries[gone]
+                self._unsaved.discard(gone)
+                changed = True
+
+            stale = {}
+            for path in paths:
+                sig = _signature(path)
+                if sig is None:
+                    continue
+                entry = self._entries.get(path)
+                if entry and entry['signature'] == sig:
+                    continue
+                pending = workbook_writer.pending(path)
+                if pending is not None:
+                    # unsaved edits: read the open workbook, not the stale file
+                    location = os.path.splitext(os.path.basename(path))[0]
+                    self._entries[path] = {'signature': sig, **parse_workbook(pending, location)}
+                    self._unsaved.add(path)
+                    changed = True
+                    continue
+                parsed = self._load_snapshot(path, sig)
+                if parsed is None:
+                    stale[path] = sig
+                    continue
+                self._entries[path] = {'signature': sig, **parsed}
+                self._unsaved.discard(path)
+                changed = True
+
+            # only workbooks that really changed get parsed (fanned out across processes);
+            # the read locks keep a concurrent save from swapping a file out mid-parse
+            results = {}
+            if stale:
+                with ExitStack() as held:
+                    for path in stale:
+                        held.enter_context(file_locks.read(path))
+                    results = parse_location_workbooks(list(stale), self.workers)
+            for path, parsed in results.items():
+                if isinstance(parsed, Exception):
+                    print(f"[station_cache] failed to parse {path}: {parsed}")
+                    continue
+                self._save_snapshot(path, stale[path], parsed)
+                self._entries[path] = {'signature': stale[path], **parsed}
+                changed = True
+
+            if changed:
+                self._reindex()
+            return changed
+
+    def _reindex(self):
+        # earlier workbooks win on duplicate ids, matching the old sorted-glob scans
+        index = {}
+        for path in sorted(self._entries):
+            for sid in self._entries[path]['rows']:
+                index.setdefault(sid, path)
+        self._index = index
+        self._derived = None
+        self._version += 1
+        self._reloaded_at = self._version
+
+        layout = {path: self._sheet_layout(entry) for path, entry in self._entries.items()}
+        if layout != self._layout:
+            self._layout = layout
+            self._layout_version += 1
+
+    def _sheet_layout(self, entry: dict) -> dict:
+        counts = self._links(entry, positions=False)['counts']
+        return {sheet: (tuple(headers), counts.get(sheet, 0) > 0) for sheet, headers in entry['headers'].items()}
+
+    @staticmethod
+    def _links(entry: dict, positions: bool = True) -> dict:
+        """
+        Lookup maps over one workbook entry, built on first use after a parse:
+          cells  {sheet: {row: sid}}           the inverse of entry['rows']
+          pos    {(sheet, sid): list position}  first record of each id in entry['stations']
+          counts {sheet: number of records}
+        `pos` is dropped when a record leaves the list and rebuilt on the next lookup.
+        """
+        links = entry.get('links')
+        if links is None:
+            cells, counts = {}, {}
+            for sid, (sheet, row) in entry['rows'].items():
+                cells.setdefault(sheet, {})[row] = sid
+            for stn in entry['stations']:
+                counts[stn['asset_type']] = counts.get(stn['asset_type'], 0) + 1
+            links = entry['links'] = {'cells': cells, 'pos': None, 'counts': counts}
+        if positions and links['pos'] is None:
+            pos = {}
+            for i, stn in enumerate(entry['stations']):
+                pos.setdefault((stn['asset_type'], station_key(stn['station_id'])), i)
+            links['pos'] = pos
+        return links
+
+    def _views(self):
+        """
+        Flat station list (sorted path order, like list_stations) and its
+        spatial grid, built once per cache change.
+        """
+        if self._derived is None:
+            stations = []
+            for path in sorted(self._entries):
+                stations.extend(self._entries[path]['stations'])
+            grid = GridIndex([s['lat'] for s in stations], [s['lon'] for s in stations])
+            self._derived = (stations, grid)
+        return self._derived
+
+    def invalidate(self, path: str | None = None):
+        """Forget one workbook (or everything) so the next read re-parses it."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._unsaved.clear()
+            else:
+                self._entries.pop(path, None)
+                self._unsaved.discard(path)
+            self._reindex()
+
+    def _flushed(self, path: str, generation: int):
+        """Write-behind listener: the pending state we cached is now the file on disk."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry['signature'] == ('pending', generation):
+                entry['signature'] = _signature(path)
+                self._write_snapshot(path, entry)
+
+    def _write_snapshot(self, path: str, entry: dict):
+        self._save_snapshot(path, entry['signature'], {
+            'stations': entry['stations'], 'rows': entry['rows'], 'headers': entry['headers']
+        })
+
+    def flush_snapshots(self):
+        """Write the snapshots of patched workbooks that are saved on disk (called at exit)."""
+        with self._lock:
+            for path in list(self._unsaved):
+                entry = self._entries.get(path)
+                if entry is None:
+                    self._unsaved.discard(path)
+                elif entry['signature'] == _signature(path):
+                    self._write_snapshot(path, entry)
+
+    # ─── Reads ──────────────────────────────────────────────────────────────
+    def list_stations(self) -> list[dict]:
+        with self._lock:
+            self.refresh()
+            out = []
+            for path in sorted(self._entries):
+                out.extend(dict(s) for s in self._entries[path]['stations'])
+            return out
+
+    def list_summaries(self) -> list[dict]:
+        """list_stations() cut down to the SUMMARY_FIELDS of each station."""
+        with self._lock:
+            self.refresh()
+            stations, _grid = self._views()
+            return [{f: s[f] for f in SUMMARY_FIELDS} for s in stations]
+
+    def version(self) -> int:
+        """Counter that moves whenever list_stations() would return something different."""
+        with self._lock:
+            self.refresh()
+            return self._version
+
+    def changed_since(self, version) -> set | None:
+        """
+        Station ids whose records changed after `version` (from version()), when
+        every change since came through note_row / note_row_deleted; None when
+        the caller has to diff everything (a workbook re-read from disk, e.g.
+        edited outside the app, a new column, or history older than PATCH_HISTORY).
+        """
+        with self._lock:
+            self.refresh()
+            if version is None or version > self._version or self._reloaded_at > version:
+                return None
+            if version == self._version:
+                return set()
+            if not self._patches or self._patches[0][0] > version + 1:
+                return None
+            out = set()
+            for v, sids in self._patches:
+                if v > version:
+                    out |= sids
+            return out
+
+    def stations_in_bbox(self, south, west, north, east, limit: int | None = None) -> tuple[list[dict], int]:
+        """
+        Stations inside the box (copies, list_stations order) via the spatial
+        grid, cut to `limit` if given. Returns (stations, total inside the box).
+        """
+        with self._lock:
+            self.refresh()
+            stations, grid = self._views()
+            hits = grid.query(float(south), float(west), float(north), float(east))
+            total = len(hits)
+            if limit is not None and limit >= 0:
+                hits = hits[:int(limit)]
+            return [dict(stations[i]) for i in hits], total
+
+    def _kdtree(self):
+        stations, _grid = self._views()
+        if self._tree is None or self._tree[0] is not stations:
+            self._tree = (stations, KDTree([s['lat'] for s in stations], [s['lon'] for s in stations]))
+        return self._tree
+
+    def nearest_stations(self, lat, lon, k: int, max_km: float | None = None) -> list[dict]:
+        """
+        The `k` stations nearest to (lat, lon), within `max_km` if given,
+        nearest first; copies with a 'distance_km' key.
+        """
+        with self._lock:
+            self.refresh()
+            stations, tree = self._kdtree()
+            hits, km = tree.nearest(float(lat), float(lon), int(k), max_km)
+            return [dict(stations[i], distance_km=d) for i, d in zip(hits.tolist(), km.tolist())]
+
+    def stations_within(self, lat, lon, radius_km: float, limit: int | None = None) -> tuple[list[dict], int]:
+        """
+        Stations within `radius_km` of (lat, lon), nearest first, cut to `limit`
+        if given; copies with 'distance_km'. Returns (stations, total in range).
+        """
+        with self._lock:
+            self.refresh()
+            stations, tree = self._kdtree()
+            hits, km = tree.within(float(lat), float(lon), float(radius_km))
+            total = len(hits)
+            if limit is not None and limit >= 0:
+                hits, km = hits[:int(limit)], km[:int(limit)]
+            return [dict(stations[i], distance_km=d) for i, d in zip(hits.tolist(), km.tolist())], total
+
+    def station(self, station_id) -> dict | None:
+        """Copy of one station's record, found through the station index."""
+        sid = station_key(station_id)
+        if not sid:
+            return None
+        with self._lock:
+            self.refresh()
+            path = self._index.get(sid)
+            if path is None:
+                return None
+            entry = self._entries[path]
+            pos = self._links(entry)['pos'].get((entry['rows'][sid][0], sid))
+            return dict(entry['stations'][pos]) if pos is not None else None
+
+    def layout(self) -> tuple[int, dict]:
+        """
+        (layout version, {path: {sheet: (row-2 headers, sheet has stations)}}).
+        The version only moves when headers change or a sheet gains/loses its
+        last station, so schema consumers can key their caches on it.
+        """
+        with self._lock:
+            self.refresh()
+            return self._layout_version, self._layout
+
+    def sheet_headers(self, sheet: str) -> dict[str, list]:
+        """{workbook path: row-2 headers} for every workbook that has a `sheet` tab."""
+        with self._lock:
+            self.refresh()
+            return {
+                path: list(entry['headers'][sheet])
+                for path, entry in sorted(self._entries.items())
+                if sheet in entry['headers']
+            }
+
+    def locate(self, station_id) -> tuple[str, str, int, list] | None:
+        """
+        station_id → (workbook path, sheet, row number, header list), or None.
+        Only workbooks that changed since the last call are re-parsed.
+        """
+        sid = station_key(station_id)
+        if not sid:
+            return None
+        with self._lock:
+            self.refresh()
+            path = self._index.get(sid)
+            if path is None:
+                return None
+            entry = self._entries[path]
+            sheet, row_num = entry['rows'][sid]
+            return path, sheet, row_num, list(entry['headers'].get(sheet) or [])
+
+    # ─── Write-through patches ──────────────────────────────────────────────
+    # Excel writers call these right after saving, so the index stays current
+    # without re-parsing the workbook they just wrote. Each one touches only the
+    # written row's slots; snapshots are left for flush / exit.
+    def _touched(self, path: str, entry: dict, sids: set | None):
+        """Bookkeeping after a patch that changed the records of `sids` (None: can't tell which)."""
+        entry['signature'] = _signature(path)
+        self._unsaved.add(path)
+        self._derived = None
+        self._version += 1
+        if sids is None:
+            self._reloaded_at = self._version
+        else:
+            self._patches.append((self._version, sids))
+        layout = self._sheet_layout(entry)
+        if self._layout.get(path) != layout:
+            self._layout = {**self._layout, path: layout}
+            self._layout_version += 1
+
+    def _claim(self, sid: str, path: str):
+        """`path` now has a row for `sid`; earlier workbooks keep winning on duplicates."""
+        current = self._index.get(sid)
+        if current is None or path < current:
+            self._index[sid] = path
+
+    def _release(self, sid: str, path: str):
+        """`path` lost its row for `sid`; hand the id to the next workbook that has one."""
+        if self._index.get(sid) != path:
+            return
+        owner = next((p for p in sorted(self._entries) if sid in self._entries[p]['rows']), None)
+        if owner is None:
+            del self._index[sid]
+        else:
+            self._index[sid] = owner
+
+    def _drop_record(self, entry: dict, links: dict, sheet: str, pos: int):
+        del entry['stations'][pos]
+        links['counts'][sheet] -= 1
+        links['pos'] = None    # later positions moved; rebuilt on the next lookup
+
+    def note_row(self, path: str, sheet: str, row_num: int, headers: list, values: list):
+        """A row was appended or rewritten in `sheet`; refresh its record + index slot."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return
+            links = self._links(entry)
+            headers = list(headers)
+            values  = list(values) + [None] * max(0, len(headers) - len(values))
+            rec = dict(zip(headers, values))
+            sid = station_key(rec.get('Station ID'))
+            location = os.path.splitext(os.path.basename(path))[0]
+            cells = links['cells'].setdefault(sheet, {})
+
+            # drop whatever this row used to hold
+            old_sid = cells.get(row_num)
+            if old_sid is not None and old_sid != sid:
+                del entry['rows'][old_sid]
+                del cells[row_num]
+                self._release(old_sid, path)
+            added = [h for h in headers if h not in (entry['headers'].get(sheet) or []) and h not in CORE_COLUMNS]
+            entry['headers'][sheet] = headers
+            if added:
+                # a fresh parse gives every row of the sheet a slot for new columns
+                for s in entry['stations']:
+                    if s['asset_type'] == sheet:
+                        for h in added:
+                            s.setdefault(h, None)
+
+            station = _row_to_station(location, sheet, rec)
+            pos = links['pos'].get((sheet, old_sid or sid))
+            if pos is not None:
+                before = (sheet, station_key(entry['stations'][pos]['station_id']))
+                if station is None:
+                    self._drop_record(entry, links, sheet, pos)
+                else:
+                    entry['stations'][pos] = station
+                    after = (sheet, sid)
+                    if after != before:
+                        if links['pos'].get(before) == pos:
+                            del links['pos'][before]
+                        links['pos'].setdefault(after, pos)
+            elif station is not None:
+                entry['stations'].append(station)
+                links['pos'].setdefault((sheet, sid), len(entry['stations']) - 1)
+                links['counts'][sheet] = links['counts'].get(sheet, 0) + 1
+            if sid and sid not in entry['rows']:
+                entry['rows'][sid] = (sheet, row_num)
+                cells[row_num] = sid
+                self._claim(sid, path)
+            # a new column reshapes every record of the sheet; a row without an id can't be named
+            touched = None if added or not sid else {sid} | ({old_sid} if old_sid else set())
+            self._touched(path, entry, touched)
+
+    def note_row_deleted(self, path: str, sheet: str, row_num: int):
+        """
+        A row was deleted from `sheet`; later rows of that sheet move up by one
+        (the same rows openpyxl's delete_rows just shifted), other sheets are untouched.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return
+            links = self._links(entry)
+            cells = links['cells'].get(sheet, {})
+            gone = cells.pop(row_num, None)
+            for r in sorted(r for r in cells if r > row_num):
+                sid = cells.pop(r)
+                cells[r - 1] = sid
+                entry['rows'][sid] = (sheet, r - 1)
+            if gone is not None:
+                del entry['rows'][gone]
+                self._release(gone, path)
+                pos = links['pos'].get((sheet, gone))
+                if pos is not None:
+                    self._drop_record(entry, links, sheet, pos)
+            self._touched(path, entry, {gone} if gone is not None else None)
+
+
+# One shared cache per process (ExcelRepo, repairs, algorithm all read through it)
+station_cache = StationCache(
+    snapshot_dir=CACHE_DIR if STATION_CACHE_SNAPSHOTS else None,
+    workers=EXCEL_READ_WORKERS
+)
+workbook_writer.on_flush(station_cache._flushed)
+# registered after workbook_writer's own exit flush, so it runs first; books still pending then get
+# their snapshot from the _flushed listener when that flush writes them
+atexit.register(station_cache.flush_snapshots)
@@ -0,0 +1,108 @@
+# backend/station_fields.py
+# Extra `Section – Field` values as queryable rows: how one value is stored (text plus, when it reads as
+# a number, a float), the comparison operators a field query supports, and the same query / summary
+# evaluated in Python for the Excel store. The SQL side lives in db_repo.py (station_fields table).
+
+import datetime
+import math
+
+# Field query operators. With a numeric target the comparisons use the number, otherwise the text
+# (ISO dates compare correctly as text); `contains` is a case-insensitive substring match (casefold,
+# so 'STRASSE' finds 'Straße').
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'contains')
+# Most frequent values returned by a field summary
+SUMMARY_TOP_VALUES = 20
+
+
+def field_text(value) -> str | None:
+    """Text form of a value as stored in station_fields.value_text; None for blanks."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+def field_number(value) -> float | None:
+    """The value as a float when it is (or reads as) a finite number, else None."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return None
+    else:
+        return None
+    return number if math.isfinite(number) else None
+
+def field_rows(station_id: str, extra_data: dict | None) -> list[dict]:
+    """station_fields rows of one station's nested extra_data {section: {field: value}}; blanks are skipped."""
+    rows = []
+    for section, fields in (extra_data or {}).items():
+        if not isinstance(fields, dict):
+            continue
+        for field, value in fields.items():
+            text = field_text(value)
+            if text is not None:
+                rows.append({
+                    'station_id': station_id,
+                    'section':    section,
+                    'field':      field,
+                    'value_text': text,
+                    'value_num':  field_number(value),
+                    'value_folded': text.casefold(),
+                })
+    return rows
+
+
+# ─── Python evaluation (Excel store) ────────────────────────────────────────
+def matches(value, op: str, target) -> bool:
+    """Whether a stored value satisfies `op target`, with the same rules as the SQL query."""
+    text = field_text(value)
+    if text is None:
+        return False
+    if op == 'contains':
+        return str(target).casefold() in text.casefold()
+    goal = field_number(target)
+    if goal is not None:
+        left, right = field_number(value), goal
+        if left is None:
+            return False
+    else:
+        left, right = text, field_text(target) or ''
+    return {
+        '=':  left == right,  '!=': left != right,
+        '<':  left < right,   '<=': left <= right,
+        '>':  left > right,   '>=': left >= right,
+    }[op]
+
+def summarize(values, top: int = SUMMARY_TOP_VALUES) -> dict:
+    """
+    {count, numeric: {count, min, max, mean, sum} or None, top: [[value, count], ...]}
+    over the non-blank values of one field.
+    """
+    counts, numbers = {}, []
+    for value in values:
+        text = field_text(value)
+        if text is None:
+            continue
+        counts[text] = counts.get(text, 0) + 1
+        number = field_number(value)
+        if number is not None:
+            numbers.append(number)
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+    numeric = None
+    if numbers:
+        numeric = {
+            'count': len(numbers),
+            'min':   min(numbers),
+            'max':   max(numbers),
+            'mean':  sum(numbers) / len(numbers),
+            'sum':   sum(numbers),
+        }
+    return {'count': sum(counts.values()), 'numeric': numeric, 'top': [list(kv) for kv in ranked]}
@@ -0,0 +1,131 @@
+# backend/station_snapshot.py
+# Derived binary snapshot of one parsed location workbook: a NumPy .npz holding the core columns as arrays
+# plus one compact JSON blob for text/extra values. Excel stays the source of truth; the snapshot is only
+# trusted while its recorded (mtime_ns, size) still matches the workbook.
+
+import datetime as _dt
+import json
+import os
+
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+
+# keys every station dict carries whatever the sheet layout
+_FIXED_KEYS = ('station_id', 'name', 'province', 'lat', 'lon', 'status', 'asset_type')
+
+
+# ─── JSON blob (keeps Excel date/time cells round-tripping) ─────────────────
+def _encode_value(v):
+    if isinstance(v, _dt.datetime):
+        return {'__dt__': v.isoformat()}
+    if isinstance(v, _dt.date):
+        return {'__d__': v.isoformat()}
+    if isinstance(v, _dt.time):
+        return {'__t__': v.isoformat()}
+    if isinstance(v, _dt.timedelta):
+        return {'__td__': v.total_seconds()}
+    raise TypeError(f'Unsupported cell value {type(v).__name__}')
+
+def _decode_value(obj: dict):
+    if '__dt__' in obj:
+        return _dt.datetime.fromisoformat(obj['__dt__'])
+    if '__d__' in obj:
+        return _dt.date.fromisoformat(obj['__d__'])
+    if '__t__' in obj:
+        return _dt.time.fromisoformat(obj['__t__'])
+    if '__td__' in obj:
+        return _dt.timedelta(seconds=obj['__td__'])
+    return obj
+
+
+# ─── Write ──────────────────────────────────────────────────────────────────
+def write_snapshot(snap_path: str, signature, parsed: dict):
+    """
+    Serialise a parse_workbook() result. Columns:
+      lat, lon           float64 per station
+      sheet, layout      int32 per station (index into meta.sheets / meta.layouts)
+      row_sheet, row_num int32 per indexed station id
+      blob               uint8 JSON: meta + per-station [station_id, name, status, *extras]
+    """
+    sheets   = list(parsed['headers'])
+    sheet_no = {name: i for i, name in enumerate(sheets)}
+    layouts, layout_no = [], {}
+
+    lat, lon, sheet_col, layout_col, values = [], [], [], [], []
+    for stn in parsed['stations']:
+        extras = tuple(k for k in stn if k not in _FIXED_KEYS)
+        if extras not in layout_no:
+            layout_no[extras] = len(layouts)
+            layouts.append(list(extras))
+        if stn['asset_type'] not in sheet_no:
+            sheet_no[stn['asset_type']] = len(sheets)
+            sheets.append(stn['asset_type'])
+        lat.append(stn['lat'])
+        lon.append(stn['lon'])
+        sheet_col.append(sheet_no[stn['asset_type']])
+        layout_col.append(layout_no[extras])
+        values.append([stn['station_id'], stn['name'], stn['status'], *(stn[k] for k in extras)])
+
+    row_sids = list(parsed['rows'])
+    blob = json.dumps({
+        'sheets':   sheets,
+        'headers':  [parsed['headers'].get(s, []) for s in sheets],
+        'layouts':  layouts,
+        'row_sids': row_sids,
+        'values':   values,
+    }, default=_encode_value, separators=(',', ':')).encode('utf-8')
+
+    tmp = snap_path + '.tmp.npz'
+    np.savez(
+        tmp,
+        version=np.array([SNAPSHOT_VERSION], dtype=np.int64),
+        signature=np.array(signature, dtype=np.int64),
+        lat=np.array(lat, dtype=np.float64),
+        lon=np.array(lon, dtype=np.float64),
+        sheet=np.array(sheet_col, dtype=np.int32),
+        layout=np.array(layout_col, dtype=np.int32),
+        row_sheet=np.array([sheet_no[parsed['rows'][s][0]] for s in row_sids], dtype=np.int32),
+        row_num=np.array([parsed['rows'][s][1] for s in row_sids], dtype=np.int32),
+        blob=np.frombuffer(blob, dtype=np.uint8),
+    )
+    os.replace(tmp, snap_path)
+
+
+# ─── Read ───────────────────────────────────────────────────────────────────
+def read_snapshot(snap_path: str, signature, location: str) -> dict | None:
+    """
+    Load a snapshot back into the parse_workbook() shape, or None if it is
+    missing, from another format version, or taken from a different file state.
+    """
+    try:
+        with np.load(snap_path, allow_pickle=False) as z:
+            if int(z['version'][0]) != SNAPSHOT_VERSION or tuple(int(x) for x in z['signature']) != tuple(signature):
+                return None
+            lat, lon = z['lat'].tolist(), z['lon'].tolist()
+            sheet_col, layout_col = z['sheet'].tolist(), z['layout'].tolist()
+            row_sheet, row_num = z['row_sheet'].tolist(), z['row_num'].tolist()
+            meta = json.loads(z['blob'].tobytes().decode('utf-8'), object_hook=_decode_value)
+    except Exception:
+        return None
+
+    sheets, layouts = meta['sheets'], meta['layouts']
+    stations = []
+    for i, vals in enumerate(meta['values']):
+        stn = {
+            'station_id': vals[0],
+            'name':       vals[1],
+            'province':   location,
+            'lat':        lat[i],
+            'lon':        lon[i],
+            'status':     vals[2],
+            'asset_type': sheets[sheet_col[i]],
+        }
+        stn.update(zip(layouts[layout_col[i]], vals[3:]))
+        stations.append(stn)
+
+    return {
+        'stations': stations,
+        'rows':     {sid: (sheets[s], r) for sid, s, r in zip(meta['row_sids'], row_sheet, row_num)},
+        'headers':  dict(zip(sheets, meta['headers'])),
+    }
@@ -0,0 +1,83 @@
+# backend/transport.py
+# Opt-in compression for large eel responses: an endpoint wrapped in @compressible sends results above a
+# size threshold as a zlib + base64 envelope instead of raw JSON text, and records raw vs sent bytes so
+# get_transport_stats() can show which endpoints are worth it.
+
+import base64
+import functools
+import json
+import threading
+import time
+import zlib
+
+from .config import TRANSPORT_COMPRESSION, TRANSPORT_COMPRESS_THRESHOLD
+
+ENVELOPE = 'zlib+base64'
+COMPRESS_LEVEL = 6
+
+_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+
+
+def _encode(obj) -> str:
+    # the same encoding eel applies to return values
+    return json.dumps(obj, default=lambda o: None)
+
+def pack(obj, threshold: int = TRANSPORT_COMPRESS_THRESHOLD):
+    """
+    (value to return, raw JSON bytes, bytes on the wire). Results whose JSON
+    is bigger than `threshold` become
+      {'__transport__': 'zlib+base64', 'data': <base64 zlib stream>, 'raw_bytes': n}
+    """
+    text = _encode(obj).encode('utf-8')
+    raw = len(text)
+    if not TRANSPORT_COMPRESSION or raw <= threshold:
+        return obj, raw, raw
+    data = base64.b64encode(zlib.compress(text, COMPRESS_LEVEL)).decode('ascii')
+    envelope = {'__transport__': ENVELOPE, 'data': data, 'raw_bytes': raw}
+    return envelope, raw, len(_encode(envelope))
+
+def _record(name: str, raw: int, sent: int, packed: bool, seconds: float):
+    with _stats_lock:
+        s = _stats.setdefault(name, {
+            'calls': 0, 'compressed_calls': 0, 'raw_bytes': 0, 'sent_bytes': 0, 'encode_ms': 0.0
+        })
+        s['calls']      += 1
+        s['raw_bytes']  += raw
+        s['sent_bytes'] += sent
+        s['encode_ms']  += seconds * 1000
+        if packed:
+            s['compressed_calls'] += 1
+
+def compressible(func=None, *, threshold: int = TRANSPORT_COMPRESS_THRESHOLD):
+    """
+    Decorator for eel-exposed functions (put it under @eel.expose):
+
+        @eel.expose
+        @compressible
+        def list_photos(...): ...
+
+    The JS side must pass the result through unpackResponse() (data_api.js).
+    """
+    if func is None:
+        return functools.partial(compressible, threshold=threshold)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        t = time.perf_counter()
+        out, raw, sent = pack(result, threshold)
+        _record(func.__name__, raw, sent, out is not result, time.perf_counter() - t)
+        return out
+    return wrapper
+
+def transport_stats(reset: bool = False) -> dict:
+    """{endpoint: {calls, compressed_calls, raw_bytes, sent_bytes, encode_ms, ratio}}"""
+    with _stats_lock:
+        out = {
+            name: {**s, 'ratio': round(s['raw_bytes'] / s['sent_bytes'], 2) if s['sent_bytes'] else None}
+            for name, s in _stats.items()
+        }
+        if reset:
+            _stats.clear()
+    return out
@@ -0,0 +1,162 @@
+# backend/workbook_reader.py
+# Fast read path for data/locations/*.xlsx: streams each workbook with openpyxl's read_only/values_only mode
+# and fans large cold loads out to one long-lived process pool. Kept free of app imports so the spawned
+# workers only import this module (run.py keeps its app import under the __main__ guard for the same reason).
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import openpyxl
+
+CORE_COLUMNS = (
+    'Station ID', 'Site Name', 'Province',
+    'Latitude', 'Longitude', 'Status',
+    'Asset Type'
+)
+# The station-record keys those columns become: everything a map marker or list row needs
+SUMMARY_FIELDS = ('station_id', 'name', 'province', 'lat', 'lon', 'status', 'asset_type')
+
+# Only loads at least this big go to the process pool; smaller ones (a refresh after one or two
+# edits) parse faster in-process than it takes to ship the results back from a worker
+PARALLEL_MIN_WORKBOOKS = 4
+PARALLEL_MIN_BYTES     = 4 * 1024**2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _row_to_station(location: str, asset_type: str, rec: dict) -> dict | None:
+    """
+    Turn one {header: value} row into the flat station dict the front-end expects.
+    Rows without numeric coordinates are skipped (returns None).
+    """
+    try:
+        lat = float(rec.get('Latitude'))
+        lon = float(rec.get('Longitude'))
+    except (TypeError, ValueError):
+        return None
+    return {
+        'station_id': rec.get('Station ID'),
+        'name':       rec.get('Site Name'),
+        'province':   location,
+        'lat':        lat,
+        'lon':        lon,
+        'status':     rec.get('Status'),
+        'asset_type': asset_type,
+        **{k: v for k, v in rec.items() if k not in CORE_COLUMNS}
+    }
+
+def station_key(value) -> str:
+    """Normalise a Station ID cell the way every row lookup compares it."""
+    return str(value).strip() if value is not None else ''
+
+def parse_workbook(wb, location: str) -> dict:
+    """
+    Read every asset-type sheet of an open location workbook
+    (headers on row 2, data from row 3). Returns
+      {'stations': [station dicts with valid coordinates],
+       'rows':     {station_id: (sheet, row_number)},   # every row with an id
+       'headers':  {sheet: [row-2 headers]}}
+    """
+    stations = []
+    row_index = {}
+    header_map = {}
+    for asset_type in wb.sheetnames:
+        rows = wb[asset_type].iter_rows(min_row=2, values_only=True)
+        headers = list(next(rows, None) or ())
+        header_map[asset_type] = headers
+        width = len(headers)
+        idx_sid = headers.index('Station ID') if 'Station ID' in headers else None
+        for row_num, row in enumerate(rows, start=3):
+            # read-only rows can come back shorter than the header row
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            if idx_sid is not None:
+                sid = station_key(row[idx_sid])
+                if sid:
+                    # first occurrence wins, like the old top-down scans
+                    row_index.setdefault(sid, (asset_type, row_num))
+            station = _row_to_station(location, asset_type, dict(zip(headers, row)))
+            if station is not None:
+                stations.append(station)
+    return {'stations': stations, 'rows': row_index, 'headers': header_map}
+
+def parse_location_workbook(path: str) -> dict:
+    """Stream one location workbook from disk (read-only) through parse_workbook()."""
+    location = os.path.splitext(os.path.basename(path))[0]
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return parse_workbook(wb, location)
+    finally:
+        # read-only workbooks hold the file handle open until closed
+        wb.close()
+
+def _shared_pool(workers: int) -> ProcessPoolExecutor:
+    """The process pool, started on first use and kept for the life of the app."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn on every platform: a forked child would inherit gevent's hub, eel's sockets and
+            # open database connections; spawned ones start clean and import only this module
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def shutdown_pool():
+    """Stop the worker processes (at exit, or after the pool broke)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(shutdown_pool)
+
+def _is_large(paths: list[str]) -> bool:
+    if len(paths) < PARALLEL_MIN_WORKBOOKS:
+        return False
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total >= PARALLEL_MIN_BYTES
+
+def parse_location_workbooks(paths: list[str], workers: int | None = None) -> dict[str, dict | Exception]:
+    """
+    Parse several workbooks. Large loads (PARALLEL_MIN_WORKBOOKS / PARALLEL_MIN_BYTES,
+    typically the cold start) go to the shared process pool unless workers == 1;
+    everything else is read in-process. Returns {path: parsed} in the same order
+    as `paths`; a workbook that failed to parse maps to its exception instead.
+    Falls back to a sequential read if the pool cannot be started or breaks.
+    """
+    out: dict[str, dict | Exception] = {}
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and _is_large(paths):
+        try:
+            pool = _shared_pool(workers)
+            futures = [(p, pool.submit(parse_location_workbook, p)) for p in paths]
+            for path, fut in futures:
+                try:
+                    out[path] = fut.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    out[path] = e
+            return out
+        except Exception as e:
+            print(f"[workbook_reader] process pool unavailable ({e}); reading sequentially")
+            shutdown_pool()
+            out.clear()
+
+    for path in paths:
+        try:
+            out[path] = parse_location_workbook(path)
+        except Exception as e:
+            out[path] = e
+    return out
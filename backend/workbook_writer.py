@@ -0,0 +1,192 @@
+# backend/workbook_writer.py
+# Write-behind unit of work for Excel mode: edited workbooks stay open in memory, so an edit never reads
+# its file back, and the save runs after the call returned (once the debounce window passes, before the
+# next edit of the same file, or on flush()/shutdown); reads between edits coalesce into no saves at all.
+
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+
+import gevent
+from openpyxl import load_workbook
+
+from .config     import WRITE_BEHIND_DELAY
+from .file_locks import file_locks, atomic_save
+
+
+def _file_signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class WorkbookWriter:
+    """
+    editing(path)     → context for a load → edit → save: holds the file's write lock and first
+                        writes the file's pending edits, so a block that raises halfway only
+                        loses its own half-done workbook
+    load(path)        → the pending in-memory workbook if there is one, else the workbook last
+                        written (if the file is unchanged since), else a fresh load from disk
+    save(path, wb)    → mark `wb` dirty; it is written once the debounce timer fires
+    flush(path=None)  → write dirty workbooks now (all of them by default)
+
+    The timer is a gevent greenlet, so it only runs between eel calls and
+    never saves a workbook while another call is halfway through editing it.
+    """
+
+    def __init__(self, delay: float = WRITE_BEHIND_DELAY):
+        self.delay = delay
+        self._books: dict[str, object] = {}      # path → dirty Workbook
+        self._saved: dict[str, tuple] = {}       # path → (Workbook, file signature) as last written
+        self._generation: dict[str, int] = {}    # path → bumps on every save()
+        self._listeners = []
+        self._discard_listeners = []
+        self._timer = None
+        self._lock = threading.RLock()
+
+    # ─── Reads ──────────────────────────────────────────────────────────────
+    def load(self, path: str, **kwargs):
+        """
+        Drop-in for openpyxl.load_workbook that sees pending edits. Editors get
+        the pending workbook itself, or take over the one last written while the
+        file still matches it; read_only / data_only loads are never handed
+        that shared, writable copy: its edits are saved first and the file is
+        loaded fresh with the options asked for.
+        """
+        if kwargs.get('read_only') or kwargs.get('data_only'):
+            if self.pending(path) is not None:
+                self.flush(path)
+        else:
+            with self._lock:
+                wb = self._books.get(path)
+                saved = self._saved.pop(path, None)
+            if wb is not None:
+                return wb
+            if saved is not None and saved[1] == _file_signature(path):
+                return saved[0]
+        with file_locks.read(path):
+            return load_workbook(path, **kwargs)
+
+    def pending(self, path: str):
+        with self._lock:
+            return self._books.get(path)
+
+    def pending_generation(self, path: str) -> int | None:
+        """Counter of unsaved edits to `path`, or None if it is clean on disk."""
+        with self._lock:
+            if path not in self._books:
+                return None
+            return self._generation.get(path, 0)
+
+    def signature(self, path: str):
+        """
+        Cache key for derived copies of a workbook: (mtime_ns, size) on disk,
+        ('pending', generation) while it has unsaved edits, or None if it is missing.
+        """
+        gen = self.pending_generation(path)
+        if gen is not None:
+            return ('pending', gen)
+        return _file_signature(path)
+
+    # ─── Writes ─────────────────────────────────────────────────────────────
+    @contextmanager
+    def editing(self, path: str):
+        """
+        Hold `path`'s write lock for a whole load → edit → save. Edits already
+        queued for `path` are written first, so the block edits a workbook
+        nothing else depends on: if it raises before save(), that workbook is
+        simply never saved and every edit acknowledged earlier is on disk.
+        Raises OSError, without running the block, if those edits can't be
+        written (they stay queued and are retried).
+        """
+        with file_locks.write(path):
+            if self.pending(path) is not None and path in self.flush(path)["failed"]:
+                raise OSError(f"Unsaved changes to {os.path.basename(path)} could not be written; "
+                              f"close the file if it is open elsewhere and try again")
+            yield
+
+    def save(self, path: str, wb):
+        """Queue `wb` to be written to `path`; writes straight through if delay <= 0."""
+        with self._lock:
+            self._books[path] = wb
+            self._generation[path] = self._generation.get(path, 0) + 1
+        if self.delay <= 0:
+            self.flush(path)
+        else:
+            self._schedule()
+
+    def _schedule(self):
+        # debounce: every save pushes the flush back by `delay` seconds
+        if self._timer is not None:
+            self._timer.kill(block=False)
+        self._timer = gevent.spawn_later(self.delay, self.flush)
+
+    def flush(self, path: str | None = None) -> dict:
+        """
+        Save dirty workbooks to disk. A workbook that fails to save
+        (e.g. the file is open in Excel) stays dirty and is retried later.
+        """
+        with self._lock:
+            paths = [path] if path is not None else list(self._books)
+        saved, failed = [], []
+        for p in paths:
+            # wait for any writer still editing this workbook, then swap the file in atomically
+            with file_locks.write(p):
+                with self._lock:
+                    wb  = self._books.get(p)
+                    gen = self._generation.get(p, 0)
+                if wb is None:
+                    continue
+                try:
+                    atomic_save(wb, p)
+                except Exception as e:
+                    print(f"[workbook_writer] could not save {p}: {e}")
+                    failed.append(p)
+                    continue
+                with self._lock:
+                    if self._generation.get(p, 0) == gen:
+                        del self._books[p]
+                        # the next edit starts from this copy instead of reading the file back
+                        self._saved[p] = (wb, _file_signature(p))
+                saved.append(p)
+                for cb in self._listeners:
+                    try:
+                        cb(p, gen)
+                    except Exception as e:
+                        print(f"[workbook_writer] flush listener failed for {p}: {e}")
+        if failed and self.delay > 0:
+            self._schedule()
+        return {"success": not failed, "saved": saved, "failed": failed}
+
+    def discard(self, path: str | None = None):
+        """Forget pending edits without saving (the data folder is being wiped)."""
+        with self._lock:
+            if path is None:
+                dropped = list(self._books)
+                self._books.clear()
+                self._saved.clear()
+            else:
+                dropped = [path] if self._books.pop(path, None) is not None else []
+                self._saved.pop(path, None)
+        for p in dropped:
+            for cb in self._discard_listeners:
+                try:
+                    cb(p)
+                except Exception as e:
+                    print(f"[workbook_writer] discard listener failed for {p}: {e}")
+
+    def on_flush(self, callback):
+        """Register callback(path, generation) to run after a pending workbook hits disk."""
+        self._listeners.append(callback)
+
+    def on_discard(self, callback):
+        """Register callback(path) to run after a pending workbook was dropped unsaved."""
+        self._discard_listeners.append(callback)
+
+
+# One writer per process; anything still dirty is written on interpreter shutdown
+workbook_writer = WorkbookWriter()
+atexit.register(workbook_writer.flush)
@@ -234,19 +234,22 @@ document.addEventListener('DOMContentLoaded', () => {
               <th class="station-id">Station ID</th>
               <th>Operation</th>
               <th class="num">Score</th>
+              <th>Nearest Trip</th>
             </tr>
           </thead>
           <tbody></tbody>`;
         const tbody = table.querySelector('tbody');
 
         data.unplanned.forEach((r, i) => {
+          const near = r.nearest_trip;
           const tr = document.createElement('tr');
           tr.innerHTML = `
             <td class="rank">${i + 1}</td>
             <td>${nameById.get(String(r.station_id)) || ''}</td>
             <td class="station-id">${r.station_id}</td>
             <td>${r.operation || ''}</td>
-            <td class="num">${Number.isFinite(r.score) ? r.score.toFixed(2) + '%' : ''}</td>`;
+            <td class="num">${Number.isFinite(r.score) ? r.score.toFixed(2) + '%' : ''}</td>
+            <td>${near ? `${near.trip_name} (${near.distance_km} km from ${near.station_id})` : ''}</td>`;
           tbody.appendChild(tr);
         });
         sec.appendChild(table);
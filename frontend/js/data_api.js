@@ -2,18 +2,158 @@
 // Exposes a thin wrapper (window.electronAPI) that maps front-end calls to your Python/Eel functions.
 
 // ─── Cache infra data so we only hit Eel once ───────────────────────────────
+// Only each station's core columns + colour are cached; full records are
+// fetched one at a time through getStationDetail().
 let stationDataCache = null;
+// version token of the backend change feed that stationDataCache reflects
+let stationDataToken = null;
 
 /**
- * Fetch all station data, caching the result.
+ * Fetch every station's summary, caching the result.
+ * Once cached, only the stations changed since the last fetch are pulled.
  */
 async function fetchInfrastructureData() {
   if (!stationDataCache) {
-    stationDataCache = await eel.get_infrastructure_data()();
+    // take the token *before* the full fetch so nothing committed in between is missed
+    const head = await eel.get_station_changes(null, true)();
+    stationDataCache = expandColumnar(await unpackResponse(await eel.get_station_summaries(true)()));
+    stationDataToken = head.token;
+    return stationDataCache;
   }
+  await syncStationChanges();
   return stationDataCache;
 }
 
+/**
+ * Patch stationDataCache in place with the backend's delta since stationDataToken.
+ * Falls back to a full reload when the backend says the token is too old.
+ * Calls run one at a time: events arriving together queue up, and the later
+ * ones find little or nothing left to apply.
+ */
+let stationSync = Promise.resolve();
+function syncStationChanges() {
+  stationSync = stationSync.then(patchStationCache, patchStationCache);
+  return stationSync;
+}
+
+async function patchStationCache() {
+  if (!stationDataCache) return;
+  const delta = await eel.get_station_changes(stationDataToken, true)();
+  if (delta.full) {
+    stationDataCache = null;
+    await fetchInfrastructureData();
+    return;
+  }
+  const drop = new Set((delta.deleted || []).map(String));
+  (delta.upserted || []).forEach(s => drop.add(String(s.station_id).trim()));
+  if (drop.size) {
+    stationDataCache = stationDataCache.filter(s => !drop.has(String(s.station_id).trim()));
+    stationDataCache.push(...(delta.upserted || []));
+  }
+  stationDataToken = delta.token;
+}
+
+/**
+ * Inflate a result from a @compressible endpoint (backend/transport.py).
+ * Large results arrive as {__transport__: 'zlib+base64', data, raw_bytes};
+ * anything else is returned unchanged, so it is safe on every response.
+ */
+async function unpackResponse(res) {
+  if (!res || res.__transport__ !== 'zlib+base64') return res;
+  const bytes  = Uint8Array.from(atob(res.data), ch => ch.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return JSON.parse(await new Response(stream).text());
+}
+window.unpackResponse = unpackResponse;
+
+/**
+ * Turn a columnar payload from get_infrastructure_data(true) back into one
+ * record per station, in the original order. Keys a station's asset type has
+ * but the station lacks come back as null. Anything else is returned as-is.
+ */
+function expandColumnar(payload) {
+  if (!payload || payload.format !== 'columnar') return payload;
+  const out = new Array(payload.count);
+  for (const g of payload.groups) {
+    const n    = g.rows.length;
+    const recs = Array.from({ length: n }, () => ({}));
+    g.columns.forEach((col, c) => {
+      if (Object.prototype.hasOwnProperty.call(g.const, col)) {
+        for (const rec of recs) rec[col] = g.const[col];
+        return;
+      }
+      const vals = g.values[c];
+      const b64  = g.present[c];
+      if (b64 === null) {
+        for (let i = 0; i < n; i++) recs[i][col] = vals[i];
+        return;
+      }
+      // presence bitmap: bit i (LSB first) set ⇒ row i has the next value
+      const bits = Uint8Array.from(atob(b64), ch => ch.charCodeAt(0));
+      let k = 0;
+      for (let i = 0; i < n; i++) {
+        recs[i][col] = (bits[i >> 3] >> (i & 7)) & 1 ? vals[k++] : null;
+      }
+    });
+    g.rows.forEach((pos, i) => { out[pos] = recs[i]; });
+  }
+  return out;
+}
+
+/**
+ * Colour for one station from a get_asset_type_color_table() result:
+ * the asset type's colour at that location, else its generic colour.
+ */
+function colorFromTable(table, assetType, location) {
+  const at  = String(assetType ?? '').trim().toLowerCase();
+  const loc = String(location ?? '').trim().toLowerCase();
+  return ((table.by_location[at] || {})[loc]) || table.generic[at] || table.default;
+}
+
+// ─── Background schema migrations ───────────────────────────────────────────
+// Python pushes every job update here; pages can listen for the
+// "schema-migration" window event to show progress.
+eel.expose(schemaMigrationProgress);
+function schemaMigrationProgress(job) {
+  window.dispatchEvent(new CustomEvent('schema-migration', { detail: job }));
+  if (job.state === 'done' || job.state === 'failed') syncStationChanges();
+}
+
+// ─── Backend change events ──────────────────────────────────────────────────
+// Python pushes every committed write here (backend/event_bus.py); the station
+// cache is patched in place and pages can listen for the "data-changed" window
+// event to refresh their own views.
+eel.expose(dataChanged);
+async function dataChanged(event) {
+  try {
+    await applyDataEvent(event);
+  } finally {
+    window.dispatchEvent(new CustomEvent('data-changed', { detail: event }));
+  }
+}
+
+async function applyDataEvent(event) {
+  if (!stationDataCache || !event.token || event.token === stationDataToken) return;
+  const inStep = event.prev_token === stationDataToken;
+
+  if (event.type === 'station.deleted' && inStep) {
+    const gone = new Set(event.ids.map(String));
+    stationDataCache = stationDataCache.filter(s => !gone.has(String(s.station_id).trim()));
+    stationDataToken = event.token;
+    return;
+  }
+  if (event.type === 'lookup.changed' && event.sheet === 'AssetTypes' && event.stations && inStep) {
+    // only colours moved: recolour the cached stations instead of reloading them
+    const table = await eel.get_asset_type_color_table()();
+    if (stationDataToken !== event.prev_token) return syncStationChanges();
+    stationDataCache.forEach(s => { s.color = colorFromTable(table, s.asset_type, s.province); });
+    stationDataToken = event.token;
+    return;
+  }
+  if (event.type === 'lookup.changed' && !event.stations) return;   // other lookups don't touch station records
+  await syncStationChanges();
+}
+
 // ─── Exposed API ─────────────────────────────────────────────────────────────
 window.electronAPI = {
   // — Lookups —
@@ -24,19 +164,57 @@ window.electronAPI = {
   getAssetTypeColor:      at            => eel.get_asset_type_color_lookup(at)(),
   setAssetTypeColor:      (at, color)   => eel.set_asset_type_color(at, color)(),
 
+  getAssetTypeColorTable: ()            => eel.get_asset_type_color_table()(),
+  colorFromTable:         (table, at, loc) => colorFromTable(table, at, loc),
+
   // — Location-specific color —
   getAssetTypeColorForLocation: (at, loc)          => eel.get_asset_type_color_for_location(at, loc)(),
   setAssetTypeColorForLocation: async (at, loc, color) => {
     const res = await eel.set_asset_type_color_for_location(at, loc, color)();
-    if (res.success) stationDataCache = null;
+    if (res.success) await syncStationChanges();
     return res;
   },
 
   // — Station data —
+  // id, name, province, lat, lon, status, asset_type and color of every station
   getStationData:         ()            => fetchInfrastructureData(),
+  // one station's full record (every section/field), or null
+  getStationDetail:       async id      => {
+    const res = await eel.get_station_detail(id)();
+    return res && res.success ? res.station : null;
+  },
+  // packed column blocks; expandColumnar() turns them into records when needed
+  getStationDataColumnar: async ()      => unpackResponse(await eel.get_infrastructure_data(true)()),
+  // raw vs sent bytes per compressible endpoint
+  getTransportStats:      (reset = false) => eel.get_transport_stats(reset)(),
+  // server-side filter: criteria = {province: [...], asset_type: [...], status: [...], company: [...]}
+  filterStations:         (criteria, { idsOnly = false, limit = null } = {}) =>
+    eel.filter_stations(criteria, idsOnly, limit)(),
+  getFilterHierarchy:     ()            => eel.get_filter_hierarchy()(),
+  searchStations:         (query, limit = 50, criteria = null) => eel.search_stations(query, limit, criteria)(),
+  // stations by one extra field: op is = != < <= > >= contains
+  queryStationFields:     (section, field, op, value, limit = null) =>
+    eel.query_station_fields(section, field, op, value, limit)(),
+  // {count, numeric: {count, min, max, mean, sum} | null, top: [[value, n]]} of one extra field
+  getFieldSummary:        (section, field) => eel.get_field_summary(section, field)(),
+  // {core, sections: {section: [fields]}} of an asset type, no station data needed
+  getAssetTypeSchema:     (assetType, location = null) => eel.get_asset_type_schema(assetType, location)(),
+  // {clusters: [{lat, lon, count, color, …}], stations: [lone stations]} for a viewport + zoom
+  getStationClusters:     (bounds, zoom, criteria = null) =>
+    eel.get_station_clusters(bounds.south, bounds.west, bounds.north, bounds.east, zoom, criteria)(),
+  expandColumnar:         payload       => expandColumnar(payload),
+  // only the stations inside a viewport: {stations, total, truncated}
+  getStationsInBBox:      (bounds, limit = null) =>
+    eel.get_stations_in_bbox(bounds.south, bounds.west, bounds.north, bounds.east, limit)(),
+  // distance queries (km), nearest first; every station comes back with distance_km
+  getNearestStations:     (lat, lon, k = 10, maxKm = null) => eel.get_nearest_stations(lat, lon, k, maxKm)(),
+  getStationsWithin:      (lat, lon, radiusKm, limit = null) => eel.get_stations_within(lat, lon, radiusKm, limit)(),
+  getStationsNearStation: (stationId, { k = 10, radiusKm = null } = {}) =>
+    eel.get_stations_near_station(stationId, k, radiusKm)(),
+  syncStationChanges:     ()            => syncStationChanges(),
   createNewStation:       async obj      => {
     const res = await eel.create_new_station(obj)();
-    if (res.success) stationDataCache = null;
+    if (res.success) await syncStationChanges();
     return res;
   },
 
@@ -60,22 +238,27 @@ window.electronAPI = {
   getExcelSheetNames:          b64                     => eel.get_excel_sheet_names(b64)(),
   importExcelSheet:            async (b64, sheet, location, assetType) => {
     const res = await eel.import_excel_sheet(b64, sheet, location, assetType)();
-    if (res.success) stationDataCache = null;
+    if (res.success) await syncStationChanges();
     return res;
   },
 
   // — Edit station details —
   saveStationDetails:         async obj   => {
     const res = await eel.save_station_details(obj)();
-    if (res.success) stationDataCache = null;
+    if (res.success) await syncStationChanges();
     return res;
   },
   deleteStation:              async id    => {
     const res = await eel.delete_station(id)();
-    if (res.success) stationDataCache = null;
+    if (res.success) await syncStationChanges();
     return res;
   },
 
+  // — Schema migrations (column add/remove/rename per asset type) —
+  migrateAssetTypeSchema:     (assetType, changes = {}) =>
+                                eel.migrate_asset_type_schema(assetType, changes.remove || null, changes.add || null, changes.rename || null)(),
+  getSchemaMigration:         (jobId = null) => eel.get_schema_migration(jobId)(),
+
   // — Nuke everything —
   dataNuke:                   ()            => eel.data_nuke()(),
 
@@ -85,8 +268,8 @@ window.electronAPI = {
   saveWorkplanConstants:      (entries)     => eel.save_workplan_constants(entries)(),
   getWorkplanDetails:         ()            => eel.get_workplan_details()(),
   getWorkplanConstants:       ()            => eel.get_workplan_constants()(),
-  optimizeWorkplan:           (payload)     => eel.optimize_workplan(payload)(),
-  importRepairsExcel:       b64 => eel.import_repairs_excel(b64)(),
+  optimizeWorkplan:           async (payload) => unpackResponse(await eel.optimize_workplan(payload)()),
+  importRepairsExcel:       async b64 => unpackResponse(await eel.import_repairs_excel(b64)()),
   // — Import-only field merge for a single station —
   importMultipleStations:   async (b64) => {
     console.log('[data_api] → eel.import_multiple_stations(...)');
@@ -124,7 +124,7 @@ export async function loadHistoryTab(kind) {
   // Ask Python for the directory tree
   let tree;
   try {
-    tree = await eel.list_photos(rootPath, true)();
+    tree = await window.unpackResponse(await eel.list_photos(rootPath, true)());
   } catch (e) {
     console.error('[history] list_photos failed', e);
     renderEmpty(rootEl, 'Could not list photos.');
@@ -76,28 +76,52 @@ document.addEventListener('DOMContentLoaded', async () => {
 
 
   // ─── Show-in-List rendering ──────────────────────────────────────────────
-  async function renderList() {
-    const tbody = document.querySelector('#stationTable tbody');
-    tbody.innerHTML = '';
+  const searchBox = document.getElementById('stationSearch');
+  const SEARCH_LIMIT = 500;
+  const SEARCH_DEBOUNCE_MS = 200;
+  let renderSeq = 0;
+  let searchTimer = null;
+
+  // Stations of the checked filters, kept while only the search text changes
+  let filtered = null;
+  const rowKey = s => `${s.asset_type}|${s.province}|${String(s.station_id).trim()}`;
+
+  async function filteredStations(criteria) {
+    const key = JSON.stringify(criteria);
+    if (!filtered || filtered.key !== key) {
+      const { stations } = await window.electronAPI.filterStations(criteria);
+      filtered = { key, stations, byKey: new Map(stations.map(s => [rowKey(s), s])) };
+    }
+    return filtered;
+  }
 
-    // Fetch all station data
-    const data = await window.electronAPI.getStationData();
+  async function renderList() {
+    const seq = ++renderSeq;
 
     // Determine which locations and asset-types are checked
-    const activeLocations = Array.from(
-      document.querySelectorAll('.filter-checkbox.location:checked')
-    ).map(cb => cb.value);
-    const activeAssetTypes = Array.from(
-      document.querySelectorAll('.filter-checkbox.asset-type:checked')
-    ).map(cb => cb.value);
+    const { locations, assetTypes } = getActiveFilters();
+    const criteria = { province: locations, asset_type: assetTypes };
+    const query = (searchBox ? searchBox.value : '').trim();
+
+    // Let the backend's indexes pick the matching stations (and rank them, inside the filter, for a search)
+    const [{ stations, byKey }, found] = await Promise.all([
+      filteredStations(criteria),
+      query ? window.electronAPI.searchStations(query, SEARCH_LIMIT, criteria) : null
+    ]);
+    // a newer keystroke / filter change already started its own render
+    if (seq !== renderSeq) return;
+
+    let rows;
+    if (found) {
+      rows = found.results.map(r => byKey.get(rowKey(r))).filter(Boolean);
+    } else {
+      rows = [...stations].sort((a, b) => (a.name || '').localeCompare(b.name || ''));
+    }
 
-    // Filter, sort, and render rows
-    data
-      .filter(stn =>
-        activeLocations.includes(stn.province) &&
-        activeAssetTypes.includes(stn.asset_type)
-      )
-      .sort((a, b) => (a.name || '').localeCompare(b.name || ''))
+    const tbody = document.querySelector('#stationTable tbody');
+    tbody.innerHTML = '';
+    // Render rows
+    rows
       .forEach(stn => {
         const tr = document.createElement('tr');
         tr.style.cursor = 'pointer';
@@ -131,6 +155,17 @@ document.addEventListener('DOMContentLoaded', async () => {
   // Re-render whenever any filter checkbox changes
   document.getElementById('filterTree')
           .addEventListener('change', renderList);
-  
-  window.renderList = renderList;
+  // ...and once typing in the search box pauses
+  if (searchBox) searchBox.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(renderList, SEARCH_DEBOUNCE_MS);
+  });
+
+  // callers outside this view (e.g. after an import) want the stations re-read too
+  window.renderList = () => { filtered = null; return renderList(); };
+
+  // ...and whenever the backend reports a committed change to stations
+  window.addEventListener('data-changed', e => {
+    if (e.detail.type !== 'lookup.changed' || e.detail.stations) window.renderList();
+  });
 });
\ No newline at end of file
@@ -3,17 +3,12 @@
 
 window.addEventListener('unload', () => {});
 
-// ─── In-memory cache of all station data ─────────────────────────────────
+// ─── Stations currently in (or near) the viewport ───────────────────────
 let mapStationData = [];
+let markersRequest = 0;   // only the newest viewport query gets drawn
 
-// (optional) initial loader if you still want it elsewhere
-async function initializeData() {
-  mapStationData = await eel.get_infrastructure_data()();
-}
-initializeData().then(() => {
-  console.log('🔷 [map_view] station data loaded, drawing initial markers');
-  window.refreshMarkers();
-});
+// How far past the visible edges to load markers, as a fraction of the view
+const VIEWPORT_PAD = 0.25;
 
 // ─── Initialize Leaflet map ────────────────────────────────────────────────
 const map = L.map('map', {
@@ -73,19 +68,33 @@ function getActiveFilters() {
   return { locations, assetTypes };
 }
 
-// Always re-fetch & redraw
+// Always re-fetch & redraw the stations around the current view
 window.refreshMarkers = async function() {
-  // 1) pull fresh data
-  mapStationData = await eel.get_infrastructure_data()();
+  // 1) ask the backend for the (padded) viewport, clustered for this zoom and
+  //    already narrowed to the checked locations / asset types
+  const request = ++markersRequest;
+  const b = map.getBounds().pad(VIEWPORT_PAD);
+  const { locations, assetTypes } = getActiveFilters();
+  const res = await window.electronAPI.getStationClusters(
+    { south: b.getSouth(), west: b.getWest(), north: b.getNorth(), east: b.getEast() },
+    map.getZoom(),
+    { province: locations, asset_type: assetTypes }
+  );
+  if (request !== markersRequest) return;   // the map moved on while we waited
+  mapStationData = res.stations;
 
   // 2) clear & draw
   markersLayer.clearLayers();
-  const { locations: activeLocations, assetTypes: activeAssetTypes } = getActiveFilters();
 
-  mapStationData.forEach(stn => {
-    if (!activeLocations.includes(stn.province))   return;
-    if (!activeAssetTypes.includes(stn.asset_type)) return;
+  // clusters: click to zoom in on them
+  res.clusters.forEach(c => {
+    L.marker([c.lat, c.lon], { icon: createClusterIcon(c.color, c.count) })
+      .addTo(markersLayer)
+      .on('click', () => map.setView([c.lat, c.lon], Math.min(map.getZoom() + 2, map.getMaxZoom())));
+  });
 
+  // stations that sit alone in their cell
+  mapStationData.forEach(stn => {
     const marker = L.marker([stn.lat, stn.lon], {
       icon: createColoredIcon(stn.color)
     })
@@ -99,9 +108,14 @@ window.refreshMarkers = async function() {
   });
 };
 
-// initial draw
+// initial draw, then redraw whenever the viewport settles
 console.log('🔷 [map_view] initial refreshMarkers()');
 window.refreshMarkers();
+map.on('moveend', () => window.refreshMarkers());
+// and whenever the backend reports a committed change to stations or their colours
+window.addEventListener('data-changed', e => {
+  if (e.detail.type !== 'lookup.changed' || e.detail.stations) window.refreshMarkers();
+});
 
 // ─── Global Import (always-present toolbar in the right panel) ─────────────
 function bindGlobalImportToolbar() {
@@ -137,7 +151,6 @@ function bindGlobalImportToolbar() {
           rdr.onerror = reject;
           rdr.readAsDataURL(f);
         });
-        if (typeof stationDataCache !== 'undefined') stationDataCache = null;
         console.log('[GlobalImport] calling electronAPI.importMultipleStations(...)');
         const res  = await window.electronAPI.importMultipleStations(b64);
         console.log('[GlobalImport] result:', res);
@@ -160,8 +173,7 @@ function bindGlobalImportToolbar() {
             }
           });
           if (currentId) {
-            const all = await window.electronAPI.getStationData();
-            const found = (all || []).find(s => String(s.station_id) === String(currentId));
+            const found = await window.electronAPI.getStationDetail(currentId);
             if (found) showStationDetails(found);
           }
         } catch (_) {}
@@ -252,6 +264,19 @@ function createColoredIcon(color) {
   });
 }
 
+/**
+ * createClusterIcon(color, count): a bubble sized by how many stations it holds
+ */
+function createClusterIcon(color, count) {
+  const size = count < 10 ? 24 : count < 100 ? 30 : count < 1000 ? 36 : 42;
+  return L.divIcon({
+    className: 'custom-div-icon',
+    html: `<span class="marker-cluster" style="--marker-color:${color}">${count}</span>`,
+    iconSize: [size, size],
+    iconAnchor: [size / 2, size / 2]
+  });
+}
+
 // ─── Map click = reset RHS station details ────────────────────────────────
 map.on('click', () => {
   const container = document.getElementById('station-details');
@@ -83,7 +83,7 @@ async function initPhotos() {
   let tree;
   try {
     console.log("[photos] calling eel.list_photos");
-    tree = await eel.list_photos(root)();
+    tree = await window.unpackResponse(await eel.list_photos(root)());
     console.log("[photos] received tree:", tree);
   } catch (err) {
     return console.error("[photos] error in list_photos:", err);
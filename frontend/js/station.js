@@ -300,9 +300,8 @@ async function loadStationPage(stationId) {
     stationSnippet = await fetch('station_snippet.html').then(r => r.text());
   }
 
-  // ── 4) Load your data
-  const data = await eel.get_infrastructure_data()();
-  const stn  = data.find(s => s.station_id === stationId);
+  // ── 4) Load this station's full record
+  const stn = await window.electronAPI.getStationDetail(stationId);
   if (!stn) {
     hideLoaderOverlay();
     alert(`Station "${stationId}" not found.`);
@@ -367,13 +366,19 @@ async function loadStationPage(stationId) {
   document.getElementById('giLongitude').value  = stn.lon;
   document.getElementById('giStatus').value     = stn.status;
 
-  // ── 9) Build extra sections
+  // ── 9) Build extra sections in the workbook's column order (from the schema registry),
+  //       then anything the record carries that the layout doesn't list
+  const schema = await window.electronAPI.getAssetTypeSchema(stn.asset_type, stn.province);
   const extras = {};
+  Object.entries(schema.sections || {}).forEach(([sec, fields]) => {
+    extras[sec] = {};
+    fields.forEach(fld => { extras[sec][fld] = stn[`${sec} – ${fld}`] ?? null; });
+  });
   Object.keys(stn).forEach(key => {
     if (!key.includes(' – ')) return;
     const [sec, fld] = key.split(' – ');
     extras[sec] = extras[sec] || {};
-    extras[sec][fld] = stn[key];
+    if (!(fld in extras[sec])) extras[sec][fld] = stn[key];
   });
   Object.entries(extras).forEach(([sec, fields]) => {
     const block = makeSectionBlock(sec, fields);
@@ -2,7 +2,9 @@
 # Bootstraps the Python/Eel environment and launches the Electron‑style UI.
 
 #!/usr/bin/env python3
-from backend.app import main
 
 if __name__ == '__main__':
+    # imported here, not at module level: spawned worker processes (workbook parsing) re-import
+    # this file and must not start the whole app (eel, DataManager, the database) each time
+    from backend.app import main
     main()
@@ -0,0 +1,64 @@
+# tests/test_change_feed.py
+# ChangeFeed deltas against a replayed history: from every earlier token, applying since(token) to the
+# stations as they were then gives the stations as they are now; stale or foreign tokens ask for a reload.
+
+import random
+
+from backend.change_feed import ChangeFeed
+
+
+def _apply(before: dict, now: dict, delta: dict) -> dict:
+    out = {sid: v for sid, v in before.items() if sid not in delta['deleted']}
+    out.update({sid: now[sid] for sid in delta['upserted']})
+    return out
+
+def _history(feed, rng, steps=300):
+    """Random writes and resets; returns (stations now, [(token, stations then)], versions of the resets)."""
+    stations, history, resets = {}, [], []
+    for step in range(steps):
+        history.append((feed.token, dict(stations)))
+        if rng.random() < 0.03:
+            feed.reset()
+            resets.append(feed.version)
+            continue
+        ids = {f'S{rng.randrange(40)}' for _ in range(rng.randrange(1, 4))}
+        gone = {sid for sid in ids if sid in stations and rng.random() < 0.4}
+        up = ids - gone
+        for sid in up:
+            stations[sid] = step
+        for sid in gone:
+            del stations[sid]
+        # ids padded with blanks and None, as callers pass them
+        feed.record(upserted=[f' {sid} ' for sid in up] + [None, ''], deleted=gone)
+    return stations, history, resets
+
+def test_since_every_token_replays_to_now():
+    feed = ChangeFeed()
+    stations, history, resets = _history(feed, random.Random(2))
+    for token, then in history:
+        delta = feed.since(token)
+        assert delta['token'] == feed.token
+        version = int(token.split('.')[1])
+        assert delta['full'] == any(v > version for v in resets)
+        if not delta['full']:
+            assert _apply(then, stations, delta) == stations
+            assert not set(delta['upserted']) & set(delta['deleted'])
+
+def test_trimmed_history_and_foreign_tokens_reload():
+    feed = ChangeFeed(history=10)
+    first = feed.token
+    for i in range(20):
+        feed.record(upserted=[f'S{i}'])
+    assert feed.since(first)['full']
+    assert feed.since(f'{feed.epoch}.9')['full']
+    assert feed.since(f'{feed.epoch}.10') == {
+        'token': feed.token, 'full': False, 'upserted': sorted(f'S{i}' for i in range(10, 20)), 'deleted': [],
+    }
+    assert feed.since(feed.token) == {'token': feed.token, 'full': False, 'upserted': [], 'deleted': []}
+    for token in (None, '', 'garbage', f'{feed.epoch}.x', f'{feed.epoch}.99', f'{ChangeFeed().epoch}.20'):
+        assert feed.since(token) == {'token': feed.token, 'full': True}
+
+def test_empty_writes_keep_the_token():
+    feed = ChangeFeed()
+    token = feed.token
+    assert feed.record(upserted=[None, '  '], deleted=[]) == token
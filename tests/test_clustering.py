@@ -0,0 +1,90 @@
+# tests/test_clustering.py
+# ClusterIndex kept up to date with sync() — over the whole list or just the changed ids — against an
+# index built from scratch, and cluster counts against a brute-force bucketing of the stations.
+
+import random
+
+import pytest
+
+from backend.clustering import CELL_SHIFT, ClusterIndex, _mercator
+
+
+def _station(rng, sid):
+    return {
+        'station_id': sid,
+        'lat':        rng.choice([rng.uniform(48, 60), rng.uniform(-89, 89), None]),
+        'lon':        rng.choice([rng.uniform(-130, -110), rng.uniform(179, 180), rng.uniform(-180, -179)]),
+        'asset_type': rng.choice(['Cableway', 'Gauge']),
+        'province':   rng.choice(['BC', 'AB']),
+    }
+
+def _levels(index):
+    """The grids with float sums rounded, so build order doesn't matter."""
+    out = []
+    for level in index._levels:
+        out.append({
+            cell: {pair: (agg[0], round(agg[1], 6), round(agg[2], 6), *agg[3:]) for pair, agg in bucket.items()}
+            for cell, bucket in level.items()
+        })
+    return out
+
+def _query(index, *box, **kw):
+    res = index.query(*box, **kw)
+    clusters = sorted((c['count'], round(c['lat'], 6), round(c['lon'], 6), c['asset_type'], c['province'])
+                      for c in res['clusters'])
+    return clusters, sorted(s['station_id'] for s in res['stations'])
+
+def _edit(rng, stations):
+    """Move, retype, add or remove a few stations; returns the ids touched."""
+    touched = set()
+    for _ in range(rng.randrange(1, 8)):
+        i = rng.randrange(len(stations))
+        kind = rng.random()
+        if kind < 0.4:
+            stations[i] = dict(stations[i], lat=rng.uniform(48, 60), lon=rng.uniform(-130, -110))
+        elif kind < 0.6:
+            stations[i] = dict(stations[i], asset_type='Tower', status='x')
+        elif kind < 0.8:
+            stations.append(_station(rng, f'N{len(stations)}'))
+            touched.add(stations[-1]['station_id'])
+        else:
+            touched.add(stations.pop(i)['station_id'])
+            continue
+        touched.add(stations[i]['station_id'])
+    return touched
+
+
+@pytest.mark.parametrize('by_ids', [False, True])
+def test_sync_matches_a_fresh_build(by_ids):
+    rng = random.Random(9)
+    # a few duplicate ids, as sheets can hold
+    stations = [_station(rng, f'S{rng.randrange(250)}') for _ in range(300)]
+    index = ClusterIndex(max_zoom=8)
+    index.sync(stations)
+    for _ in range(30):
+        touched = _edit(rng, stations)
+        index.sync(stations, ids=touched if by_ids else None)
+        fresh = ClusterIndex(max_zoom=8)
+        fresh.sync(stations)
+        assert _levels(index) == _levels(fresh)
+        for zoom in (0, 3, 8, 12):
+            for kw in ({}, {'provinces': ['BC']}, {'asset_types': ['Gauge', 'Tower']}):
+                assert _query(index, 40, -140, 70, -100, zoom, **kw) == _query(fresh, 40, -140, 70, -100, zoom, **kw)
+                assert _query(index, -90, 170, 90, -170, zoom, **kw) == _query(fresh, -90, 170, 90, -170, zoom, **kw)
+
+def test_counts_match_brute_force_bucketing():
+    rng = random.Random(1)
+    stations = [_station(rng, f'S{i}') for i in range(500)]
+    index = ClusterIndex(max_zoom=8)
+    index.sync(stations)
+    placed = [s for s in stations if s['lat'] is not None]
+    for zoom in (0, 2, 5, 8):
+        n = 1 << (zoom + CELL_SHIFT)
+        cells = {}
+        for s in placed:
+            x, y = _mercator(s['lat'], s['lon'])
+            cell = (min(int(x * n), n - 1), min(int(y * n), n - 1))
+            cells.setdefault(cell, []).append(s['station_id'])
+        res = index.query(-90, -180, 90, 180, zoom)
+        assert sorted(c['count'] for c in res['clusters']) == sorted(len(v) for v in cells.values() if len(v) > 1)
+        assert sorted(s['station_id'] for s in res['stations']) == sorted(v[0] for v in cells.values() if len(v) == 1)
@@ -0,0 +1,85 @@
+# tests/test_columnar.py
+# to_columnar() against a port of expandColumnar (frontend/js/data_api.js): after a JSON round-trip every
+# station comes back in its place, with keys it lacks (or holds as None) as None and values of the same type.
+
+import base64
+import json
+import random
+
+from backend.columnar import to_columnar
+
+
+def _expand(payload: dict) -> list[dict]:
+    """What expandColumnar does, step for step."""
+    out = [None] * payload['count']
+    for g in payload['groups']:
+        n = len(g['rows'])
+        recs = [{} for _ in range(n)]
+        for c, col in enumerate(g['columns']):
+            if col in g['const']:
+                for rec in recs:
+                    rec[col] = g['const'][col]
+                continue
+            vals, b64 = g['values'][c], g['present'][c]
+            if b64 is None:
+                for i in range(n):
+                    recs[i][col] = vals[i]
+                continue
+            bits = base64.b64decode(b64)
+            k = 0
+            for i in range(n):
+                if (bits[i >> 3] >> (i & 7)) & 1:
+                    recs[i][col] = vals[k]
+                    k += 1
+                else:
+                    recs[i][col] = None
+        for pos, rec in zip(g['rows'], recs):
+            out[pos] = rec
+    return out
+
+def _want(stations: list[dict]) -> list[dict]:
+    """Each station with the keys of its asset type filled in as None."""
+    keys = {}
+    for stn in stations:
+        keys.setdefault(stn.get('asset_type'), {}).update(dict.fromkeys(stn))
+    return [{k: stn.get(k) for k in keys[stn.get('asset_type')]} for stn in stations]
+
+def _typed(records):
+    # 1 == True == 1.0 in Python; the wire format must keep them apart
+    return [{k: (type(v).__name__, v) for k, v in rec.items()} for rec in records]
+
+def _round_trip(stations):
+    payload = json.loads(json.dumps(to_columnar(stations)))
+    assert _typed(_expand(payload)) == _typed(_want(stations))
+    return payload
+
+
+def test_random_stations_round_trip():
+    rng = random.Random(3)
+    values = [None, 0, 1, 1.0, True, False, '', 'x', 'Active', 2.5, -7]
+    for n in (0, 1, 2, 7, 8, 9, 63, 64, 65, 300):
+        stations = []
+        for i in range(n):
+            stn = {'station_id': f'S{i}', 'asset_type': rng.choice(['Cableway', 'Gauge', None])}
+            for key in ('lat', 'status', 'Info – Notes', 'Cableway – Span'):
+                if rng.random() < 0.7:
+                    stn[key] = rng.choice(values)
+            stations.append(stn)
+        _round_trip(stations)
+
+def test_columns_pick_their_encoding():
+    stations = [
+        {'station_id': 'A', 'asset_type': 'Gauge', 'province': 'BC', 'status': 'Active', 'flag': 1},
+        {'station_id': 'B', 'asset_type': 'Gauge', 'province': 'BC', 'flag': True},
+        {'station_id': 'C', 'asset_type': 'Gauge', 'province': 'BC', 'status': None, 'flag': 1},
+    ]
+    (group,) = _round_trip(stations)['groups']
+    encoding = dict(zip(group['columns'], zip(group['values'], group['present'])))
+    assert group['const'] == {'asset_type': 'Gauge', 'province': 'BC'}
+    assert encoding['station_id'] == (['A', 'B', 'C'], None)
+    assert encoding['status'][0] == ['Active'] and encoding['status'][1] is not None
+    assert encoding['flag'] == ([1, True, 1], None)
+
+def test_single_station_is_not_folded_into_constants():
+    (group,) = _round_trip([{'station_id': 'A', 'asset_type': 'Gauge', 'lat': None}])['groups']
+    assert group['const'] == {}
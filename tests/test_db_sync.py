@@ -0,0 +1,140 @@
+# tests/test_db_sync.py
+# Excel → SQL sync by content hash: after random edits an incremental sync leaves the same stations, field
+# rows and hashes as a sync into an empty database, rewrites only what changed, and heals hashes or
+# station rows that were removed on their own.
+
+import datetime as dt
+import random
+
+import pytest
+from sqlalchemy import delete, update
+
+from backend.db_migrations import migrate
+from backend.db_repo import DBRepo, Station, StationField, StationHash, make_engine
+from backend.db_sync import StationSync, content_hash
+
+
+class FakeExcel:
+    def __init__(self, stations):
+        self.stations = stations
+
+    def list_stations(self):
+        return [dict(s) for s in self.stations]
+
+def _repo():
+    engine = make_engine('sqlite://')
+    db = DBRepo(engine=engine, index_fields=True)
+    migrate(engine)
+    return db
+
+def _station(rng, sid):
+    stn = {
+        'station_id': sid,
+        'name':       f'Site {sid}',
+        'province':   rng.choice(['BC', 'AB']),
+        'lat':        round(rng.uniform(48, 60), 4),
+        'lon':        round(rng.uniform(-130, -110), 4),
+        'status':     rng.choice(['Active', 'Inactive', None]),
+        'asset_type': rng.choice(['Cableway', 'Gauge']),
+    }
+    if rng.random() < 0.7:
+        stn['Info – Installed'] = rng.choice([dt.date(2020, 1, 2), dt.datetime(2021, 5, 6, 7, 8), '2019'])
+    if rng.random() < 0.7:
+        stn['Cableway – Span'] = rng.choice([120, 7.5, 'n/a', None])
+    return stn
+
+def _edit(rng, stations):
+    """Change, retype, add or drop a few stations (dropping a duplicate's first row hands the id over)."""
+    for _ in range(rng.randrange(1, 6)):
+        i = rng.randrange(len(stations))
+        kind = rng.random()
+        if kind < 0.4:
+            stations[i] = dict(stations[i], status=rng.choice(['Active', 'Retired']), **{'Info – Note': 'edited'})
+        elif kind < 0.55:
+            stations[i] = dict(stations[i], asset_type='Tower')
+        elif kind < 0.8:
+            stations.append(_station(rng, f'N{rng.randrange(10_000)}'))
+        else:
+            stations.pop(i)
+
+def _state(db, ids=None):
+    with db.Session() as s:
+        rows = {r[0]: tuple(r) for r in db._station_rows(s)}
+        fields = sorted(tuple(r) for r in s.query(
+            StationField.station_id, StationField.section, StationField.field,
+            StationField.value_text, StationField.value_num, StationField.value_folded,
+        ))
+        hashes = dict(s.query(StationHash.station_id, StationHash.content_hash))
+    if ids is not None:
+        rows = {sid: row for sid, row in rows.items() if sid in ids}
+        fields = [f for f in fields if f[0] in ids]
+        hashes = {sid: h for sid, h in hashes.items() if sid in ids}
+    return rows, fields, hashes
+
+def _first_rows(stations):
+    out = {}
+    for stn in stations:
+        out.setdefault(str(stn['station_id']).strip(), stn)
+    return out
+
+
+def test_incremental_sync_matches_a_fresh_sync():
+    rng = random.Random(6)
+    stations = [_station(rng, f'S{i}') for i in range(150)]
+    stations.append(dict(_station(rng, ' S3 '), name='duplicate'))   # the first S3 row wins
+    published = []
+    db = _repo()
+    sync = StationSync(FakeExcel(stations), db, on_synced=published.append)
+    assert sync.run()['inserted'] == 150
+    ever = set(_first_rows(stations))
+    for _ in range(25):
+        before = _first_rows(stations)
+        _edit(rng, stations)
+        now = _first_rows(stations)
+        ever |= set(now)
+        published.clear()
+        result = sync.run()
+        assert result['success']
+        rewritten = {sid for sid, rec in now.items() if sid not in before or content_hash(rec) != content_hash(before[sid])}
+        assert set(sum(published, [])) == rewritten
+        assert result['inserted'] + result['updated'] == len(rewritten)
+        assert result['unchanged'] == len(now) - len(rewritten)
+        # rows dropped from Excel stay in the database
+        assert result['db_only'] == len(ever - set(now))
+
+        fresh = _repo()
+        StationSync(FakeExcel(stations), fresh).run()
+        assert _state(db, set(now)) == _state(fresh)
+
+def test_unchanged_rows_are_not_rewritten():
+    rng = random.Random(2)
+    stations = [_station(rng, f'S{i}') for i in range(20)]
+    db = _repo()
+    sync = StationSync(FakeExcel(stations), db)
+    sync.run()
+    with db.Session() as s:
+        s.execute(update(Station).where(Station.station_id == 'S1').values(name='edited in SQL'))
+        s.commit()
+    assert sync.run() == {**sync.last, 'inserted': 0, 'updated': 0, 'unchanged': 20, 'db_only': 0}
+    assert db.get_station_row('S1').name == 'edited in SQL'
+
+@pytest.mark.parametrize('lose', ['hash', 'station'])
+def test_lost_hash_or_station_row_is_rebuilt(lose):
+    rng = random.Random(3)
+    stations = [_station(rng, f'S{i}') for i in range(20)]
+    db = _repo()
+    sync = StationSync(FakeExcel(stations), db)
+    sync.run()
+    want = _state(db)
+    with db.Session() as s:
+        s.execute(delete(StationHash).where(StationHash.station_id == 'S5'))
+        if lose == 'station':
+            # deleted outside delete_station: the hash is left behind
+            s.execute(delete(StationField).where(StationField.station_id == 'S5'))
+            s.execute(delete(Station).where(Station.station_id == 'S5'))
+            s.execute(StationHash.__table__.insert().values(station_id='S5', content_hash='stale'))
+        s.commit()
+    result = sync.run()
+    assert result['success']
+    assert (result['inserted'], result['updated']) == ((1, 0) if lose == 'station' else (0, 1))
+    assert _state(db) == want
@@ -0,0 +1,66 @@
+# tests/test_filter_index.py
+# FilterIndex queries and the company → location → asset type hierarchy against a brute-force walk of
+# the station records, including fields indexed on first use and values that need trimming.
+
+import itertools
+import random
+
+import pytest
+
+from backend.filter_index import FilterIndex
+
+COMPANIES = {'BC': ['Hydro', 'Rail'], 'AB': ['Hydro'], 'SK': []}
+
+
+def _stations(rng, n=400):
+    return [{
+        'station_id': f'S{i}',
+        'province':   rng.choice(['BC', ' BC', 'AB', 'SK', 'ON']),
+        'asset_type': rng.choice(['Cableway', 'Gauge', 'Tower']),
+        'status':     rng.choice(['Active', 'Inactive ', None]),
+        'Info – Tags': rng.choice(['a', 'b', ['unhashable']]),
+    } for i in range(n)]
+
+def _norm(value):
+    return value.strip() if isinstance(value, str) else value
+
+def _brute(stations, criteria):
+    def ok(stn, field, wanted):
+        if field == 'company':
+            return any(c in wanted for c in COMPANIES.get(_norm(stn.get('province')), ()))
+        value = _norm(stn.get(field))
+        return not isinstance(value, list) and value in [_norm(w) for w in wanted]
+    return [pos for pos, stn in enumerate(stations)
+            if all(wanted is None or ok(stn, field, [wanted] if isinstance(wanted, str) else wanted)
+                   for field, wanted in criteria.items())]
+
+
+CHOICES = {
+    'company':     [None, [], ['Hydro'], ['Rail', 'Nope']],
+    'province':    [None, ['BC'], ['AB', 'SK '], 'ON'],
+    'asset_type':  [None, ['Gauge', 'Tower']],
+    'status':      [None, ['Inactive'], [None]],
+    'Info – Tags': [None, ['a']],
+}
+
+@pytest.mark.parametrize('combo', list(itertools.product(*CHOICES.values())))
+def test_query_matches_brute_force(combo):
+    stations = _stations(random.Random(4))
+    index = FilterIndex(stations, COMPANIES)
+    criteria = dict(zip(CHOICES, combo))
+    assert index.query(criteria) == _brute(stations, criteria)
+
+def test_no_criteria_is_everything():
+    stations = _stations(random.Random(4))
+    index = FilterIndex(stations, COMPANIES)
+    assert index.query(None) == index.query({}) == list(range(len(stations)))
+
+def test_hierarchy_counts():
+    stations = _stations(random.Random(8))
+    want = {}
+    for stn in stations:
+        loc = _norm(stn['province'])
+        for company in COMPANIES.get(loc, ()):
+            types = want.setdefault(company, {}).setdefault(loc, {})
+            types[stn['asset_type']] = types.get(stn['asset_type'], 0) + 1
+    assert FilterIndex(stations, COMPANIES).hierarchy() == want
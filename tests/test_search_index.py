@@ -0,0 +1,108 @@
+# tests/test_search_index.py
+# SearchIndex against a brute-force scan: the same hits, scores and order (score, then station id / asset
+# type / province), however the index was built; and the `within` filter.
+
+import random
+
+import pytest
+
+from backend.search_index import (
+    EXACT, FIELD_WEIGHTS, EXTRA_WEIGHT, INFIX, MIN_PREFIX, PREFIX,
+    SearchIndex, searchable_fields, tokenize,
+)
+
+WORDS = ['river', 'riverside', 'rive', 'lake', 'flake', 'creek', 'north', 'northern', 'Zoë', 'Straße', 'dam']
+
+
+def _stations(rng, n=300):
+    out = []
+    for i in range(n):
+        out.append({
+            'station_id': f'S{rng.randrange(n // 2):04d}',     # repeated ids across asset types
+            'name':       ' '.join(rng.sample(WORDS, 2)),
+            'status':     rng.choice(['Active', 'Inactive', None]),
+            'asset_type': rng.choice(['Cableway', 'Gauge']),
+            'province':   rng.choice(['BC', 'AB']),
+            'Site Information – Notes': rng.choice(WORDS + [None]),
+        })
+    return out
+
+def _brute(stations, query, within=None):
+    """[(station_id, asset_type, province, score)] best first, scored from scratch."""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    seen, hits = {}, []
+    for stn in stations:
+        sid = str(stn['station_id']).strip()
+        base = (stn.get('asset_type'), stn.get('province'), sid)
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        if within is not None and base not in within:
+            continue
+        terms = {}
+        for field, text in searchable_fields(stn).items():
+            for term in tokenize(text):
+                terms[term] = max(terms.get(term, 0.0), FIELD_WEIGHTS.get(field, EXTRA_WEIGHT))
+        score = 0.0
+        for token in tokens:
+            best = 0.0
+            for term, weight in terms.items():
+                if term == token:
+                    kind = EXACT
+                elif len(token) >= MIN_PREFIX and term.startswith(token):
+                    kind = PREFIX
+                elif len(token) >= 3 and token in term:
+                    kind = INFIX
+                else:
+                    continue
+                best = max(best, kind * weight)
+            if not best:
+                break
+            score += best
+        else:
+            hits.append(((-score, sid, str(base[0] or ''), str(base[1] or ''), n), (sid, *base[:2], score)))
+    return [row for _key, row in sorted(hits)]
+
+def _got(index, query, limit=None, within=None):
+    res = index.search(query, limit, within)
+    return res['total'], [(r['station_id'], r['asset_type'], r['province'], r['score']) for r in res['results']]
+
+
+QUERIES = ['river', 'riv', 'ake', 'north lake', 'zoe', 'strasse', 's00', 'active', 'da']
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_matches_brute_force(query):
+    stations = _stations(random.Random(7))
+    index = SearchIndex()
+    index.sync(stations)
+    want = _brute(stations, query)
+    assert _got(index, query) == (len(want), want)
+    assert _got(index, query, limit=5) == (len(want), want[:5])
+
+def test_incremental_sync_keeps_fresh_order():
+    rng = random.Random(11)
+    stations = _stations(rng)
+    index = SearchIndex()
+    index.sync(stations)
+    for _round in range(5):
+        changed = set()
+        for i in rng.sample(range(len(stations)), 20):
+            stations[i] = dict(stations[i], name=' '.join(rng.sample(WORDS, 2)))
+            changed.add(stations[i]['station_id'])
+        gone = stations.pop(rng.randrange(len(stations)))
+        changed.add(gone['station_id'])
+        index.sync(stations, ids=changed)
+
+        fresh = SearchIndex()
+        fresh.sync(stations)
+        for query in QUERIES:
+            want = _brute(stations, query)
+            assert _got(index, query, limit=10) == _got(fresh, query, limit=10) == (len(want), want[:10])
+
+def test_within_limits_total_and_results():
+    stations = _stations(random.Random(3))
+    index = SearchIndex()
+    index.sync(stations)
+    within = {(s['asset_type'], s['province'], s['station_id']) for s in stations if s['province'] == 'BC'}
+    want = _brute(stations, 'river', within)
+    assert _got(index, 'river', limit=3, within=within) == (len(want), want[:3])
+    assert _got(index, 'river', within=set()) == (0, [])
@@ -0,0 +1,63 @@
+# tests/test_spatial_index.py
+# KDTree nearest / radius queries against a brute-force haversine scan, with points on both sides of the
+# antimeridian and near a pole, and GridIndex boxes that wrap the antimeridian.
+
+import numpy as np
+import pytest
+
+from backend.spatial_index import GridIndex, KDTree, haversine_km
+
+
+def _points(seed=5, n=2000):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(-60, 89.9, n)
+    lon = rng.uniform(-180, 180, n)
+    # a cluster straddling the antimeridian, plus unplaced stations
+    lat[:200] = rng.uniform(50, 54, 200)
+    lon[:200] = np.where(rng.random(200) < 0.5, rng.uniform(178, 180, 200), rng.uniform(-180, -178, 200))
+    lat[-5:] = np.nan
+    return lat, lon
+
+def _brute(lat, lon, qlat, qlon):
+    ok = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    km = haversine_km(qlat, qlon, lat[ok], lon[ok])
+    order = np.lexsort((ok, km))
+    return ok[order], km[order]
+
+
+QUERIES = [(52.0, 179.9), (52.0, -179.9), (51.5, 180.0), (89.5, 10.0), (0.0, 0.0), (-45.0, -120.0)]
+
+@pytest.mark.parametrize('qlat,qlon', QUERIES)
+def test_nearest_matches_brute_force(qlat, qlon):
+    lat, lon = _points()
+    tree = KDTree(lat, lon, leaf_size=8)
+    pos, km = _brute(lat, lon, qlat, qlon)
+    for k in (1, 7, 50):
+        got_pos, got_km = tree.nearest(qlat, qlon, k)
+        assert got_pos.tolist() == pos[:k].tolist()
+        assert np.allclose(got_km, km[:k])
+    got_pos, got_km = tree.nearest(qlat, qlon, 50, max_km=150)
+    assert got_pos.tolist() == pos[:50][km[:50] <= 150].tolist()
+
+@pytest.mark.parametrize('qlat,qlon', QUERIES)
+@pytest.mark.parametrize('radius', [0, 25, 150, 1000])
+def test_within_matches_brute_force(qlat, qlon, radius):
+    lat, lon = _points()
+    tree = KDTree(lat, lon, leaf_size=8)
+    pos, km = _brute(lat, lon, qlat, qlon)
+    got_pos, got_km = tree.within(qlat, qlon, radius)
+    assert got_pos.tolist() == pos[km <= radius].tolist()
+    assert np.allclose(got_km, km[km <= radius])
+
+def test_radius_crosses_antimeridian():
+    tree = KDTree([52.0, 52.0, 52.0], [179.9, -179.9, 170.0])
+    pos, km = tree.within(52.0, 179.95, 20)
+    assert sorted(pos.tolist()) == [0, 1]
+    assert km.max() < 20
+
+def test_grid_box_wraps_antimeridian():
+    lat, lon = _points()
+    grid = GridIndex(lat, lon)
+    with np.errstate(invalid='ignore'):
+        want = np.flatnonzero((lat >= 50) & (lat <= 54) & ((lon >= 179) | (lon <= -179)))
+    assert grid.query(50, 179, 54, -179).tolist() == want.tolist()
@@ -0,0 +1,143 @@
+# tests/test_station_cache.py
+# StationCache write-through patches against a fresh parse: after every note_row / note_row_deleted the
+# records, row index and station lookups match a cache built from the saved files, and changed_since()
+# names exactly the patched ids (or None once it can't tell).
+
+import random
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from backend.station_cache import StationCache
+
+HEADERS = ['Station ID', 'Asset Type', 'Site Name', 'Province', 'Latitude', 'Longitude', 'Status', 'Info – Notes']
+
+
+def _row(rng, sid, sheet):
+    lat = None if rng.random() < 0.1 else round(rng.uniform(48, 60), 4)   # some rows can't be placed
+    return [sid, sheet, f'Site {sid}', 'BC', lat, round(rng.uniform(-130, -110), 4),
+            rng.choice(['Active', 'Inactive']), rng.choice(['a', 'b', None])]
+
+class Books:
+    """Location workbooks on disk, edited the way excel_repo does: edit, save, then patch the cache."""
+
+    def __init__(self, folder, rng):
+        self.rng, self.cache, self.next_id, self.columns = rng, None, 0, 0
+        self.paths = [str(folder / 'AB.xlsx'), str(folder / 'BC.xlsx')]
+        for path in self.paths:
+            wb = Workbook()
+            wb.remove(wb.active)
+            for sheet in ('Cableway', 'Gauge'):
+                ws = wb.create_sheet(sheet)
+                ws.append([sheet])
+                ws.append(HEADERS)
+                for _ in range(5):
+                    ws.append(_row(rng, self.new_id(), sheet))
+            wb.save(path)
+        # one id in both workbooks: the earlier workbook owns it
+        self.edit(self.paths[1], 'Gauge', lambda ws: ws.append(_row(rng, 'S0000', 'Gauge')))
+
+    def new_id(self):
+        self.next_id += 1
+        return f'S{self.next_id - 1:04d}'
+
+    def edit(self, path, sheet, change):
+        wb = load_workbook(path)
+        ws = wb[sheet]
+        result = change(ws)
+        wb.save(path)
+        return ws, result
+
+    def ids(self):
+        out = set()
+        for path in self.paths:
+            for ws in load_workbook(path, read_only=True).worksheets:
+                out |= {str(r[0]) for r in ws.iter_rows(min_row=3, values_only=True) if r and r[0]}
+        return out
+
+    # ─── Edits that patch the cache ─────────────────────────────────────────
+    def _pick(self):
+        path, sheet = self.rng.choice(self.paths), self.rng.choice(['Cableway', 'Gauge'])
+        rows = load_workbook(path, read_only=True)[sheet].max_row
+        return path, sheet, rows
+
+    def update(self):
+        path, sheet, rows = self._pick()
+        row = self.rng.randrange(3, rows + 1)
+        old = load_workbook(path)[sheet].cell(row=row, column=1).value
+        values = _row(self.rng, self.new_id() if self.rng.random() < 0.2 else old, sheet)
+        def change(ws):
+            for col, value in enumerate(values, start=1):
+                ws.cell(row=row, column=col).value = value
+        ws, _ = self.edit(path, sheet, change)
+        self.cache.note_row(path, sheet, row, [c.value for c in ws[2]], [c.value for c in ws[row]])
+        return {str(old), str(values[0])}
+
+    def append(self):
+        path, sheet, _rows = self._pick()
+        sid = self.new_id()
+        ws, _ = self.edit(path, sheet, lambda ws: ws.append(_row(self.rng, sid, sheet)))
+        self.cache.note_row(path, sheet, ws.max_row, [c.value for c in ws[2]], [c.value for c in ws[ws.max_row]])
+        return {sid}
+
+    def delete(self):
+        path, sheet, rows = self._pick()
+        if rows < 4:
+            return self.append()
+        row = self.rng.randrange(3, rows + 1)
+        ws, sid = self.edit(path, sheet, lambda ws: (ws.cell(row=row, column=1).value, ws.delete_rows(row))[0])
+        self.cache.note_row_deleted(path, sheet, row)
+        return {str(sid)}
+
+    def add_column(self):
+        path, sheet, rows = self._pick()
+        self.columns += 1
+        name = f'Info – Extra {self.columns}'
+        def change(ws):
+            ws.cell(row=2, column=ws.max_column + 1, value=name)
+            ws.cell(row=rows, column=ws.max_column, value='x')
+        ws, _ = self.edit(path, sheet, change)
+        self.cache.note_row(path, sheet, rows, [c.value for c in ws[2]], [c.value for c in ws[rows]])
+        return None
+
+
+def _state(cache, ids):
+    stations = sorted(cache.list_stations(), key=lambda s: (s['province'], s['asset_type'], str(s['station_id'])))
+    return stations, {sid: (cache.locate(sid), cache.station(sid)) for sid in sorted(ids)}
+
+@pytest.fixture
+def books(tmp_path):
+    books = Books(tmp_path, random.Random(5))
+    books.cache = StationCache(locations_dir=str(tmp_path), workers=1)
+    books.cache.refresh()
+    return books
+
+def test_patches_match_a_fresh_parse(books, tmp_path):
+    for _ in range(60):
+        op = books.rng.choice([books.update, books.update, books.append, books.delete, books.add_column])
+        before = books.cache.version()
+        touched = op()
+        fresh = StationCache(locations_dir=str(tmp_path), workers=1)
+        ids = books.ids() | {'nope'}
+        assert _state(books.cache, ids) == _state(fresh, ids)
+        # a patch names its ids; a new column reshapes the sheet, so the caller must diff everything
+        assert books.cache.changed_since(before) == (None if touched is None else touched - {'None'})
+
+def test_duplicate_id_moves_to_the_next_workbook(books):
+    ab, bc = books.paths
+    assert books.cache.locate('S0000')[0] == ab
+    rows = [r for r in range(3, 8) if load_workbook(ab)['Cableway'].cell(row=r, column=1).value == 'S0000']
+    books.edit(ab, 'Cableway', lambda ws: ws.delete_rows(rows[0]))
+    books.cache.note_row_deleted(ab, 'Cableway', rows[0])
+    assert books.cache.locate('S0000')[:2] == (bc, 'Gauge')
+
+def test_changed_since_gives_up_after_an_outside_edit(books):
+    version = books.cache.version()
+    books.update()
+    assert books.cache.changed_since(version)
+    books.edit(books.paths[0], 'Gauge', lambda ws: ws.append(_row(books.rng, 'OUTSIDE', 'Gauge')))
+    assert books.cache.changed_since(version) is None
+    now = books.cache.version()
+    assert books.cache.changed_since(now) == set()
+    books.append()
+    assert books.cache.changed_since(now) == {f'S{books.next_id - 1:04d}'}
@@ -0,0 +1,51 @@
+# tests/test_station_fields.py
+# Field queries in SQL (station_fields table) against the Python evaluation the Excel store uses: every
+# operator gives the same stations, including numbers stored as text, ISO dates and non-ASCII `contains`.
+
+import pytest
+
+from backend.db_migrations import migrate
+from backend.db_repo import DBRepo, Station, make_engine
+from backend.station_fields import OPERATORS, matches, summarize
+
+VALUES = [
+    'Straße 5', 'STRASSE', 'strasse', 'Zoë', 'ZOË', 'Ölmühle', 'mark scott', 'MARK SCOTT', '100%_done',
+    12, 12.0, 7.5, '12', ' 12 ', '-3', 0, '2029-06-01', '2031-01-01', '', None,
+]
+TARGETS = ['strasse', 'STRASSE', 'Straße', 'zoë', 'ZOE', 'ölm', 'MARK', 'mark scott', '%_', '12', 12, 7.5,
+           '0', '2030-01-01', 'N', '']
+
+
+@pytest.fixture(scope='module')
+def repo():
+    engine = make_engine('sqlite://')
+    db = DBRepo(engine=engine, index_fields=True)
+    migrate(engine)
+    with db.Session() as s:
+        for i, value in enumerate(VALUES):
+            s.add(Station(station_id=f'S{i:02d}', name='x', extra_data={'Info': {'Value': value}}))
+        s.commit()
+    return db
+
+@pytest.mark.parametrize('op', OPERATORS)
+@pytest.mark.parametrize('target', TARGETS)
+def test_sql_matches_python(repo, op, target):
+    want = [f'S{i:02d}' for i, value in enumerate(VALUES) if matches(value, op, target)]
+    assert repo.station_ids_where_field('Info', 'Value', op, target) == want
+
+def test_contains_folds_non_ascii(repo):
+    assert repo.station_ids_where_field('Info', 'Value', 'contains', 'strasse') == ['S00', 'S01', 'S02']
+    assert repo.station_ids_where_field('Info', 'Value', 'contains', 'zoë') == ['S03', 'S04']
+
+def test_summary_matches_python(repo):
+    want = summarize(VALUES)
+    got = repo.field_summary('Info', 'Value')
+    assert got['count'] == want['count']
+    assert got['top'] == want['top']
+    assert got['numeric'].keys() == want['numeric'].keys()
+    for key, value in want['numeric'].items():
+        assert got['numeric'][key] == pytest.approx(value)
+
+def test_unknown_operator(repo):
+    with pytest.raises(ValueError):
+        repo.station_ids_where_field('Info', 'Value', '~', 1)
@@ -0,0 +1,82 @@
+# tests/test_station_snapshot.py
+# .npz snapshots read back as exactly the parse they were written from — date, time and duration cells,
+# numbers, bools and blanks keep their types — and are refused once the workbook signature moves on.
+
+import datetime as dt
+
+import pytest
+from openpyxl import Workbook
+
+from backend import station_snapshot
+from backend.station_snapshot import read_snapshot, write_snapshot
+from backend.workbook_reader import parse_location_workbook
+
+SIGNATURE = (1_700_000_000_123_456_789, 40960)
+
+
+def _typed(value):
+    """Compare with types, so 1 / 1.0 / True and date / datetime stay apart."""
+    if isinstance(value, dict):
+        return {k: _typed(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, [_typed(v) for v in value]
+    return type(value).__name__, value
+
+@pytest.fixture
+def parsed(tmp_path):
+    path = tmp_path / 'BC.xlsx'
+    wb = Workbook()
+    wb.remove(wb.active)
+    ws = wb.create_sheet('Cableway')
+    ws.append(['Cableway'])
+    ws.append(['Station ID', 'Site Name', 'Latitude', 'Longitude', 'Status', 'Info – Installed', 'Info – Span'])
+    ws.append(['C1', 'Rivière Nord', 49.25, -123.1, 'Active', dt.datetime(2021, 3, 4, 5, 6, 7), 120])
+    ws.append([1042, None, '50', -120, None, dt.date(1999, 12, 31), 3.5])
+    ws.append(['C3', 'No coords', None, -120, 'Active', None, 1])   # row index only
+    ws.append(['C1', 'Duplicate', 51, -121, True, None, None])
+    ws = wb.create_sheet('Gauge')
+    ws.append(['Gauge'])
+    ws.append(['Station ID', 'Latitude', 'Longitude', 'Info – Read At', 'Info – Interval', 'Info – Flag'])
+    ws.append(['G1', 55.5, -118.25, dt.time(14, 30, 15), dt.timedelta(hours=1, seconds=30), False])
+    ws.append(['G2', 56, -119, None, None, 0])
+    wb.create_sheet('Empty')
+    wb.save(path)
+    return parse_location_workbook(str(path))
+
+def test_round_trip_keeps_values_and_types(parsed, tmp_path):
+    snap = str(tmp_path / 'BC.snapshot.npz')
+    write_snapshot(snap, SIGNATURE, parsed)
+    back = read_snapshot(snap, SIGNATURE, 'BC')
+    assert _typed(back) == _typed(parsed)
+    assert type(back['stations'][0]['Info – Installed']) is dt.datetime
+    assert back['rows']['C3'] == ('Cableway', 5)
+    assert back['headers']['Empty'] == []
+
+def test_every_tagged_cell_type_round_trips(tmp_path):
+    # openpyxl hands back date cells as datetimes; a plain date can still arrive from a patched row
+    cells = [dt.date(2024, 2, 29), dt.datetime(2024, 2, 29, 0, 0), dt.time(0, 0, 1, 500),
+             dt.timedelta(days=-1, microseconds=250), None, True, 0, 0.1, 'text']
+    stations = [{'station_id': f'S{i}', 'name': None, 'province': 'AB', 'lat': 50.0, 'lon': -114.0,
+                 'status': None, 'asset_type': 'Gauge', 'Info – Value': cell} for i, cell in enumerate(cells)]
+    parsed = {'stations': stations, 'rows': {s['station_id']: ('Gauge', i + 3) for i, s in enumerate(stations)},
+              'headers': {'Gauge': ['Station ID', 'Info – Value']}}
+    snap = str(tmp_path / 'AB.snapshot.npz')
+    write_snapshot(snap, SIGNATURE, parsed)
+    assert _typed(read_snapshot(snap, SIGNATURE, 'AB')) == _typed(parsed)
+
+def test_empty_workbook_round_trips(tmp_path):
+    snap = str(tmp_path / 'AB.snapshot.npz')
+    parsed = {'stations': [], 'rows': {}, 'headers': {}}
+    write_snapshot(snap, SIGNATURE, parsed)
+    assert read_snapshot(snap, SIGNATURE, 'AB') == parsed
+
+def test_stale_or_unreadable_snapshots_are_refused(parsed, tmp_path, monkeypatch):
+    snap = str(tmp_path / 'BC.snapshot.npz')
+    write_snapshot(snap, SIGNATURE, parsed)
+    assert read_snapshot(snap, (SIGNATURE[0] + 1, SIGNATURE[1]), 'BC') is None
+    assert read_snapshot(snap, (SIGNATURE[0], SIGNATURE[1] + 1), 'BC') is None
+    assert read_snapshot(str(tmp_path / 'missing.npz'), SIGNATURE, 'BC') is None
+    monkeypatch.setattr(station_snapshot, 'SNAPSHOT_VERSION', station_snapshot.SNAPSHOT_VERSION + 1)
+    assert read_snapshot(snap, SIGNATURE, 'BC') is None
+    (tmp_path / 'torn.npz').write_bytes(open(snap, 'rb').read()[:200])
+    assert read_snapshot(str(tmp_path / 'torn.npz'), SIGNATURE, 'BC') is None
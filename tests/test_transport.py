@@ -0,0 +1,75 @@
+# tests/test_transport.py
+# @compressible envelopes: results above the threshold inflate (as unpackResponse does) back to the JSON the
+# endpoint would have sent, smaller ones pass through untouched, and the per-endpoint stats add up.
+
+import base64
+import datetime
+import json
+import zlib
+
+import pytest
+
+from backend import transport
+from backend.transport import ENVELOPE, compressible, pack, transport_stats
+
+
+def _unpack(res):
+    """What unpackResponse does: anything that isn't an envelope is returned as-is."""
+    if not isinstance(res, dict) or res.get('__transport__') != ENVELOPE:
+        return res
+    return json.loads(zlib.decompress(base64.b64decode(res['data'])).decode('utf-8'))
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    transport_stats(reset=True)
+    yield
+    transport_stats(reset=True)
+
+
+def test_large_results_round_trip():
+    rows = [{'station_id': f'S{i}', 'lat': i / 7, 'ok': i % 2 == 0, 'note': None, 'name': 'Rivière ∆'}
+            for i in range(2000)]
+    out, raw, sent = pack(rows, threshold=1024)
+    assert out['__transport__'] == ENVELOPE
+    assert out['raw_bytes'] == raw == len(json.dumps(rows).encode('utf-8'))
+    assert sent == len(json.dumps(out)) < raw
+    assert _unpack(json.loads(json.dumps(out))) == rows
+
+def test_threshold_is_inclusive_and_small_results_pass_through():
+    value = {'x': 'a' * 100}
+    size = len(json.dumps(value))
+    assert pack(value, threshold=size) == (value, size, size)
+    out, _raw, _sent = pack(value, threshold=size - 1)
+    assert _unpack(out) == value
+    for small in (None, [], 'text', 3):
+        assert pack(small, threshold=1024)[0] is small
+
+def test_unserializable_values_go_as_null_like_eel():
+    value = {'when': datetime.date(2024, 1, 2), 'pad': 'x' * 200}
+    out, _raw, _sent = pack(value, threshold=10)
+    assert _unpack(out) == {'when': None, 'pad': 'x' * 200}
+
+def test_switched_off_never_compresses(monkeypatch):
+    monkeypatch.setattr(transport, 'TRANSPORT_COMPRESSION', False)
+    value = ['x' * 5000]
+    assert pack(value, threshold=10)[0] is value
+
+def test_decorator_records_stats():
+    @compressible(threshold=100)
+    def listing(n):
+        return ['row'] * n
+
+    @compressible
+    def small():
+        return {'ok': True}
+
+    assert listing(2) == ['row', 'row']
+    assert _unpack(listing(500)) == ['row'] * 500
+    assert small() == {'ok': True}
+    assert listing.__name__ == 'listing'
+    stats = transport_stats(reset=True)
+    assert stats['listing']['calls'] == 2 and stats['listing']['compressed_calls'] == 1
+    assert stats['listing']['raw_bytes'] == len(json.dumps(['row'] * 2)) + len(json.dumps(['row'] * 500))
+    assert stats['listing']['ratio'] > 1
+    assert stats['small'] == {**stats['small'], 'calls': 1, 'compressed_calls': 0, 'ratio': 1.0}
+    assert transport_stats() == {}
@@ -0,0 +1,60 @@
+# tests/test_workbook_writer.py
+# Write-behind edits: a block that raises never costs an edit acknowledged before it, the last written
+# workbook is reused while the file is unchanged, and queued edits that can't be written block new ones.
+
+import os
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from backend import workbook_writer as writer_module
+from backend.workbook_writer import WorkbookWriter
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = str(tmp_path / 'BC.xlsx')
+    Workbook().save(path)
+    return path
+
+def _edit(writer, path, cell, value, fail=False):
+    with writer.editing(path):
+        wb = writer.load(path)
+        wb.active[cell] = value
+        if fail:
+            raise ValueError('edit failed halfway')
+        writer.save(path, wb)
+    return wb
+
+def test_failed_edit_keeps_acknowledged_edits(book):
+    writer = WorkbookWriter(delay=60)
+    _edit(writer, book, 'A1', 'first')
+    assert writer.pending_generation(book) == 1
+    with pytest.raises(ValueError):
+        _edit(writer, book, 'A2', 'half', fail=True)
+    _edit(writer, book, 'A3', 'third')
+    writer.flush()
+    ws = load_workbook(book).active
+    assert (ws['A1'].value, ws['A2'].value, ws['A3'].value) == ('first', None, 'third')
+
+def test_reuses_written_workbook_until_file_changes(book):
+    writer = WorkbookWriter(delay=60)
+    wb = _edit(writer, book, 'A1', 'x')
+    with writer.editing(book):
+        assert writer.load(book) is wb          # flushed on entry, then handed back
+    writer.flush()
+    os.utime(book, ns=(1, 1))
+    with writer.editing(book):
+        assert writer.load(book) is not wb
+
+def test_unwritable_queue_blocks_the_edit(book, monkeypatch):
+    writer = WorkbookWriter(delay=60)
+    _edit(writer, book, 'A1', 'first')
+
+    def locked(wb, path):
+        raise PermissionError('file is open in Excel')
+    monkeypatch.setattr(writer_module, 'atomic_save', locked)
+    with pytest.raises(OSError):
+        _edit(writer, book, 'A2', 'second')
+    assert writer.pending(book).active['A1'].value == 'first'
+    assert writer.pending(book).active['A2'].value is None